@@ -5,8 +5,10 @@ Handles embedding generation endpoints
 from fastapi import APIRouter, HTTPException
 from typing import List
 import logging
+import numpy as np
 
 from app.services.embedding_service import embedding_service
+from app.utils.executors import run_cpu
 from app.models.common import TextInput, BatchTextInput, EmbeddingVector
 
 logger = logging.getLogger(__name__)
@@ -25,7 +27,7 @@ async def generate_embedding(request: TextInput):
         Embedding vector
     """
     try:
-        embedding = embedding_service.generate_embedding(request.text)
+        embedding = await embedding_service.generate_embedding_async(request.text)
         
         return {
             "success": True,
@@ -51,7 +53,7 @@ async def generate_embeddings_batch(request: BatchTextInput):
         List of embedding vectors
     """
     try:
-        embeddings = embedding_service.generate_embeddings_batch(request.texts)
+        embeddings = await run_cpu(embedding_service.generate_embeddings_batch, request.texts)
         
         return {
             "success": True,
@@ -79,7 +81,13 @@ async def compute_similarity(embedding1: List[float], embedding2: List[float]):
         Similarity score
     """
     try:
-        similarity = embedding_service.compute_similarity(embedding1, embedding2)
+        # Client-supplied vectors may not be normalized
+        vec1 = np.asarray(embedding1, dtype=np.float32)
+        vec2 = np.asarray(embedding2, dtype=np.float32)
+        vec1 /= max(float(np.linalg.norm(vec1)), 1e-12)
+        vec2 /= max(float(np.linalg.norm(vec2)), 1e-12)
+        
+        similarity = embedding_service.compute_similarity(vec1, vec2)
         
         return {
             "success": True,
@@ -107,5 +115,7 @@ async def embeddings_health():
         "status": "healthy",
         "service": "embeddings",
         "model_loaded": embedding_service.model is not None,
-        "model": embedding_service.model_name
+        "model": embedding_service.model_name,
+        "cache": embedding_service.get_cache_stats(),
+        "batching": embedding_service.get_batching_stats()
     }
@@ -7,6 +7,7 @@ import logging
 import time
 
 from app.services.interview_service import interview_service
+from app.utils.executors import run_io
 from app.models.interview import (
     GenerateInterviewKitRequest,
     GenerateInterviewKitResponse
@@ -30,7 +31,8 @@ async def generate_interview_kit(request: GenerateInterviewKitRequest):
     start_time = time.time()
     
     try:
-        interview_kit = interview_service.generate_interview_kit(
+        interview_kit = await run_io(
+            interview_service.generate_interview_kit,
             job_description=request.job_description,
             resume_text=request.resume_text,
             job_title=request.job_title,
@@ -78,7 +80,8 @@ async def generate_specific_questions(
     """
     try:
         # Generate full kit and filter
-        interview_kit = interview_service.generate_interview_kit(
+        interview_kit = await run_io(
+            interview_service.generate_interview_kit,
             job_description=job_description,
             resume_text=resume_text,
             job_title=job_title,
@@ -114,5 +117,7 @@ async def interview_health():
         "status": "healthy",
         "service": "interview",
         "llm_provider": "gemini",
-        "llm_available": llm_available
+        "llm_available": llm_available,
+        "llm_circuit": interview_service.client.breaker.stats(),
+        "single_flight": interview_service.flights.stats()
     }
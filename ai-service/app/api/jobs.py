@@ -0,0 +1,275 @@
+"""
+Jobs API Routes
+Submit, poll, cancel and fetch results of long-running bulk scoring and ranking
+"""
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+import logging
+
+from app.config import settings
+from app.services.hybrid_scoring import get_hybrid_scoring_service, LLMBudget
+from app.services.job_queue import job_queue, Job, COMPLETED
+from app.services.llm_client import llm_client
+from app.services.search_service import search_service
+from app.utils.executors import job_pool
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+hybrid_service = get_hybrid_scoring_service()
+
+
+class ScoreBatchJobRequest(BaseModel):
+    """Request model for a bulk scoring job"""
+    resumes: List[Dict]
+    job_description: str
+    required_skills: Optional[List[str]] = None
+    scoring_mode: Optional[str] = "hybrid"
+    llm_max_calls: Optional[int] = Field(None, ge=0, description="Hybrid mode: LLM call budget")
+    llm_max_cost: Optional[float] = Field(None, ge=0, description="Hybrid mode: LLM dollar budget")
+    llm_margin: float = Field(0.0, ge=0, description="Hybrid mode: margin band below the cut line")
+    llm_max_margin_calls: Optional[int] = Field(None, ge=0, description="Hybrid mode: extra LLM calls the margin band may add")
+    priority: int = Field(5, ge=0, le=9, description="Lower runs first")
+
+
+class RankCandidatesJobRequest(BaseModel):
+    """Request model for a bulk ranking job"""
+    job_description: str
+    resumes: List[Dict] = []
+    resume_ids: List[str] = []
+    top_n: Optional[int] = None
+    index_new: bool = Field(False, description="Add text resumes with new or changed text to the index by ID")
+    priority: int = Field(5, ge=0, le=9, description="Lower runs first")
+
+
+def _chunks(items: list, size: int):
+    """Split list into consecutive chunks"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _in_background(fn, *args, **kwargs):
+    """Call fn with its LLM calls queued behind interactive ones (see LLMClient.background)"""
+    with llm_client.background():
+        return fn(*args, **kwargs)
+
+
+async def _run_score_batch(job: Job):
+    """
+    Score resumes chunk by chunk; results are sorted by score when done
+
+    An LLM budget ranks the whole batch before spending it, so budgeted
+    jobs are scored in a single step. LLM calls are made as background
+    traffic, capped at LLM_JOB_MAX_CONCURRENCY so interactive scoring is
+    never queued behind a chunk.
+    """
+    params = job.params
+    llm_budget = params["llm_budget"]
+    chunk_size = len(params["resumes"]) if llm_budget.limited else settings.JOB_CHUNK_SIZE
+    total_cost = 0.0
+
+    for chunk in _chunks(params["resumes"], chunk_size):
+        if job.cancel_requested:
+            break
+
+        results = await job_pool.run(
+            _in_background,
+            hybrid_service.score_batch,
+            chunk,
+            params["job_description"],
+            required_skills=params["required_skills"],
+            force_mode=params["scoring_mode"],
+            llm_budget=llm_budget
+        )
+
+        job.results.extend(results)
+        job.processed += len(chunk)
+        total_cost += sum(r['api_cost'] for r in results)
+        job.summary = {
+            "scored_candidates": len(job.results),
+            "total_api_cost": round(total_cost, 6),
+            "scoring_mode": params["scoring_mode"]
+        }
+
+    job.results.sort(key=lambda x: x['score'], reverse=True)
+
+
+async def _run_rank_candidates(job: Job):
+    """Rank candidates chunk by chunk, merging into a running top-N"""
+    params = job.params
+    top_n = params["top_n"]
+    text_ids = {resume.get('id') for resume in params["resumes"]}
+    resume_ids = [rid for rid in dict.fromkeys(params["resume_ids"]) if rid not in text_ids]
+
+    work = [(chunk, []) for chunk in _chunks(params["resumes"], settings.JOB_CHUNK_SIZE)]
+    work += [([], chunk) for chunk in _chunks(resume_ids, settings.JOB_CHUNK_SIZE)]
+
+    for resumes, ids in work:
+        if job.cancel_requested:
+            break
+
+        ranked = await job_pool.run(
+            search_service.rank_candidates,
+            params["job_description"],
+            resumes,
+            top_n,
+            ids,
+            params["index_new"]
+        )
+
+        merged = sorted(job.results + ranked, key=lambda x: x['similarity_score'], reverse=True)
+        job.results = [
+            {**candidate, "rank": rank}
+            for rank, candidate in enumerate(merged[:top_n] if top_n else merged, start=1)
+        ]
+        job.processed += len(resumes) + len(ids)
+        job.summary = {"ranked_candidates": len(job.results)}
+
+
+job_queue.register_handler("score_batch", _run_score_batch)
+job_queue.register_handler("rank_candidates", _run_rank_candidates)
+
+
+def _get_job_or_404(job_id: str) -> Job:
+    """Look up job or raise 404"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/score-batch")
+async def submit_score_batch(request: ScoreBatchJobRequest):
+    """
+    Submit a bulk scoring job
+
+    Args:
+        request: Resumes, job description and scoring options
+
+    Returns:
+        Job ID and initial status
+    """
+    try:
+        job = job_queue.submit(
+            "score_batch",
+            {
+                "resumes": request.resumes,
+                "job_description": request.job_description,
+                "required_skills": request.required_skills,
+                "scoring_mode": request.scoring_mode,
+                "llm_budget": LLMBudget(
+                    max_calls=request.llm_max_calls,
+                    max_cost=request.llm_max_cost,
+                    margin=request.llm_margin,
+                    max_margin_calls=request.llm_max_margin_calls
+                )
+            },
+            total=len(request.resumes),
+            priority=request.priority
+        )
+        return {"success": True, "job": job.to_dict()}
+    except Exception as e:
+        logger.error(f"Error submitting scoring job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rank-candidates")
+async def submit_rank_candidates(request: RankCandidatesJobRequest):
+    """
+    Submit a bulk ranking job
+
+    Args:
+        request: Job description, resume texts and/or indexed resume IDs
+
+    Returns:
+        Job ID and initial status
+    """
+    try:
+        job = job_queue.submit(
+            "rank_candidates",
+            {
+                "job_description": request.job_description,
+                "resumes": request.resumes,
+                "resume_ids": request.resume_ids,
+                "top_n": request.top_n,
+                "index_new": request.index_new
+            },
+            total=len(request.resumes) + len(request.resume_ids),
+            priority=request.priority
+        )
+        return {"success": True, "job": job.to_dict()}
+    except Exception as e:
+        logger.error(f"Error submitting ranking job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/")
+async def list_jobs():
+    """List known jobs and queue statistics"""
+    return {
+        "success": True,
+        "jobs": [job.to_dict() for job in job_queue.jobs.values()],
+        "stats": job_queue.stats()
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Poll job status and progress
+
+    Args:
+        job_id: Job ID
+
+    Returns:
+        Job status, progress and summary
+    """
+    return {"success": True, "job": _get_job_or_404(job_id).to_dict()}
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """
+    Fetch job results (partial while the job is still running)
+
+    Scoring results are sorted by score once the job completes; ranking
+    results are always the current top N.
+
+    Args:
+        job_id: Job ID
+        offset: First result to return
+        limit: Maximum results to return
+
+    Returns:
+        Page of results with job status
+    """
+    job = _get_job_or_404(job_id)
+    return {
+        "success": True,
+        "job": job.to_dict(),
+        "partial": job.status != COMPLETED,
+        "offset": offset,
+        "results": job.results[offset:offset + limit]
+    }
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job
+
+    Args:
+        job_id: Job ID
+
+    Returns:
+        Job status after the cancel request
+    """
+    job = _get_job_or_404(job_id)
+    job_queue.cancel(job_id)
+    return {"success": True, "job": job.to_dict()}
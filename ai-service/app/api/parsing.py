@@ -5,24 +5,118 @@ Handles resume and document parsing endpoints
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from pathlib import Path
+from typing import Optional, Tuple, Union
 import logging
 import time
+import numpy as np
 
 from app.config import settings
 from app.services.parsing_service import parsing_service
+from app.services.document_store import DocumentArtifacts, document_digest, document_store
+from app.services.embedding_service import embedding_service
+from app.services.hybrid_scoring import get_hybrid_scoring_service
+from app.services.resume_profile_cache import resume_profile_key
+from app.services.parse_pool import parse_pool, ParsePoolFullError
+from app.services.pdf_extraction import extraction_metrics
 from app.models.resume import (
     ResumeParseResponse,
     ParsedResume,
     SkillExtractionRequest,
     SkillExtractionResponse
 )
-from app.utils.file_utils import save_uploaded_file, delete_file, get_file_extension
+from app.utils.file_utils import read_upload, delete_file, get_file_extension
+from app.utils.executors import run_cpu, run_io
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Concurrent uploads of the same document are parsed once
+document_flights = SingleFlight("document_parse")
 
-@router.post("/pdf", response_model=ResumeParseResponse)
+
+class DocumentParseResponse(ResumeParseResponse):
+    """Resume parse response with document deduplication details"""
+    cached: bool = False  # Result reused from an earlier upload of the same file
+    document_hash: Optional[str] = None  # SHA-256 of the uploaded file
+
+
+async def _parse_document(document: Union[bytes, Path], file_type: str) -> Tuple[ParsedResume, bool, str]:
+    """
+    Parse an uploaded document, reusing the stored artifacts for identical bytes
+    
+    On a first upload the extracted text is also embedded and profiled and
+    both are stored with the parse result. On a repeat upload they are put
+    back into the embedding and resume profile caches, so scoring the
+    resume again skips every stage.
+    
+    Args:
+        document: Document bytes or path of a spilled upload
+        file_type: Document type ("pdf" or "docx")
+        
+    Returns:
+        Tuple of (parsed resume, whether it came from the document store,
+        SHA-256 of the document)
+    """
+    digest = await run_io(document_digest, document)
+    if document_store is None:
+        return await parse_pool.parse(document, file_type), False, digest
+    
+    key = document_store.key(digest, file_type)
+    stored = await run_io(document_store.get, key)
+    if stored is not None:
+        if await _fill_artifacts(stored):
+            await run_io(document_store.put, key, stored)
+        return stored.resume, True, digest
+    
+    async def parse():
+        started_at = time.perf_counter()
+        artifacts = DocumentArtifacts(
+            await parse_pool.parse(document, file_type),
+            time.perf_counter() - started_at
+        )
+        await _fill_artifacts(artifacts)
+        await run_io(document_store.put, key, artifacts)
+        return artifacts.resume
+    
+    return await document_flights.do_async(key, parse), False, digest
+
+
+async def _fill_artifacts(artifacts: DocumentArtifacts) -> bool:
+    """
+    Restore stored embedding and profile into their caches, computing missing or stale ones
+    
+    Returns:
+        Whether artifacts changed and should be stored again
+    """
+    text = artifacts.resume.raw_text
+    if not text.strip():
+        return False
+    changed = False
+    
+    embedding_key = embedding_service.embedding_key(text)
+    if artifacts.embedding is not None and artifacts.embedding_key == embedding_key:
+        await run_io(embedding_service.restore_embedding, embedding_key, artifacts.embedding)
+    else:
+        try:
+            embedding = await embedding_service.generate_embedding_async(text)
+            artifacts.embedding = np.asarray(embedding, dtype=np.float32)
+            artifacts.embedding_key = embedding_key
+            changed = True
+        except Exception as e:
+            logger.warning(f"Could not embed parsed document, filled on next upload: {e}")
+    
+    rule_based = get_hybrid_scoring_service().rule_based_service
+    if artifacts.profile is not None and artifacts.profile.key == resume_profile_key(text):
+        await run_io(rule_based.restore_resume_profile, artifacts.profile)
+    else:
+        artifacts.profile = await run_cpu(rule_based.get_resume_profile, text)
+        changed = True
+    
+    return changed
+
+
+@router.post("/pdf", response_model=DocumentParseResponse)
 async def parse_pdf(file: UploadFile = File(...)):
     """
     Parse PDF resume
@@ -41,30 +135,37 @@ async def parse_pdf(file: UploadFile = File(...)):
         if get_file_extension(file.filename) != '.pdf':
             raise HTTPException(status_code=400, detail="File must be PDF")
         
-        # Save uploaded file
-        temp_file = save_uploaded_file(
+        # Read upload into memory (large uploads spill to a uniquely named temp file)
+        document = await run_io(
+            read_upload,
             file.file,
-            file.filename,
-            settings.TEMP_DIR
+            settings.PARSE_MEMORY_MAX_BYTES,
+            settings.TEMP_DIR,
+            ".pdf"
         )
+        if isinstance(document, Path):
+            temp_file = document
         
-        # Extract text
-        text = parsing_service.extract_text_from_pdf(temp_file)
-        
-        # Parse resume
-        parsed_resume = parsing_service.parse_resume(text)
+        # Reuse the result for a previously parsed identical file, otherwise
+        # extract text and parse resume in a worker process
+        parsed_resume, cached, document_hash = await _parse_document(document, "pdf")
         
         processing_time = time.time() - start_time
         
-        return ResumeParseResponse(
+        return DocumentParseResponse(
             success=True,
             resume=parsed_resume,
-            processing_time=processing_time
+            processing_time=processing_time,
+            cached=cached,
+            document_hash=document_hash
         )
         
+    except ParsePoolFullError as e:
+        logger.warning(f"Rejected PDF parse: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error parsing PDF: {e}")
-        return ResumeParseResponse(
+        return DocumentParseResponse(
             success=False,
             error=str(e)
         )
@@ -74,7 +175,7 @@ async def parse_pdf(file: UploadFile = File(...)):
             delete_file(temp_file)
 
 
-@router.post("/docx", response_model=ResumeParseResponse)
+@router.post("/docx", response_model=DocumentParseResponse)
 async def parse_docx(file: UploadFile = File(...)):
     """
     Parse DOCX resume
@@ -93,30 +194,37 @@ async def parse_docx(file: UploadFile = File(...)):
         if get_file_extension(file.filename) != '.docx':
             raise HTTPException(status_code=400, detail="File must be DOCX")
         
-        # Save uploaded file
-        temp_file = save_uploaded_file(
+        # Read upload into memory (large uploads spill to a uniquely named temp file)
+        document = await run_io(
+            read_upload,
             file.file,
-            file.filename,
-            settings.TEMP_DIR
+            settings.PARSE_MEMORY_MAX_BYTES,
+            settings.TEMP_DIR,
+            ".docx"
         )
+        if isinstance(document, Path):
+            temp_file = document
         
-        # Extract text
-        text = parsing_service.extract_text_from_docx(temp_file)
-        
-        # Parse resume
-        parsed_resume = parsing_service.parse_resume(text)
+        # Reuse the result for a previously parsed identical file, otherwise
+        # extract text and parse resume in a worker process
+        parsed_resume, cached, document_hash = await _parse_document(document, "docx")
         
         processing_time = time.time() - start_time
         
-        return ResumeParseResponse(
+        return DocumentParseResponse(
             success=True,
             resume=parsed_resume,
-            processing_time=processing_time
+            processing_time=processing_time,
+            cached=cached,
+            document_hash=document_hash
         )
         
+    except ParsePoolFullError as e:
+        logger.warning(f"Rejected DOCX parse: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error parsing DOCX: {e}")
-        return ResumeParseResponse(
+        return DocumentParseResponse(
             success=False,
             error=str(e)
         )
@@ -138,7 +246,7 @@ async def extract_skills(request: SkillExtractionRequest):
         Extracted skills
     """
     try:
-        skills = parsing_service.extract_skills(request.text)
+        skills = await run_cpu(parsing_service.extract_skills, request.text)
         
         return SkillExtractionResponse(
             success=True,
@@ -161,5 +269,9 @@ async def parsing_health():
     return {
         "status": "healthy",
         "service": "parsing",
-        "spacy_loaded": parsing_service.nlp is not None
+        "spacy_loaded": parsing_service.nlp is not None,
+        "parse_pool": parse_pool.stats(),
+        "pdf_extraction": extraction_metrics.stats(),
+        "document_store": document_store.stats() if document_store is not None else {"enabled": False},
+        "single_flight": document_flights.stats()
     }
@@ -3,14 +3,21 @@ Scoring API Routes
 Handles match scoring and explanation endpoints with hybrid scoring support
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+import asyncio
+import heapq
+import json
 import logging
 
 from app.config import settings
-from app.services.hybrid_scoring import get_hybrid_scoring_service
+from app.services.hybrid_scoring import get_hybrid_scoring_service, LLMBudget
 from app.services.embedding_service import embedding_service
 from app.services.scoring_service import scoring_service
+from app.services.llm_client import llm_client
+from app.utils.circuit_breaker import CircuitOpenError
 from app.models.match import MatchRequest, MatchResponse, CandidateMatch
+from app.utils.executors import cpu_pool, io_pool, ExecutionPool
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -19,6 +26,12 @@ router = APIRouter()
 hybrid_service = get_hybrid_scoring_service()
 
 
+def _pool_for_mode(scoring_mode: Optional[str]) -> ExecutionPool:
+    """Rule-based scoring is CPU-bound; modes that may call the LLM wait on I/O"""
+    mode = scoring_mode or hybrid_service.scoring_mode
+    return cpu_pool if mode == "rule_based" else io_pool
+
+
 @router.post("/match", response_model=MatchResponse)
 async def calculate_match(
     request: MatchRequest,
@@ -40,13 +53,27 @@ async def calculate_match(
         Match result with score, breakdown, and optional explanation
     """
     try:
+        # Job-side requirements and embedding are cached per job (filled by
+        # the service, never by this route); the resume is embedded meanwhile
+        job_profile, resume_embedding = await asyncio.gather(
+            cpu_pool.run(
+                hybrid_service.get_job_profile,
+                request.job_description,
+                getattr(request, 'required_skills', None),
+                getattr(request, 'required_experience_years', 0),
+                getattr(request, 'required_education', 'none'),
+                getattr(request, 'preferred_skills', None),
+                include_embedding=True
+            ),
+            embedding_service.generate_embedding_async(request.resume_text)
+        )
+        
         # Calculate semantic similarity
-        resume_embedding = embedding_service.generate_embedding(request.resume_text)
-        job_embedding = embedding_service.generate_embedding(request.job_description)
-        similarity_score = embedding_service.compute_similarity(resume_embedding, job_embedding)
+        similarity_score = embedding_service.compute_similarity(resume_embedding, job_profile.embedding)
         
         # Calculate match score using hybrid service
-        match_result = hybrid_service.calculate_match_score(
+        match_result = await _pool_for_mode(scoring_mode).run(
+            hybrid_service.calculate_match_score,
             resume_text=request.resume_text,
             job_description=request.job_description,
             required_skills=getattr(request, 'required_skills', None),
@@ -55,17 +82,21 @@ async def calculate_match(
             preferred_skills=getattr(request, 'preferred_skills', None),
             preferred_experience_years=getattr(request, 'preferred_experience_years', None),
             similarity_score=similarity_score,
-            force_mode=scoring_mode
+            force_mode=scoring_mode,
+            job_profile=job_profile
         )
         
         # Generate explanation if requested
         explanation = None
         if request.include_explanation:
-            explanation = hybrid_service.generate_explanation(
+            use_llm = scoring_mode == "llm_only" or match_result.get('llm_enhanced', False)
+            explanation = await (io_pool if use_llm else cpu_pool).run(
+                hybrid_service.generate_explanation,
                 request.resume_text,
                 request.job_description,
                 match_result['overall_score'],
-                use_llm=(scoring_mode == "llm_only" or match_result.get('llm_enhanced', False))
+                use_llm=use_llm,
+                job_profile=job_profile
             )
         
         # Create match score object
@@ -138,11 +169,26 @@ async def explain_match(
             education_score=overall_score
         )
         
-        explanation = scoring_service.generate_match_explanation(
-            resume_text,
-            job_description,
-            match_score
-        )
+        try:
+            explanation = await io_pool.run(
+                scoring_service.generate_match_explanation,
+                resume_text,
+                job_description,
+                match_score
+            )
+        except CircuitOpenError:
+            # Gemini unavailable: answer with the rule-based explanation right away
+            rule_based = await cpu_pool.run(
+                hybrid_service.generate_explanation,
+                resume_text,
+                job_description,
+                overall_score,
+                use_llm=False
+            )
+            return {
+                "success": True,
+                "explanation": rule_based
+            }
         
         return {
             "success": True,
@@ -205,7 +251,8 @@ async def scoring_health():
         "hybrid_threshold": stats['hybrid_threshold'],
         "llm_provider": stats['llm_provider'],
         "llm_model": stats['llm_model'],
-        "skill_synonyms": stats['skill_synonyms_count']
+        "skill_synonyms": stats['skill_synonyms_count'],
+        "llm_circuit": llm_client.breaker.stats()
     }
 
 
@@ -220,7 +267,13 @@ async def batch_score_candidates(
     resumes: list[dict],
     job_description: str,
     required_skills: Optional[list[str]] = None,
-    scoring_mode: Optional[str] = Query("hybrid", description="Scoring mode for batch processing")
+    scoring_mode: Optional[str] = Query("hybrid", description="Scoring mode for batch processing"),
+    stream: bool = Query(False, description="Stream results as NDJSON lines while scoring"),
+    top_k: Optional[int] = Query(None, ge=1, description="Return only the K best candidates"),
+    llm_max_calls: Optional[int] = Query(None, ge=0, description="Hybrid mode: enhance at most this many top candidates with the LLM"),
+    llm_max_cost: Optional[float] = Query(None, ge=0, description="Hybrid mode: LLM spend limit in dollars for this batch"),
+    llm_margin: float = Query(0.0, ge=0, description="Hybrid mode: also enhance candidates within this many points below the cut line"),
+    llm_max_margin_calls: Optional[int] = Query(None, ge=0, description="Hybrid mode: extra LLM calls the margin band may add (default 25% of llm_max_calls)")
 ):
     """
     Batch score multiple candidates against a job
@@ -230,51 +283,72 @@ async def batch_score_candidates(
     - Can use hybrid to enhance top candidates only
     - Returns results sorted by score
     
+    With stream=true the response is NDJSON: one {"type": "result"} line
+    per scored resume as soon as its chunk is done, then a final
+    {"type": "summary"} line with totals. Combined with top_k only a
+    bounded heap of the best results is kept and emitted, best first,
+    before the summary.
+    
+    In hybrid mode, llm_max_calls / llm_max_cost replace the fixed score
+    threshold with a per-batch budget: the best candidates by rule-based
+    score are enhanced until the budget is spent, and the batch is
+    re-ranked after blending. Budgets need the whole batch at once, so
+    they cannot be combined with stream=true.
+    
     Args:
         resumes: List of resume objects with 'id' and 'text'
         job_description: Job description text
         required_skills: List of required skills
         scoring_mode: Scoring mode (rule_based recommended for batch)
+        stream: Stream NDJSON instead of one JSON body
+        top_k: Keep only the K best candidates
+        llm_max_calls: LLM call budget (hybrid mode)
+        llm_max_cost: LLM dollar budget (hybrid mode)
+        llm_margin: Margin band below the budget cut line (hybrid mode)
+        llm_max_margin_calls: Cap on extra calls from the margin band (hybrid mode)
         
     Returns:
         Sorted list of candidates with scores
     """
+    llm_budget = LLMBudget(
+        max_calls=llm_max_calls,
+        max_cost=llm_max_cost,
+        margin=llm_margin,
+        max_margin_calls=llm_max_margin_calls
+    )
+    
+    if stream:
+        if llm_budget.limited:
+            raise HTTPException(status_code=400, detail="LLM budgets require stream=false")
+        return StreamingResponse(
+            _stream_batch(resumes, job_description, required_skills, scoring_mode, top_k),
+            media_type="application/x-ndjson"
+        )
+    
     try:
-        results = []
-        
-        for resume in resumes:
-            try:
-                match_result = hybrid_service.calculate_match_score(
-                    resume_text=resume.get('text', ''),
-                    job_description=job_description,
-                    required_skills=required_skills or [],
-                    force_mode=scoring_mode
-                )
-                
-                results.append({
-                    "resume_id": resume.get('id', 'unknown'),
-                    "score": match_result['overall_score'],
-                    "skills_score": match_result['skills_score'],
-                    "experience_score": match_result['experience_score'],
-                    "education_score": match_result['education_score'],
-                    "scoring_method": match_result['scoring_method'],
-                    "api_cost": match_result.get('api_cost', 0.0)
-                })
-                
-            except Exception as e:
-                logger.warning(f"Error scoring resume {resume.get('id')}: {e}")
-                continue
-        
-        # Sort by score descending
-        results.sort(key=lambda x: x['score'], reverse=True)
+        results = await _pool_for_mode(scoring_mode).run(
+            _score_resumes,
+            resumes,
+            job_description,
+            required_skills,
+            scoring_mode,
+            llm_budget
+        )
         
         # Calculate total cost
         total_cost = sum(r['api_cost'] for r in results)
+        scored_count = len(results)
+        
+        # Sort by score descending
+        if top_k:
+            results = heapq.nlargest(top_k, results, key=lambda x: x['score'])
+        else:
+            results.sort(key=lambda x: x['score'], reverse=True)
         
         return {
             "success": True,
             "total_candidates": len(resumes),
-            "scored_candidates": len(results),
+            "scored_candidates": scored_count,
             "results": results,
             "total_api_cost": round(total_cost, 6),
             "scoring_mode": scoring_mode
@@ -283,3 +357,85 @@ async def batch_score_candidates(
     except Exception as e:
         logger.error(f"Error in batch scoring: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson(payload: dict) -> str:
+    """Serialize one NDJSON line"""
+    return json.dumps(payload) + "\n"
+
+
+async def _stream_batch(
+    resumes: list[dict],
+    job_description: str,
+    required_skills: Optional[list[str]],
+    scoring_mode: Optional[str],
+    top_k: Optional[int]
+) -> AsyncIterator[str]:
+    """Score resumes chunk by chunk, yielding NDJSON lines as results are ready"""
+    pool = _pool_for_mode(scoring_mode)
+    chunk_size = max(1, settings.SCORE_STREAM_CHUNK_SIZE)
+    
+    scored_count = 0
+    total_cost = 0.0
+    # Min-heap of (score, -sequence, result): ties keep the earlier resume
+    best: list[tuple] = []
+    error = None
+    
+    try:
+        for start in range(0, len(resumes), chunk_size):
+            chunk_results = await pool.run(
+                _score_resumes,
+                resumes[start:start + chunk_size],
+                job_description,
+                required_skills,
+                scoring_mode
+            )
+            
+            for result in chunk_results:
+                scored_count += 1
+                total_cost += result['api_cost']
+                
+                if top_k:
+                    entry = (result['score'], -scored_count, result)
+                    if len(best) < top_k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                else:
+                    yield _ndjson({"type": "result", **result})
+    except Exception as e:
+        logger.error(f"Error in streaming batch scoring after {scored_count} results: {e}")
+        error = str(e)
+    
+    for _, _, result in sorted(best, key=lambda entry: entry[:2], reverse=True):
+        yield _ndjson({"type": "result", **result})
+    
+    summary = {
+        "type": "summary",
+        "success": error is None,
+        "total_candidates": len(resumes),
+        "scored_candidates": scored_count,
+        "total_api_cost": round(total_cost, 6),
+        "scoring_mode": scoring_mode,
+        "top_k": top_k
+    }
+    if error is not None:
+        summary["error"] = error
+    yield _ndjson(summary)
+
+
+def _score_resumes(
+    resumes: list[dict],
+    job_description: str,
+    required_skills: Optional[list[str]],
+    scoring_mode: Optional[str],
+    llm_budget: Optional[LLMBudget] = None
+) -> list[dict]:
+    """Score a batch of resumes (blocking; run inside an execution pool)"""
+    return hybrid_service.score_batch(
+        resumes,
+        job_description,
+        required_skills=required_skills,
+        force_mode=scoring_mode,
+        llm_budget=llm_budget
+    )
@@ -3,10 +3,12 @@ Search API Routes
 Handles semantic search and candidate ranking endpoints
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Dict, List
 import logging
 
 from app.services.search_service import search_service
+from app.utils.executors import run_cpu, run_io
 from app.models.match import RankCandidatesRequest, RankCandidatesResponse
 from app.models.common import TextInput
 
@@ -20,6 +22,13 @@ class AddResumeRequest(BaseModel):
     resume_text: str
 
 
+class RankStoredCandidatesRequest(RankCandidatesRequest):
+    """Rank candidates request that also accepts IDs of indexed resumes"""
+    resumes: List[Dict] = []
+    resume_ids: List[str] = []
+    index_new: bool = Field(False, description="Add text resumes with new or changed text to the index by ID")
+
+
 @router.post("/similarity")
 async def search_similar_resumes(
     job_description: str,
@@ -36,7 +45,7 @@ async def search_similar_resumes(
         List of similar resumes
     """
     try:
-        results = search_service.search_similar_resumes(job_description, top_k)
+        results = await run_cpu(search_service.search_similar_resumes, job_description, top_k)
         
         return {
             "success": True,
@@ -50,10 +59,15 @@ async def search_similar_resumes(
 
 
 @router.post("/rank-candidates", response_model=RankCandidatesResponse)
-async def rank_candidates(request: RankCandidatesRequest):
+async def rank_candidates(request: RankStoredCandidatesRequest):
     """
     Rank candidates against job description
     
+    Resumes can be passed as texts ('resumes') and/or as IDs of resumes
+    already added via /add-resume ('resume_ids'). Indexed resumes are not
+    re-embedded. With index_new, text resumes that are not indexed yet (or
+    whose text changed) are added so later requests can pass their IDs.
+    
     Args:
         request: Rank candidates request
         
@@ -61,10 +75,13 @@ async def rank_candidates(request: RankCandidatesRequest):
         Ranked list of candidates
     """
     try:
-        ranked = search_service.rank_candidates(
+        ranked = await run_cpu(
+            search_service.rank_candidates,
             request.job_description,
             request.resumes,
-            request.top_n
+            request.top_n,
+            request.resume_ids,
+            request.index_new
         )
         
         return RankCandidatesResponse(
@@ -84,9 +101,14 @@ async def rank_candidates(request: RankCandidatesRequest):
 
 
 @router.get("/vector-stats")
-async def get_vector_stats():
-    """Get vector store statistics"""
-    return search_service.get_stats()
+async def get_vector_stats(recall: bool = False):
+    """
+    Get vector store statistics
+    
+    Args:
+        recall: Also measure recall@10 of the index against exact search
+    """
+    return await run_cpu(search_service.get_stats, recall)
 
 
 @router.post("/add-resume")
@@ -101,12 +123,12 @@ async def add_resume_to_index(request: AddResumeRequest):
         Success response
     """
     try:
-        search_service.add_resume(request.resume_id, request.resume_text)
+        replaced = await run_cpu(search_service.add_resume, request.resume_id, request.resume_text)
         
         return {
             "success": True,
-            "message": f"Resume {request.resume_id} added to index",
-            "total_resumes": len(search_service.resume_ids)
+            "message": f"Resume {request.resume_id} {'updated in' if replaced else 'added to'} index",
+            "total_resumes": search_service.total_resumes
         }
         
     except Exception as e:
@@ -114,11 +136,33 @@ async def add_resume_to_index(request: AddResumeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.delete("/resume/{resume_id}")
+async def delete_resume_from_index(resume_id: str):
+    """
+    Remove resume from search index
+    
+    Args:
+        resume_id: Resume identifier
+        
+    Returns:
+        Success response
+    """
+    removed = await run_cpu(search_service.delete_resume, resume_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Resume {resume_id} not found in index")
+    
+    return {
+        "success": True,
+        "message": f"Resume {resume_id} removed from index",
+        "total_resumes": search_service.total_resumes
+    }
+
+
 @router.post("/save-index")
 async def save_index():
     """Save vector index to disk"""
     try:
-        search_service.save_index()
+        await run_io(search_service.save_index)
         return {"success": True, "message": "Index saved"}
     except Exception as e:
         logger.error(f"Error saving index: {e}")
@@ -132,5 +176,5 @@ async def search_health():
         "status": "healthy",
         "service": "search",
         "index_loaded": search_service.index is not None,
-        "total_resumes": len(search_service.resume_ids)
+        "total_resumes": search_service.total_resumes
     }
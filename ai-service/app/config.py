@@ -34,10 +34,30 @@ class Settings(BaseSettings):
     # AI Model Configuration
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    GEMINI_API_ENDPOINT: Optional[str] = os.getenv("GEMINI_API_ENDPOINT")  # Override, e.g. local stub server
+    
+    # LLM Call Limits
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # Concurrent Gemini calls
+    LLM_JOB_MAX_CONCURRENCY: int = int(os.getenv("LLM_JOB_MAX_CONCURRENCY", 2))  # Of those, calls bulk jobs may hold
+    LLM_REQUESTS_PER_MINUTE: float = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 300))  # 0 disables
+    LLM_TOKENS_PER_MINUTE: float = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1000000))  # 0 disables
+    LLM_HEDGE_AFTER_SECONDS: float = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", 15))  # Duplicate slow calls (0 disables)
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 1))  # Retries of failed calls within the deadline
+    
+    # LLM Circuit Breaker (fail fast to rule-based paths while Gemini is down or slow)
+    LLM_BREAKER_FAILURE_RATE: float = float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5))
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", 20))  # 0 disables
+    LLM_BREAKER_SLOW_CALL_RATE: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", 0.8))
+    LLM_BREAKER_WINDOW: int = int(os.getenv("LLM_BREAKER_WINDOW", 20))  # Recent calls considered
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", 5))
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 30))  # Before half-open probing
     
     # Scoring Configuration
     SCORING_MODE: str = os.getenv("SCORING_MODE", "hybrid")  # rule_based, hybrid, or llm_only
     HYBRID_LLM_THRESHOLD: float = float(os.getenv("HYBRID_LLM_THRESHOLD", "70.0"))  # Score threshold for LLM enhancement
+    SCORE_STREAM_CHUNK_SIZE: int = int(os.getenv("SCORE_STREAM_CHUNK_SIZE", 50))  # Resumes scored per step in streaming batch mode
+    LLM_PACK_SIZE: int = int(os.getenv("LLM_PACK_SIZE", 1))  # Resumes per LLM call in batch scoring (1 = no packing)
+    LLM_PACK_RESUME_CHARS: int = int(os.getenv("LLM_PACK_RESUME_CHARS", 1500))  # Resume truncation in packed prompts
     
     # Processing Limits
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # 10MB
@@ -45,6 +65,29 @@ class Settings(BaseSettings):
     MAX_TEXT_LENGTH: int = int(os.getenv("MAX_TEXT_LENGTH", 50000))
     MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("MAX_REQUESTS_PER_MINUTE", 60))
     
+    # Embedding micro-batching
+    EMBEDDING_BATCH_ENABLED: bool = os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true"
+    EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 32))
+    
+    # Execution pools (blocking work is kept off the event loop)
+    IO_POOL_WORKERS: int = int(os.getenv("IO_POOL_WORKERS", 32))  # LLM calls, disk I/O
+    CPU_POOL_WORKERS: int = int(os.getenv("CPU_POOL_WORKERS", min(4, os.cpu_count() or 1)))  # Encode, parse, score
+    
+    # Document parsing process pool (PDF/DOCX extraction runs in worker processes)
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))  # 0 parses in the CPU pool
+    PARSE_QUEUE_SIZE: int = int(os.getenv("PARSE_QUEUE_SIZE", 32))  # Waiting documents before 503
+    PARSE_START_METHOD: str = os.getenv("PARSE_START_METHOD", "forkserver")  # forkserver, spawn or fork (unsafe with threads)
+    PARSE_WORKER_MAX_TASKS: int = int(os.getenv("PARSE_WORKER_MAX_TASKS", 500))  # Recycle worker after N (0 = never)
+    PARSE_MEMORY_MAX_BYTES: int = int(os.getenv("PARSE_MEMORY_MAX_BYTES", 8 * 1024 * 1024))  # Larger uploads spill to TEMP_DIR
+    PDF_EXTRACTORS: str = os.getenv("PDF_EXTRACTORS", "pymupdf,pdfplumber")  # Fast first; later ones re-read failing pages
+    PDF_QUALITY_MIN_CHARS: int = int(os.getenv("PDF_QUALITY_MIN_CHARS", 30))  # Per page
+    PDF_QUALITY_MAX_GARBAGE_RATIO: float = float(os.getenv("PDF_QUALITY_MAX_GARBAGE_RATIO", "0.05"))
+    PDF_QUALITY_MIN_WORD_COVERAGE: float = float(os.getenv("PDF_QUALITY_MIN_WORD_COVERAGE", "0.5"))
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", 0))  # Stop after N pages (0 = all)
+    PDF_MAX_CHARS: int = int(os.getenv("PDF_MAX_CHARS", MAX_TEXT_LENGTH))  # Stop once N characters are extracted (0 = all)
+    PDF_PARALLEL_PAGES: int = int(os.getenv("PDF_PARALLEL_PAGES", 8))  # Longer PDFs are split across workers in chunks of N pages (0 disables)
+    
     # Paths
     BASE_DIR: Path = Path(__file__).parent.parent
     TEMP_DIR: Path = BASE_DIR / "temp"
@@ -54,11 +97,43 @@ class Settings(BaseSettings):
     VECTOR_STORE: str = os.getenv("VECTOR_STORE", "faiss")
     VECTOR_STORE_PATH: str = os.getenv("VECTOR_STORE_PATH", "./vector_store")
     VECTOR_DIM: int = 384  # Dimension for all-MiniLM-L6-v2
-    VECTOR_INDEX_TYPE: str = "Flat"  # FAISS index type
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "Flat")  # FAISS index type: Flat, HNSW or IVF-PQ
+    VECTOR_HNSW_M: int = int(os.getenv("VECTOR_HNSW_M", 32))
+    VECTOR_HNSW_EF_CONSTRUCTION: int = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", 200))
+    VECTOR_HNSW_EF_SEARCH: int = int(os.getenv("VECTOR_HNSW_EF_SEARCH", 64))
+    VECTOR_IVF_NLIST: int = int(os.getenv("VECTOR_IVF_NLIST", 0))  # 0 = 4 * sqrt(n) at training time
+    VECTOR_IVF_NPROBE: int = int(os.getenv("VECTOR_IVF_NPROBE", 16))
+    VECTOR_PQ_M: int = int(os.getenv("VECTOR_PQ_M", 48))  # Sub-quantizers; must divide VECTOR_DIM
+    VECTOR_PQ_NBITS: int = int(os.getenv("VECTOR_PQ_NBITS", 8))
+    VECTOR_IVF_MIN_TRAIN: int = int(os.getenv("VECTOR_IVF_MIN_TRAIN", 5000))  # Stay Flat below this size
+    VECTOR_IVF_RETRAIN_FACTOR: float = float(os.getenv("VECTOR_IVF_RETRAIN_FACTOR", "2.0"))
+    VECTOR_RECALL_SAMPLE: int = int(os.getenv("VECTOR_RECALL_SAMPLE", 100))  # Queries for recall vs Flat
+    VECTOR_INDEX_MMAP: bool = os.getenv("VECTOR_INDEX_MMAP", "true").lower() == "true"  # Memory-map snapshot on load
+    VECTOR_SNAPSHOTS_TO_KEEP: int = int(os.getenv("VECTOR_SNAPSHOTS_TO_KEEP", 2))
     
     # Cache Configuration
     ENABLE_CACHE: bool = os.getenv("ENABLE_CACHE", "true").lower() == "true"
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", 3600))
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))  # In-memory LRU entries
+    EMBEDDING_CACHE_DISK: bool = os.getenv("EMBEDDING_CACHE_DISK", "true").lower() == "true"
+    EMBEDDING_CACHE_DISK_MAX: int = int(os.getenv("EMBEDDING_CACHE_DISK_MAX", 100000))  # Files kept on disk
+    EMBEDDING_CACHE_DIR: Path = VECTOR_STORE_DIR / "embedding_cache"
+    JOB_PROFILE_CACHE_SIZE: int = int(os.getenv("JOB_PROFILE_CACHE_SIZE", 256))  # Precomputed job requirements
+    RESUME_PROFILE_CACHE_SIZE: int = int(os.getenv("RESUME_PROFILE_CACHE_SIZE", 20000))  # Extracted resume features
+    RESUME_PROFILE_PERSIST: bool = os.getenv("RESUME_PROFILE_PERSIST", "true").lower() == "true"
+    RESUME_PROFILE_DISK_MAX: int = int(os.getenv("RESUME_PROFILE_DISK_MAX", 200000))
+    RESUME_PROFILE_DB: Path = VECTOR_STORE_DIR / "resume_profiles.db"
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", 5000))  # In-memory LLM responses
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    LLM_CACHE_PERSIST: bool = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+    LLM_CACHE_DISK_MAX: int = int(os.getenv("LLM_CACHE_DISK_MAX", 100000))
+    LLM_CACHE_DB: Path = VECTOR_STORE_DIR / "llm_responses.db"
+    DOCUMENT_STORE_ENABLED: bool = os.getenv("DOCUMENT_STORE_ENABLED", "true").lower() == "true"
+    DOCUMENT_STORE_SIZE: int = int(os.getenv("DOCUMENT_STORE_SIZE", 1000))  # In-memory parse results
+    DOCUMENT_STORE_PERSIST: bool = os.getenv("DOCUMENT_STORE_PERSIST", "true").lower() == "true"
+    DOCUMENT_STORE_DISK_MAX: int = int(os.getenv("DOCUMENT_STORE_DISK_MAX", 100000))
+    DOCUMENT_STORE_DB: Path = VECTOR_STORE_DIR / "documents.db"
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -67,6 +142,12 @@ class Settings(BaseSettings):
     LLM_TIMEOUT: int = int(os.getenv("LLM_TIMEOUT", 60))
     PARSE_TIMEOUT: int = int(os.getenv("PARSE_TIMEOUT", 30))
     
+    # Background Jobs
+    JOB_MAX_CONCURRENT: int = int(os.getenv("JOB_MAX_CONCURRENT", 2))  # Jobs running at once (and jobs pool size)
+    JOB_CHUNK_SIZE: int = int(os.getenv("JOB_CHUNK_SIZE", 200))  # Items per progress step
+    JOB_RESULT_TTL_SECONDS: int = int(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+    JOB_MAX_RETAINED: int = int(os.getenv("JOB_MAX_RETAINED", 100))  # Finished jobs kept for polling
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -10,7 +10,8 @@ import logging
 import time
 
 from app.config import settings
-from app.api import parsing, embeddings, search, scoring, interview
+from app.api import parsing, embeddings, search, scoring, interview, jobs
+from app.utils.executors import get_executor_stats, shutdown_executors
 
 # Configure logging
 logging.basicConfig(
@@ -37,10 +38,29 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to load embedding model: {e}")
     
+    try:
+        # Pre-start document parsing workers
+        from app.services.parse_pool import parse_pool
+        parse_pool.start()
+    except Exception as e:
+        logger.error(f"Failed to start parse pool: {e}")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down AI Service...")
+    try:
+        from app.services.search_service import search_service
+        search_service.save_index()
+    except Exception as e:
+        logger.error(f"Failed to save vector index on shutdown: {e}")
+    from app.services.job_queue import job_queue
+    from app.services.llm_client import llm_client
+    from app.services.parse_pool import parse_pool
+    job_queue.shutdown()
+    llm_client.shutdown()
+    parse_pool.shutdown()
+    shutdown_executors()
 
 
 # Create FastAPI application
@@ -111,7 +131,8 @@ async def health_check():
         "environment": settings.ENVIRONMENT,
         "llm_provider": "gemini",
         "llm_model": settings.GEMINI_MODEL,
-        "embedding_model": settings.EMBEDDING_MODEL
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "executors": get_executor_stats()
     }
 
 
@@ -126,7 +147,8 @@ async def api_info():
             "embeddings": "/api/embeddings",
             "search": "/api/search",
             "scoring": "/api/score",
-            "interview": "/api/interview"
+            "interview": "/api/interview",
+            "jobs": "/api/jobs"
         },
         "documentation": {
             "swagger": "/docs",
@@ -141,6 +163,7 @@ app.include_router(embeddings.router, prefix="/api/embeddings", tags=["Embedding
 app.include_router(search.router, prefix="/api/search", tags=["Search"])
 app.include_router(scoring.router, prefix="/api/score", tags=["Scoring"])
 app.include_router(interview.router, prefix="/api/interview", tags=["Interview"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
 
 
 if __name__ == "__main__":
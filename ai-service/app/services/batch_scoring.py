@@ -0,0 +1,193 @@
+"""
+Batch Scoring Engine
+Columnar, NumPy-vectorized rule-based scoring of many resumes against one job
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.rule_based_scoring import SKILL_SYNONYMS, JobProfile, ResumeProfile
+
+logger = logging.getLogger(__name__)
+
+# Canonical skill vocabulary; resume skills are always drawn from it
+SKILL_VOCABULARY = list(SKILL_SYNONYMS)
+SKILL_INDEX = {skill: i for i, skill in enumerate(SKILL_VOCABULARY)}
+
+# Same hierarchy as RuleBasedScoring._calculate_education_score
+EDUCATION_RANK = {
+    'phd': 5,
+    'masters': 4,
+    'bachelors': 3,
+    'associates': 2,
+    'diploma': 1,
+    'none': 0
+}
+
+# Number of set bits for every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _pack_skills(skill_sets: Sequence[Sequence[str]]) -> np.ndarray:
+    """Encode skill sets as packed bit vectors, shape (N, ceil(V / 8))"""
+    dense = np.zeros((len(skill_sets), len(SKILL_VOCABULARY)), dtype=bool)
+    rows, cols = [], []
+    for row, skills in enumerate(skill_sets):
+        for skill in skills:
+            col = SKILL_INDEX.get(skill)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    dense[rows, cols] = True
+    return np.packbits(dense, axis=1)
+
+
+@dataclass
+class ResumeMatrix:
+    """Columnar resume features, reusable across jobs"""
+    skill_bits: np.ndarray        # (N, ceil(V / 8)) uint8
+    skill_counts: np.ndarray      # (N,) number of canonical skills
+    years: np.ndarray             # (N,) years of experience
+    education_rank: np.ndarray    # (N,) rank from EDUCATION_RANK
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[ResumeProfile]) -> "ResumeMatrix":
+        """
+        Build matrix from resume profiles
+
+        Args:
+            profiles: Resume profiles in row order
+
+        Returns:
+            ResumeMatrix with one row per profile
+        """
+        return cls(
+            skill_bits=_pack_skills([profile.skills for profile in profiles]),
+            skill_counts=np.fromiter((len(p.skills) for p in profiles), dtype=np.int64, count=len(profiles)),
+            years=np.fromiter((p.years for p in profiles), dtype=np.float64, count=len(profiles)),
+            education_rank=np.fromiter(
+                (EDUCATION_RANK.get(p.education, 0) for p in profiles), dtype=np.int64, count=len(profiles)
+            )
+        )
+
+
+class BatchScorer:
+    """
+    Vectorized counterpart of RuleBasedScoring.calculate_overall_match_score
+
+    Every component score follows the same branches and floating-point
+    operations as the scalar functions, so results are identical.
+    """
+
+    def skills_scores(self, matrix: ResumeMatrix, job_profile: JobProfile) -> np.ndarray:
+        """Mirror of RuleBasedScoring._calculate_skills_score"""
+        job_count = len(job_profile.skills)
+        if job_count == 0:
+            return np.full(len(matrix), 85.0)
+
+        # Job skills outside the vocabulary never match but still count
+        job_bits = _pack_skills([job_profile.skills])[0]
+        matched = _POPCOUNT[matrix.skill_bits & job_bits].sum(axis=1, dtype=np.int64)
+
+        base_score = matched / job_count * 100
+        extra_skills = matrix.skill_counts - job_count
+        bonus = np.where(extra_skills > 0, np.minimum(extra_skills * 2, 10), 0)
+        scores = np.minimum(base_score + bonus, 100.0)
+
+        return np.where(matrix.skill_counts == 0, 20.0, scores)
+
+    def experience_scores(self, matrix: ResumeMatrix, job_profile: JobProfile) -> np.ndarray:
+        """Mirror of RuleBasedScoring._calculate_experience_score"""
+        required = job_profile.required_years
+        if required == 0:
+            return np.full(len(matrix), 80.0)
+
+        years = matrix.years
+        with np.errstate(divide="ignore", invalid="ignore"):
+            above = 85 + (15 * (required / years))
+            below = (years / required) * 85
+        scores = np.minimum(np.where(years >= required, above, below), 100.0)
+
+        return np.where(years == 0, 30.0, scores)
+
+    def education_scores(self, matrix: ResumeMatrix, job_profile: JobProfile) -> np.ndarray:
+        """Mirror of RuleBasedScoring._calculate_education_score"""
+        required_rank = EDUCATION_RANK.get(job_profile.required_education, 0)
+        if required_rank == 0:
+            return np.full(len(matrix), 80.0)
+
+        ranks = matrix.education_rank
+        below = np.maximum(40.0, 100.0 - ((required_rank - ranks) * 20))
+        scores = np.where(ranks >= required_rank, 100.0, below)
+
+        return np.where(ranks == 0, 40.0, scores)
+
+    def score(self, matrix: ResumeMatrix, job_profile: JobProfile) -> Dict[str, np.ndarray]:
+        """
+        Score every resume row against one job
+
+        Args:
+            matrix: Columnar resume features
+            job_profile: Precomputed job profile
+
+        Returns:
+            Unrounded overall, skills, experience and education score arrays
+        """
+        skills = self.skills_scores(matrix, job_profile)
+        experience = self.experience_scores(matrix, job_profile)
+        education = self.education_scores(matrix, job_profile)
+
+        overall = np.minimum(
+            skills * 0.50 +
+            experience * 0.30 +
+            education * 0.20,
+            100.0
+        )
+
+        return {
+            "overall_score": overall,
+            "skills_score": skills,
+            "experience_score": experience,
+            "education_score": education
+        }
+
+    def score_profiles(
+        self,
+        profiles: Sequence[ResumeProfile],
+        job_profile: JobProfile,
+        matrix: Optional[ResumeMatrix] = None
+    ) -> List[Dict[str, float]]:
+        """
+        Score resume profiles and return per-resume score dicts
+
+        Scores are rounded with Python's round() exactly like the scalar
+        scorer; the vectorized arrays are kept unrounded until then.
+
+        Args:
+            profiles: Resume profiles
+            job_profile: Precomputed job profile
+            matrix: Prebuilt matrix for profiles (optional)
+
+        Returns:
+            List of score dicts in profile order
+        """
+        if not profiles:
+            return []
+
+        matrix = matrix if matrix is not None else ResumeMatrix.from_profiles(profiles)
+        scores = self.score(matrix, job_profile)
+        names = list(scores)
+        columns = [[round(value, 2) for value in scores[name].tolist()] for name in names]
+
+        logger.debug(f"Vectorized scoring of {len(profiles)} resumes")
+
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+# Global instance
+batch_scorer = BatchScorer()
@@ -0,0 +1,198 @@
+"""
+Document Artifact Store
+Content-addressed store of everything derived from an uploaded document
+(parse result, embedding, rule-based profile) keyed by the SHA-256 of its
+bytes, with an in-memory LRU tier and an SQLite tier
+"""
+import base64
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
+import numpy as np
+
+from app.config import settings
+from app.models.resume import ParsedResume
+from app.services.resume_profile_cache import ResumeProfile
+from app.utils.cache import TieredCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when parsing rules change so stale persisted results are ignored
+DOCUMENT_STORE_VERSION = "v2"
+
+# Read size when hashing spilled uploads
+_HASH_CHUNK = 1024 * 1024
+
+
+def document_digest(source: Union[bytes, Path]) -> str:
+    """
+    SHA-256 of an uploaded document
+
+    Args:
+        source: Document bytes or path of a spilled upload
+
+    Returns:
+        Hex digest
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parser_fingerprint(file_type: str) -> str:
+    """Settings that change extracted text, so results from other settings are not reused"""
+    if file_type == "pdf":
+        return "|".join(str(value) for value in (
+            settings.PDF_EXTRACTORS,
+            settings.PDF_MAX_PAGES,
+            settings.PDF_MAX_CHARS,
+            settings.PDF_QUALITY_MIN_CHARS,
+            settings.PDF_QUALITY_MAX_GARBAGE_RATIO,
+            settings.PDF_QUALITY_MIN_WORD_COVERAGE
+        ))
+    return ""
+
+
+@dataclass
+class DocumentArtifacts:
+    """Everything derived from one uploaded document"""
+    resume: ParsedResume  # Includes the extracted text
+    parse_seconds: float = 0.0  # Time the parse took, credited on every hit
+    embedding: Optional[np.ndarray] = None  # Embedding of the extracted text
+    embedding_key: Optional[str] = None  # EmbeddingCache key it was computed under
+    profile: Optional[ResumeProfile] = None  # Rule-based scoring features
+
+    def copy(self) -> "DocumentArtifacts":
+        """Copy whose resume callers may modify"""
+        return DocumentArtifacts(
+            self.resume.copy(deep=True),
+            self.parse_seconds,
+            self.embedding,
+            self.embedding_key,
+            self.profile
+        )
+
+
+class DocumentArtifactStore(TieredCache):
+    """
+    Two-tier store of document artifacts per uploaded document
+
+    Each entry holds the ParsedResume (including the extracted text), the
+    time its parse took, and the embedding and rule-based profile of the
+    extracted text once they are filled in. The embedding and profile live
+    as long as the document entry, so a re-uploaded document skips every
+    stage even after EmbeddingCache or ResumeProfileCache expired them.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 100000
+    ):
+        """
+        Initialize document store
+
+        Args:
+            max_entries: Maximum documents kept in memory
+            db_path: SQLite file for the persistent tier (None disables it)
+            max_disk_entries: Maximum rows kept on disk (oldest are pruned)
+        """
+        super().__init__(
+            "document",
+            "documents",
+            max_entries=max_entries,
+            db_path=db_path,
+            max_disk_entries=max_disk_entries
+        )
+
+    def serialize(self, artifacts: DocumentArtifacts) -> str:
+        """Serialize artifacts as JSON (embedding as base64 float32)"""
+        payload = {"resume": artifacts.resume.dict(), "parse_seconds": artifacts.parse_seconds}
+        if artifacts.embedding is not None:
+            payload["embedding_key"] = artifacts.embedding_key
+            payload["embedding"] = base64.b64encode(
+                np.asarray(artifacts.embedding, dtype=np.float32).tobytes()
+            ).decode("ascii")
+        if artifacts.profile is not None:
+            payload["profile_key"] = artifacts.profile.key
+            payload["profile"] = artifacts.profile.to_json()
+        return json.dumps(payload, default=str)
+
+    def deserialize(self, key: str, data: str) -> DocumentArtifacts:
+        """Rebuild artifacts from JSON"""
+        payload = json.loads(data)
+        artifacts = DocumentArtifacts(ParsedResume(**payload["resume"]), float(payload["parse_seconds"]))
+        if "embedding" in payload:
+            artifacts.embedding = np.frombuffer(base64.b64decode(payload["embedding"]), dtype=np.float32)
+            artifacts.embedding_key = payload["embedding_key"]
+        if "profile" in payload:
+            artifacts.profile = ResumeProfile.from_json(payload["profile_key"], payload["profile"])
+        return artifacts
+
+    def key(self, digest: str, file_type: str) -> str:
+        """
+        Build store key for a document
+
+        Args:
+            digest: SHA-256 of the document bytes (see document_digest)
+            file_type: Document type ("pdf" or "docx")
+
+        Returns:
+            Hex key
+        """
+        return content_hash(DOCUMENT_STORE_VERSION, file_type, _parser_fingerprint(file_type), digest)
+
+    def get(self, key: str) -> Optional[DocumentArtifacts]:
+        """
+        Look up a document's artifacts, promoting disk hits into memory
+
+        Args:
+            key: Key from key()
+
+        Returns:
+            Copy of the stored artifacts or None on miss
+        """
+        artifacts = super().get(key)
+        return artifacts.copy() if artifacts is not None else None
+
+    def put(self, key: str, artifacts: DocumentArtifacts):
+        """
+        Store a document's artifacts (again after filling in more of them)
+
+        Args:
+            key: Key from key()
+            artifacts: Artifacts; parse_seconds is credited on every hit
+        """
+        super().put(key, artifacts.copy(), artifacts.parse_seconds)
+
+    def stats(self) -> Dict:
+        """Return hit rate, parse time saved and tier sizes"""
+        stats = super().stats()
+        stats["parse_seconds_saved"] = round(stats.pop("cost_saved"), 3)
+        return stats
+
+
+def create_document_store() -> Optional[DocumentArtifactStore]:
+    """Build document store from settings (None when caching is disabled)"""
+    if not (settings.ENABLE_CACHE and settings.DOCUMENT_STORE_ENABLED):
+        logger.info("Document store disabled")
+        return None
+
+    return DocumentArtifactStore(
+        max_entries=settings.DOCUMENT_STORE_SIZE,
+        db_path=settings.DOCUMENT_STORE_DB if settings.DOCUMENT_STORE_PERSIST else None,
+        max_disk_entries=settings.DOCUMENT_STORE_DISK_MAX
+    )
+
+
+# Global instance (None when disabled)
+document_store = create_document_store()
@@ -0,0 +1,238 @@
+"""
+Embedding Cache
+Content-addressed cache for embedding vectors with an in-memory LRU tier
+and an optional on-disk tier of .npy files
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+from app.config import settings
+from app.utils.cache import LRUCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored vector format changes (v2: L2-normalized float32)
+CACHE_KEY_VERSION = "v2"
+
+# Prune the disk tier every N writes
+_PRUNE_EVERY = 500
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Cache key of an embedding of already-truncated text"""
+    return content_hash(CACHE_KEY_VERSION, model_name, text)
+
+
+class EmbeddingCache:
+    """Two-tier cache keyed by hash of (model name, text)"""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[int] = None,
+        disk_dir: Optional[Path] = None,
+        max_disk_entries: int = 100000
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            model_name: Embedding model name (part of every key)
+            max_entries: Maximum vectors kept in memory
+            ttl_seconds: Entry lifetime for both tiers (optional)
+            disk_dir: Directory for the on-disk tier (None disables it)
+            max_disk_entries: Maximum vectors kept on disk (oldest are pruned)
+        """
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.memory = LRUCache(max_size=max_entries, ttl_seconds=self.ttl_seconds)
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_pruned = 0
+        self._disk_lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._prune_thread: Optional[threading.Thread] = None
+
+        if self.disk_dir is not None:
+            try:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Embedding disk cache disabled: {e}")
+                self.disk_dir = None
+            else:
+                self._schedule_prune()
+
+    def make_key(self, text: str) -> str:
+        """Build cache key for already-truncated text"""
+        return embedding_key(self.model_name, text)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a vector, promoting disk hits into memory
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Embedding vector or None on miss
+        """
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = self._read_disk(key)
+        if vector is not None:
+            self.disk_hits += 1
+            self.memory.set(key, vector)
+        return vector
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up several vectors at once"""
+        return [self.get(key) for key in keys]
+
+    def put(self, key: str, vector: np.ndarray):
+        """Store vector in memory and, if enabled, on disk"""
+        # Copy so a row of an encoded batch does not keep the whole batch alive
+        vector = np.array(vector, dtype=np.float32)
+        self.memory.set(key, vector)
+        self._write_disk(key, vector)
+
+    def clear(self):
+        """Clear both tiers"""
+        self.memory.clear()
+        if self.disk_dir is None:
+            return
+        with self._disk_lock:
+            try:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Error clearing embedding disk cache: {e}")
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        stats = self.memory.stats()
+        stats.update({
+            "disk_enabled": self.disk_dir is not None,
+            "disk_hits": self.disk_hits,
+            "disk_writes": self.disk_writes,
+            "disk_pruned": self.disk_pruned,
+            "max_disk_entries": self.max_disk_entries
+        })
+        # Disk hits are counted as memory misses; report the combined view
+        stats["hits"] += self.disk_hits
+        stats["misses"] = max(0, stats["misses"] - self.disk_hits)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _disk_path(self, key: str) -> Path:
+        """Shard files by key prefix to keep directories small"""
+        return self.disk_dir / key[:2] / f"{key}.npy"
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        """Read vector from disk tier with np.load"""
+        if self.disk_dir is None:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if self.ttl_seconds is not None and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return np.load(path).astype(np.float32, copy=False)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error reading cached embedding {key[:12]}: {e}")
+            return None
+
+    def _write_disk(self, key: str, vector: np.ndarray):
+        """Write vector atomically (temp file + rename)"""
+        if self.disk_dir is None:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npy")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            np.save(tmp_path, vector)
+            os.replace(tmp_path, path)
+            self.disk_writes += 1
+            if self.disk_writes % _PRUNE_EVERY == 0:
+                self._schedule_prune()
+        except Exception as e:
+            logger.warning(f"Error writing cached embedding {key[:12]}: {e}")
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _schedule_prune(self):
+        """Prune the disk tier on a background thread (one at a time)"""
+        with self._prune_lock:
+            if self._prune_thread is not None and self._prune_thread.is_alive():
+                return
+            self._prune_thread = threading.Thread(target=self._prune, name="embedding-cache-prune", daemon=True)
+            self._prune_thread.start()
+
+    def _prune(self):
+        """Delete expired files and the oldest files beyond max_disk_entries"""
+        if not self._disk_lock.acquire(blocking=False):
+            return  # Another thread is already pruning or clearing
+        try:
+            entries = []
+            for shard in os.scandir(self.disk_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".npy") and not entry.name.startswith("."):
+                        try:
+                            entries.append((entry.stat().st_mtime, entry.path))
+                        except FileNotFoundError:
+                            pass
+
+            entries.sort()
+            expired = 0
+            if self.ttl_seconds is not None:
+                cutoff = time.time() - self.ttl_seconds
+                while expired < len(entries) and entries[expired][0] < cutoff:
+                    expired += 1
+            excess = max(expired, len(entries) - self.max_disk_entries)
+
+            for _, path in entries[:excess]:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            if excess:
+                self.disk_pruned += excess
+                logger.info(f"Pruned {excess} cached embeddings from disk")
+        except OSError as e:
+            logger.warning(f"Error pruning embedding disk cache: {e}")
+        finally:
+            self._disk_lock.release()
+
+
+def create_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Build embedding cache from settings (None when caching is disabled)"""
+    if not settings.ENABLE_CACHE:
+        logger.info("Embedding cache disabled (ENABLE_CACHE=false)")
+        return None
+
+    return EmbeddingCache(
+        model_name=model_name,
+        max_entries=settings.EMBEDDING_CACHE_SIZE,
+        ttl_seconds=settings.CACHE_TTL_SECONDS,
+        disk_dir=settings.EMBEDDING_CACHE_DIR if settings.EMBEDDING_CACHE_DISK else None,
+        max_disk_entries=settings.EMBEDDING_CACHE_DISK_MAX
+    )
@@ -3,15 +3,32 @@ Embedding Service
 Generates vector embeddings using Sentence Transformers
 """
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from app.config import settings
+from app.services.embedding_cache import create_embedding_cache, embedding_key
+from app.utils.batching import MicroBatcher
+from app.utils.executors import cpu_pool
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+def similarity_to_score(similarity):
+    """
+    Map cosine similarity [-1, 1] to the 0-1 score scale used across the service
+    
+    Args:
+        similarity: Cosine similarity (scalar or NumPy array)
+        
+    Returns:
+        Score in [0, 1] with the same shape as the input
+    """
+    return np.clip((similarity + 1) / 2, 0.0, 1.0)
+
+
 class EmbeddingService:
     """Service for generating embeddings"""
     
@@ -19,6 +36,16 @@ class EmbeddingService:
         """Initialize embedding service"""
         self.model = None
         self.model_name = settings.EMBEDDING_MODEL
+        self.cache = create_embedding_cache(self.model_name)
+        self.batcher = MicroBatcher(
+            self._encode_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+            name="embedding",
+            executor=cpu_pool
+        )
+        # Concurrent requests for the same text share one encode
+        self.flights = SingleFlight("embedding")
         self._load_model()
     
     def _load_model(self):
@@ -30,6 +57,41 @@ class EmbeddingService:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
+    def _encode(self, texts, **kwargs) -> np.ndarray:
+        """Encode to L2-normalized float32 vectors, so cosine similarity is a dot product"""
+        embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, **kwargs)
+        return embeddings.astype(np.float32, copy=False)
+    
+    def _truncate(self, text: str) -> str:
+        """Truncate text to MAX_TEXT_LENGTH"""
+        if len(text) > settings.MAX_TEXT_LENGTH:
+            logger.warning(f"Text truncated to {settings.MAX_TEXT_LENGTH} characters")
+            return text[:settings.MAX_TEXT_LENGTH]
+        return text
+    
+    def embedding_key(self, text: str) -> str:
+        """
+        Key of a text's embedding (covers model, vector format and truncation)
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Hex key, the same one the cache uses
+        """
+        return embedding_key(self.model_name, text[:settings.MAX_TEXT_LENGTH])
+    
+    def restore_embedding(self, key: str, embedding: np.ndarray):
+        """
+        Put an embedding kept elsewhere back into the cache unless it is there
+        
+        Args:
+            key: Key from embedding_key()
+            embedding: L2-normalized float32 vector
+        """
+        if self.cache is not None and self.cache.get(key) is None:
+            self.cache.put(key, embedding)
+    
     def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for single text
@@ -44,17 +106,82 @@ class EmbeddingService:
             raise RuntimeError("Embedding model not loaded")
         
         try:
-            # Truncate text if too long
-            if len(text) > settings.MAX_TEXT_LENGTH:
-                text = text[:settings.MAX_TEXT_LENGTH]
-                logger.warning(f"Text truncated to {settings.MAX_TEXT_LENGTH} characters")
+            text = self._truncate(text)
+            
+            key = None
+            if self.cache is not None:
+                key = self.cache.make_key(text)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached.tolist()
+            
+            embedding = self.flights.do(key or text, self._encode_and_cache, text, key)
+            
+            return embedding.tolist()
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            raise
+    
+    def _encode_and_cache(self, text: str, key: Optional[str]) -> np.ndarray:
+        """Encode one text and store it in the cache (single-flight leader)"""
+        embedding = self._encode(text)
+        if key is not None:
+            self.cache.put(key, embedding)
+        return embedding
+    
+    async def generate_embedding_async(self, text: str) -> List[float]:
+        """
+        Generate embedding for single text via the micro-batching queue
+        
+        Concurrent callers are grouped into one model.encode call, so this
+        is the preferred entry point for request handlers.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Embedding vector as list of floats
+        """
+        if not self.model:
+            raise RuntimeError("Embedding model not loaded")
+        
+        if not settings.EMBEDDING_BATCH_ENABLED:
+            return await cpu_pool.run(self.generate_embedding, text)
+        
+        try:
+            text = self._truncate(text)
+            
+            key = None
+            if self.cache is not None:
+                key = self.cache.make_key(text)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached.tolist()
+            
+            async def submit():
+                embedding = await self.batcher.submit(text)
+                if key is not None:
+                    self.cache.put(key, embedding)
+                return embedding
+            
+            embedding = await self.flights.do_async(key or text, submit)
             
-            embedding = self.model.encode(text, convert_to_numpy=True)
             return embedding.tolist()
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
+    def _encode_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Encode a micro-batch, encoding duplicate texts once"""
+        unique_texts = list(dict.fromkeys(texts))
+        embeddings = self._encode(
+            unique_texts,
+            batch_size=max(len(unique_texts), 1),
+            show_progress_bar=False
+        )
+        by_text = dict(zip(unique_texts, embeddings))
+        return [by_text[text] for text in texts]
+    
     def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for multiple texts
@@ -65,20 +192,57 @@ class EmbeddingService:
         Returns:
             List of embedding vectors
         """
+        return self.generate_embeddings_matrix(texts).tolist()
+    
+    def generate_embeddings_matrix(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts as one matrix
+        
+        Only cache misses are sent to the model; duplicate texts within the
+        batch are encoded once.
+        
+        Args:
+            texts: List of input texts
+            
+        Returns:
+            (len(texts), dim) float32 matrix of normalized embeddings
+        """
         if not self.model:
             raise RuntimeError("Embedding model not loaded")
         
+        if not texts:
+            return np.empty((0, settings.VECTOR_DIM), dtype=np.float32)
+        
         try:
-            # Truncate texts if needed
-            truncated_texts = []
-            for text in texts:
-                if len(text) > settings.MAX_TEXT_LENGTH:
-                    truncated_texts.append(text[:settings.MAX_TEXT_LENGTH])
-                else:
-                    truncated_texts.append(text)
-            
-            embeddings = self.model.encode(truncated_texts, convert_to_numpy=True, show_progress_bar=True)
-            return [emb.tolist() for emb in embeddings]
+            truncated_texts = [self._truncate(text) for text in texts]
+            
+            if self.cache is None:
+                return self._encode(truncated_texts, show_progress_bar=True)
+            
+            keys = [self.cache.make_key(text) for text in truncated_texts]
+            results: List[Optional[np.ndarray]] = self.cache.get_many(keys)
+            
+            # Collect unique misses
+            miss_positions: Dict[str, List[int]] = {}
+            miss_texts = []
+            for i, (key, cached) in enumerate(zip(keys, results)):
+                if cached is not None:
+                    continue
+                if key not in miss_positions:
+                    miss_positions[key] = []
+                    miss_texts.append(truncated_texts[i])
+                miss_positions[key].append(i)
+            
+            if miss_texts:
+                logger.info(f"Embedding batch: {len(texts) - sum(len(p) for p in miss_positions.values())} cached, "
+                           f"{len(miss_texts)} to encode")
+                embeddings = self._encode(miss_texts, show_progress_bar=True)
+                for (key, positions), embedding in zip(miss_positions.items(), embeddings):
+                    self.cache.put(key, embedding)
+                    for i in positions:
+                        results[i] = embedding
+            
+            return np.vstack(results).astype(np.float32, copy=False)
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
             raise
@@ -87,22 +251,21 @@ class EmbeddingService:
         """
         Compute cosine similarity between two embeddings
         
+        Embeddings produced by this service are L2-normalized, so cosine
+        similarity is a single dot product.
+        
         Args:
-            embedding1: First embedding vector
-            embedding2: Second embedding vector
+            embedding1: First normalized embedding vector
+            embedding2: Second normalized embedding vector
             
         Returns:
             Similarity score (0-1)
         """
         try:
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
-            
-            # Cosine similarity
-            similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+            vec1 = np.asarray(embedding1, dtype=np.float32)
+            vec2 = np.asarray(embedding2, dtype=np.float32)
             
-            # Normalize to 0-1 range
-            return float((similarity + 1) / 2)
+            return float(similarity_to_score(np.dot(vec1, vec2)))
         except Exception as e:
             logger.error(f"Error computing similarity: {e}")
             raise
@@ -120,8 +283,36 @@ class EmbeddingService:
         return {
             "model_name": self.model_name,
             "dimension": settings.VECTOR_DIM,
-            "max_sequence_length": self.model.max_seq_length if hasattr(self.model, 'max_seq_length') else "unknown"
+            "max_sequence_length": self.model.max_seq_length if hasattr(self.model, 'max_seq_length') else "unknown",
+            "cache": self.get_cache_stats(),
+            "batching": self.get_batching_stats(),
+            "single_flight": self.flights.stats()
         }
+    
+    def get_batching_stats(self) -> dict:
+        """
+        Get micro-batching queue metrics
+        
+        Returns:
+            Queue depth and achieved batch size statistics
+        """
+        stats = self.batcher.stats()
+        stats["enabled"] = settings.EMBEDDING_BATCH_ENABLED
+        return stats
+    
+    def get_cache_stats(self) -> dict:
+        """
+        Get embedding cache hit/miss counters
+        
+        Returns:
+            Cache statistics dictionary
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        
+        stats = self.cache.stats()
+        stats["enabled"] = True
+        return stats
 
 
 # Global instance
@@ -3,16 +3,73 @@ Hybrid Scoring Service
 Combines rule-based (fast, free) with LLM (accurate, paid) for optimal results
 """
 import logging
-from typing import Dict, List, Optional, Literal
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Literal, Tuple
+import numpy as np
 from app.config import settings
 from app.models.match import MatchScore, MatchExplanation
-from app.services.rule_based_scoring import RuleBasedScoring
-from app.services.scoring_service import ScoringService
+from app.services.batch_scoring import batch_scorer
+from app.services.embedding_service import embedding_service
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import COST_PER_TOKEN
+from app.services.rule_based_scoring import RuleBasedScoring, JobProfile, ResumeProfile, SKILL_SYNONYMS
+from app.services.scoring_service import ScoringService, llm_flights
 
 logger = logging.getLogger(__name__)
 
 ScoringMode = Literal["rule_based", "hybrid", "llm_only"]
 
+# Default overrun the margin band may add, as a fraction of the main budget
+MARGIN_BUDGET_FRACTION = 0.25
+
+
+@dataclass
+class LLMBudget:
+    """
+    Per-batch limit on LLM enhancement in hybrid mode
+    
+    The best candidates by rule-based score are enhanced until either
+    limit is reached. Everything above the last one selected (the cut
+    line) is then already enhanced, so margin extends one way: candidates
+    tied with or within that many points below the cut line are enhanced
+    too, best first, so near-ties are not split arbitrarily. The band is
+    itself capped at max_margin_calls extra calls and, with max_cost,
+    MARGIN_BUDGET_FRACTION of the dollar budget.
+    """
+    max_calls: Optional[int] = None
+    max_cost: Optional[float] = None
+    margin: float = 0.0
+    max_margin_calls: Optional[int] = None  # Default: MARGIN_BUDGET_FRACTION of the calls budget
+    
+    @property
+    def limited(self) -> bool:
+        """Whether any limit is set (otherwise the fixed threshold applies)"""
+        return self.max_calls is not None or self.max_cost is not None
+    
+    def margin_call_limit(self, selected: int) -> int:
+        """
+        Extra calls the margin band may add
+        
+        Args:
+            selected: Candidates chosen within the main budget
+            
+        Returns:
+            max_margin_calls, or MARGIN_BUDGET_FRACTION of max_calls
+            (of selected when only a dollar budget is set), rounded up
+        """
+        if self.max_margin_calls is not None:
+            return self.max_margin_calls
+        base = self.max_calls if self.max_calls is not None else selected
+        return math.ceil(base * MARGIN_BUDGET_FRACTION)
+    
+    @property
+    def margin_cost_limit(self) -> Optional[float]:
+        """Extra dollars the margin band may spend (None without a dollar budget)"""
+        if self.max_cost is None:
+            return None
+        return self.max_cost * MARGIN_BUDGET_FRACTION
+
 
 class HybridScoringService:
     """
@@ -43,13 +100,15 @@ class HybridScoringService:
         preferred_skills: Optional[List[str]] = None,
         preferred_experience_years: Optional[float] = None,
         similarity_score: Optional[float] = None,
-        force_mode: Optional[ScoringMode] = None
+        force_mode: Optional[ScoringMode] = None,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """
         Calculate match score using configured or forced mode
         
         Args:
-            resume_text: Candidate resume text
+            resume_text: Candidate resume text (LLM modes always need it)
             job_description: Job description text
             required_skills: List of required skills
             required_experience_years: Minimum years of experience
@@ -58,12 +117,23 @@ class HybridScoringService:
             preferred_experience_years: Preferred years of experience
             similarity_score: Pre-calculated semantic similarity (optional)
             force_mode: Override default scoring mode
+            job_profile: Precomputed job profile (optional, see get_job_profile)
+            resume_profile: Precomputed resume profile (optional, see get_resume_profile)
             
         Returns:
             Comprehensive scoring result with method used
         """
         mode = force_mode or self.scoring_mode
         
+        if job_profile is None:
+            job_profile = self.get_job_profile(
+                job_description,
+                required_skills,
+                required_experience_years,
+                required_education,
+                preferred_skills
+            )
+        
         try:
             if mode == "rule_based":
                 return self._rule_based_scoring(
@@ -74,7 +144,9 @@ class HybridScoringService:
                     required_education,
                     preferred_skills,
                     preferred_experience_years,
-                    similarity_score
+                    similarity_score,
+                    job_profile,
+                    resume_profile
                 )
             
             elif mode == "llm_only":
@@ -93,7 +165,9 @@ class HybridScoringService:
                     required_education,
                     preferred_skills,
                     preferred_experience_years,
-                    similarity_score
+                    similarity_score,
+                    job_profile,
+                    resume_profile
                 )
             
             else:
@@ -106,7 +180,9 @@ class HybridScoringService:
                     required_education,
                     preferred_skills,
                     preferred_experience_years,
-                    similarity_score
+                    similarity_score,
+                    job_profile,
+                    resume_profile
                 )
                 
         except Exception as e:
@@ -120,7 +196,9 @@ class HybridScoringService:
                 required_education,
                 preferred_skills,
                 preferred_experience_years,
-                similarity_score
+                similarity_score,
+                job_profile,
+                resume_profile
             )
     
     def _rule_based_scoring(
@@ -132,7 +210,9 @@ class HybridScoringService:
         required_education: str,
         preferred_skills: Optional[List[str]],
         preferred_experience_years: Optional[float],
-        similarity_score: Optional[float]
+        similarity_score: Optional[float],
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """Pure rule-based scoring (fast, free)"""
         
@@ -143,7 +223,9 @@ class HybridScoringService:
             required_experience_years,
             required_education,
             preferred_skills,
-            preferred_experience_years
+            preferred_experience_years,
+            job_profile=job_profile,
+            resume_profile=resume_profile
         )
         
         # Add semantic similarity if provided
@@ -196,7 +278,9 @@ class HybridScoringService:
         required_education: str,
         preferred_skills: Optional[List[str]],
         preferred_experience_years: Optional[float],
-        similarity_score: Optional[float]
+        similarity_score: Optional[float],
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """
         Hybrid scoring: Rule-based first, LLM for top candidates
@@ -215,7 +299,9 @@ class HybridScoringService:
             required_experience_years,
             required_education,
             preferred_skills,
-            preferred_experience_years
+            preferred_experience_years,
+            job_profile=job_profile,
+            resume_profile=resume_profile
         )
         
         rule_score = rule_result["overall_score"]
@@ -233,14 +319,10 @@ class HybridScoringService:
                 )
                 
                 # Blend scores: 60% rule-based, 40% LLM
-                # This gives stability from rules + nuance from LLM
-                blended_score = (rule_score * 0.6) + (llm_match.overall_score * 0.4)
+                blended = self._blend_scores(rule_result, llm_match)
                 
                 result = {
-                    "overall_score": round(blended_score, 2),
-                    "skills_score": round((rule_result["skills_score"] * 0.6) + (llm_match.skills_score * 0.4), 2),
-                    "experience_score": round((rule_result["experience_score"] * 0.6) + (llm_match.experience_score * 0.4), 2),
-                    "education_score": round((rule_result["education_score"] * 0.6) + (llm_match.education_score * 0.4), 2),
+                    **blended,
                     "breakdown": rule_result.get("breakdown", {}),
                     "scoring_method": "hybrid",
                     "rule_based_score": rule_score,
@@ -252,7 +334,7 @@ class HybridScoringService:
                 if similarity_score is not None:
                     result["semantic_similarity"] = similarity_score
                 
-                logger.info(f"Hybrid scoring: Rule {rule_score:.2f}% + LLM {llm_match.overall_score:.2f}% = {blended_score:.2f}%")
+                logger.info(f"Hybrid scoring: Rule {rule_score:.2f}% + LLM {llm_match.overall_score:.2f}% = {blended['overall_score']:.2f}%")
                 
                 return result
                 
@@ -273,12 +355,269 @@ class HybridScoringService:
         
         return rule_result
     
+    def score_batch(
+        self,
+        resumes: List[Dict],
+        job_description: str,
+        required_skills: Optional[List[str]] = None,
+        force_mode: Optional[ScoringMode] = None,
+        llm_budget: Optional[LLMBudget] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Score many resumes against one job
+        
+        Rule-based scores for the whole batch are computed first, in one
+        vectorized pass over cached resume profiles. LLM calls (candidates at
+        or above the threshold in hybrid mode, every resume in llm_only) are
+        then sent concurrently through the shared LLM client, so batch time
+        approaches the slowest call rather than the sum. With LLM_PACK_SIZE
+        above 1, several resumes share one prompt and job description.
+        
+        With an llm_budget, hybrid mode ignores the threshold and enhances
+        the top candidates by rule-based score that fit the budget, then
+        re-ranks the whole batch by final score.
+        
+        Args:
+            resumes: List of resume objects with 'id' and 'text'
+            job_description: Job description text
+            required_skills: List of required skills
+            force_mode: Override default scoring mode
+            llm_budget: Limit on LLM enhancement for this batch (hybrid mode)
+            
+        Returns:
+            Per-resume results in input order, or sorted by score when
+            llm_budget is limited (resumes that fail to score are skipped;
+            while the LLM circuit is open, rule-based scores are used and
+            llm_only fallbacks come last)
+        """
+        mode = force_mode or self.scoring_mode
+        if mode not in ("rule_based", "hybrid", "llm_only"):
+            logger.warning(f"Unknown scoring mode: {mode}, falling back to rule-based")
+            mode = "rule_based"
+        
+        if mode == "llm_only":
+            llm_matches, costs = self._llm_batch_scores(
+                [resume.get('text', '') for resume in resumes],
+                job_description
+            )
+            results = [
+                self._batch_result(resume, llm_match.dict(), "llm", cost)
+                for resume, llm_match, cost in zip(resumes, llm_matches, costs)
+                if llm_match is not None
+            ]
+            
+            unscored = [resume for resume, llm_match in zip(resumes, llm_matches) if llm_match is None]
+            if unscored:
+                logger.warning(f"LLM circuit open, rule-based scores for {len(unscored)} resumes")
+                results += self.score_batch(unscored, job_description, required_skills, force_mode="rule_based")
+            return results
+        
+        # Job-side work happens once for the whole batch
+        job_profile = self.get_job_profile(job_description, required_skills or [])
+        
+        # Step 1: rule-based scores for the whole batch in one vectorized pass
+        scored_resumes, profiles = [], []
+        for resume in resumes:
+            try:
+                profiles.append(self.rule_based_service.get_resume_profile(resume.get('text', '')))
+                scored_resumes.append(resume)
+            except Exception as e:
+                logger.warning(f"Error scoring resume {resume.get('id')}: {e}")
+        
+        rule_scores = batch_scorer.score_profiles(profiles, job_profile)
+        
+        if mode == "rule_based":
+            return [
+                self._batch_result(resume, scores, "rule_based", 0.0)
+                for resume, scores in zip(scored_resumes, rule_scores)
+            ]
+        
+        # Step 2: LLM enhancement for the budgeted top candidates (or those
+        # above threshold), sent concurrently
+        if llm_budget is not None and llm_budget.limited:
+            escalate = self._schedule_llm(
+                rule_scores,
+                [resume.get('text', '') for resume in scored_resumes],
+                job_description,
+                llm_budget
+            )
+        else:
+            escalate = [
+                i for i, scores in enumerate(rule_scores)
+                if scores["overall_score"] >= self.hybrid_threshold
+            ]
+        llm_matches, costs = self._llm_batch_scores(
+            [scored_resumes[i].get('text', '') for i in escalate],
+            job_description
+        )
+        blended = {
+            i: (self._blend_scores(rule_scores[i], llm_match), cost)
+            for i, llm_match, cost in zip(escalate, llm_matches, costs)
+            if llm_match is not None  # LLM circuit open: keep the rule-based score
+        }
+        
+        results = []
+        for i, (resume, scores) in enumerate(zip(scored_resumes, rule_scores)):
+            if i in blended:
+                blended_scores, cost = blended[i]
+                results.append(self._batch_result(resume, blended_scores, "hybrid", cost))
+            else:
+                results.append(self._batch_result(resume, scores, "hybrid_rule_only", 0.0))
+        
+        if llm_budget is not None and llm_budget.limited:
+            # Re-rank: blending can move enhanced candidates across the cut line
+            results.sort(key=lambda x: x['score'], reverse=True)
+        
+        logger.info(f"Batch scored {len(results)}/{len(resumes)} resumes ({mode}), "
+                   f"{len(blended)} enhanced with LLM")
+        
+        return results
+    
+    def _schedule_llm(
+        self,
+        rule_scores: List[Dict[str, float]],
+        resume_texts: List[str],
+        job_description: str,
+        budget: LLMBudget
+    ) -> List[int]:
+        """
+        Choose which candidates to enhance with the LLM under a budget
+        
+        Args:
+            rule_scores: Rule-based scores per candidate
+            resume_texts: Resume text per candidate
+            job_description: Job description text
+            budget: Call and/or dollar limit plus capped margin band
+            
+        Returns:
+            Candidate indices, best rule-based score first
+        """
+        # Stable sort: equal scores keep input order
+        order = sorted(range(len(rule_scores)), key=lambda i: rule_scores[i]["overall_score"], reverse=True)
+        
+        selected = []
+        spent = 0.0
+        for i in order:
+            if budget.max_calls is not None and len(selected) >= budget.max_calls:
+                break
+            cost = self._expected_llm_cost(resume_texts[i], job_description)
+            if budget.max_cost is not None and spent + cost > budget.max_cost:
+                break
+            selected.append(i)
+            spent += cost
+        
+        margin_calls = 0
+        if selected and budget.margin > 0:
+            # Candidates above the cut line are all selected already: the band only extends below it
+            cut_line = rule_scores[selected[-1]]["overall_score"]
+            call_limit = budget.margin_call_limit(len(selected))
+            cost_limit = budget.margin_cost_limit
+            margin_spent = 0.0
+            for i in order[len(selected):]:
+                if margin_calls >= call_limit or rule_scores[i]["overall_score"] < cut_line - budget.margin:
+                    break
+                cost = self._expected_llm_cost(resume_texts[i], job_description)
+                if cost_limit is not None and margin_spent + cost > cost_limit:
+                    break
+                selected.append(i)
+                margin_calls += 1
+                margin_spent += cost
+            spent += margin_spent
+        
+        logger.info(f"LLM budget (calls {budget.max_calls}, cost {budget.max_cost}, margin {budget.margin}): "
+                   f"enhancing {len(selected)}/{len(rule_scores)} candidates ({margin_calls} from the margin band), "
+                   f"~${spent:.6f}")
+        
+        return selected
+    
+    def _expected_llm_cost(self, resume_text: str, job_description: str) -> float:
+        """Estimated (unrounded) cost of scoring one candidate with the LLM in batch mode"""
+        if settings.LLM_PACK_SIZE <= 1:
+            tokens = (len(resume_text) + len(job_description)) / 4
+        else:
+            resume_chars = len(resume_text[:settings.LLM_PACK_RESUME_CHARS])
+            tokens = (resume_chars + len(job_description[:2000]) / settings.LLM_PACK_SIZE) / 4
+        return tokens * COST_PER_TOKEN
+    
+    def _llm_batch_scores(
+        self,
+        resume_texts: List[str],
+        job_description: str
+    ) -> Tuple[List[Optional[MatchScore]], List[float]]:
+        """
+        LLM scores and per-resume API cost for many resumes against one job
+        
+        Uses packed prompts when LLM_PACK_SIZE > 1; the cost of the shared
+        job description is split across the resumes of each pack, entries
+        retried individually also pay for their single call, and entries
+        served from the LLM cache cost nothing. Scores are None (at no
+        cost) where the LLM circuit breaker was open.
+        """
+        if settings.LLM_PACK_SIZE <= 1:
+            llm_matches = self.llm_service.calculate_match_scores(
+                [(resume_text, job_description) for resume_text in resume_texts]
+            )
+            costs = [
+                self._estimate_api_cost(resume_text, job_description) if llm_match is not None else 0.0
+                for resume_text, llm_match in zip(resume_texts, llm_matches)
+            ]
+            return llm_matches, costs
+        
+        packed = self.llm_service.calculate_match_scores_packed(resume_texts, job_description)
+        
+        costs = []
+        for resume_text, entry in zip(resume_texts, packed):
+            if entry is None or entry.cached:
+                costs.append(0.0)
+                continue
+            cost = self._estimate_api_cost(
+                resume_text[:settings.LLM_PACK_RESUME_CHARS],
+                job_description[:2000],
+                shared_by=entry.pack_size
+            )
+            if entry.retried:
+                cost += self._estimate_api_cost(resume_text, job_description)
+            costs.append(round(cost, 6))
+        
+        return [entry.match_score if entry is not None else None for entry in packed], costs
+    
+    def _blend_scores(self, rule_scores: Dict[str, float], llm_match: MatchScore) -> Dict[str, float]:
+        """
+        Blend scores: 60% rule-based, 40% LLM
+        
+        This gives stability from rules + nuance from LLM.
+        """
+        return {
+            name: round((rule_scores[name] * 0.6) + (getattr(llm_match, name) * 0.4), 2)
+            for name in ("overall_score", "skills_score", "experience_score", "education_score")
+        }
+    
+    def _batch_result(
+        self,
+        resume: Dict,
+        scores: Dict[str, float],
+        scoring_method: str,
+        api_cost: float
+    ) -> Dict[str, any]:
+        """Build one /batch result entry"""
+        return {
+            "resume_id": resume.get('id', 'unknown'),
+            "score": scores["overall_score"],
+            "skills_score": scores["skills_score"],
+            "experience_score": scores["experience_score"],
+            "education_score": scores["education_score"],
+            "scoring_method": scoring_method,
+            "api_cost": api_cost
+        }
+    
     def generate_explanation(
         self,
         resume_text: str,
         job_description: str,
         match_score: float,
-        use_llm: bool = True
+        use_llm: bool = True,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """
         Generate match explanation
@@ -288,6 +627,8 @@ class HybridScoringService:
             job_description: Job description
             match_score: Calculated match score
             use_llm: Whether to use LLM for explanation (costs API call)
+            job_profile: Precomputed job profile (optional, rule-based path)
+            resume_profile: Precomputed resume profile (optional, rule-based path)
             
         Returns:
             Explanation dict with strengths, gaps, recommendations
@@ -317,26 +658,33 @@ class HybridScoringService:
         return self._generate_rule_based_explanation(
             resume_text,
             job_description,
-            match_score
+            match_score,
+            job_profile,
+            resume_profile
         )
     
     def _generate_rule_based_explanation(
         self,
         resume_text: str,
         job_description: str,
-        match_score: float
+        match_score: float,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """Generate explanation using rule-based analysis"""
         
+        job_profile = job_profile or self.rule_based_service.get_job_profile(job_description)
+        resume_profile = resume_profile or self.rule_based_service.get_resume_profile(resume_text)
+        
         # Extract skills
-        resume_skills = self.rule_based_service.extract_skills_from_text(resume_text)
-        job_skills = self.rule_based_service.extract_skills_from_text(job_description)
+        resume_skills = set(resume_profile.skills)
+        job_skills = set(job_profile.text_skills)
         
         matched_skills = resume_skills & job_skills
         missing_skills = job_skills - resume_skills
         
         # Extract experience
-        years = self.rule_based_service.extract_years_of_experience(resume_text)
+        years = resume_profile.years
         
         # Build explanation
         if match_score >= 80:
@@ -375,16 +723,83 @@ class HybridScoringService:
             "api_cost": 0.0
         }
     
-    def _estimate_api_cost(self, resume_text: str, job_description: str) -> float:
-        """Estimate API cost for LLM call"""
+    def get_job_profile(
+        self,
+        job_description: str,
+        required_skills: Optional[List[str]] = None,
+        required_experience_years: float = 0,
+        required_education: str = "none",
+        preferred_skills: Optional[List[str]] = None,
+        include_embedding: bool = False
+    ) -> JobProfile:
+        """
+        Get cached job profile for scoring many resumes against one job
         
-        # Approximate token count (4 chars = 1 token)
-        tokens = (len(resume_text) + len(job_description)) / 4
+        Args:
+            job_description: Job description text
+            required_skills: List of required skills
+            required_experience_years: Minimum years of experience
+            required_education: Required education level
+            preferred_skills: List of preferred skills
+            include_embedding: Also compute the job embedding if missing
+            
+        Returns:
+            JobProfile shared by the rule-based, hybrid and explanation paths
+        """
+        profile = self.rule_based_service.get_job_profile(
+            job_description,
+            required_skills,
+            required_experience_years,
+            required_education,
+            preferred_skills
+        )
         
-        # Gemini 1.5 Flash: ~$0.075 per 1M tokens
-        cost_per_token = 0.075 / 1_000_000
+        if include_embedding and profile.embedding is None:
+            profile.embedding = np.asarray(
+                embedding_service.generate_embedding(job_description),
+                dtype=np.float32
+            )
         
-        return round(tokens * cost_per_token, 6)
+        return profile
+    
+    def get_resume_profile(self, resume_text: str, include_embedding: bool = False) -> ResumeProfile:
+        """
+        Get cached resume profile so a resume is analyzed once across jobs
+        
+        Args:
+            resume_text: Resume text
+            include_embedding: Also compute the resume embedding if missing
+            
+        Returns:
+            ResumeProfile accepted by all scoring paths in place of re-analysis
+        """
+        profile = self.rule_based_service.get_resume_profile(resume_text)
+        
+        if include_embedding and profile.embedding is None:
+            profile.embedding = np.asarray(
+                embedding_service.generate_embedding(resume_text),
+                dtype=np.float32
+            )
+        
+        return profile
+    
+    def _estimate_api_cost(self, resume_text: str, job_description: str, shared_by: int = 1) -> float:
+        """
+        Estimate API cost for LLM call
+        
+        Args:
+            resume_text: Resume text sent
+            job_description: Job description sent
+            shared_by: Resumes sharing one prompt with this job description
+            
+        Returns:
+            Estimated cost attributed to this resume
+        """
+        
+        # Approximate token count (4 chars = 1 token)
+        tokens = (len(resume_text) + len(job_description) / max(1, shared_by)) / 4
+        
+        return round(tokens * COST_PER_TOKEN, 6)
     
     def get_stats(self) -> Dict[str, any]:
         """Get scoring service statistics"""
@@ -393,7 +808,15 @@ class HybridScoringService:
             "hybrid_threshold": self.hybrid_threshold,
             "llm_provider": "gemini",
             "llm_model": settings.GEMINI_MODEL,
-            "skill_synonyms_count": len(self.rule_based_service.skill_synonyms)
+            "skill_synonyms_count": len(SKILL_SYNONYMS),
+            "llm_client": self.llm_service.client.stats(),
+            "llm_cache": llm_cache.stats() if llm_cache is not None else {"enabled": False},
+            "llm_single_flight": llm_flights.stats(),
+            "job_profile_cache": self.rule_based_service.job_profiles.stats(),
+            "resume_profile_cache": (
+                self.rule_based_service.resume_profiles.stats()
+                if self.rule_based_service.resume_profiles is not None else {"enabled": False}
+            )
         }
 
 
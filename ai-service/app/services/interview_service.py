@@ -4,33 +4,40 @@ Generates interview kits using Gemini LLM
 """
 import logging
 from typing import List, Dict, Optional
-import google.generativeai as genai
 import json
 import re
 
-from app.config import settings
 from app.models.interview import (
     InterviewKit,
     InterviewQuestion,
     QuestionCategory,
     QuestionDifficulty
 )
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import llm_client, estimate_cost
+from app.utils.cache import content_hash
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Prompt template version (part of LLM cache keys; bump when the prompt changes)
+INTERVIEW_PROMPT_VERSION = "interview-v1"
+
 
 class InterviewService:
     """Service for generating interview kits"""
     
     def __init__(self):
-        """Initialize interview service with Gemini"""
-        if settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
-            logger.info(f"Initialized Gemini for interview generation")
-        else:
-            logger.warning("Gemini API key not provided")
-            self.model = None
+        """Initialize interview service with the shared Gemini client and LLM cache"""
+        self.client = llm_client
+        self.cache = llm_cache
+        # Concurrent identical requests share one generation
+        self.flights = SingleFlight("interview_kit")
+    
+    @property
+    def model(self):
+        """Configured Gemini model (None without an API key)"""
+        return self.client.model
     
     def generate_interview_kit(
         self,
@@ -53,8 +60,38 @@ class InterviewService:
             focus_areas: Specific areas to focus on (optional)
             
         Returns:
-            InterviewKit object
+            InterviewKit object (shared by concurrent identical requests)
         """
+        key = content_hash(
+            INTERVIEW_PROMPT_VERSION,
+            job_description,
+            resume_text,
+            job_title,
+            candidate_name or "",
+            num_questions,
+            "\x00".join(focus_areas or [])
+        )
+        return self.flights.do(
+            key,
+            self._generate_interview_kit,
+            job_description,
+            resume_text,
+            job_title,
+            candidate_name,
+            num_questions,
+            focus_areas
+        )
+    
+    def _generate_interview_kit(
+        self,
+        job_description: str,
+        resume_text: str,
+        job_title: str,
+        candidate_name: Optional[str],
+        num_questions: int,
+        focus_areas: Optional[List[str]]
+    ) -> InterviewKit:
+        """Generate interview kit (single-flight leader)"""
         try:
             # Build prompt
             prompt = self._build_interview_prompt(
@@ -65,8 +102,23 @@ class InterviewService:
                 focus_areas
             )
             
-            # Call LLM
-            response = self._call_llm(prompt)
+            # Call LLM (identical requests are served from the LLM cache)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.key(
+                    INTERVIEW_PROMPT_VERSION,
+                    job_description[:2000],
+                    resume_text[:2000],
+                    job_title,
+                    str(num_questions),
+                    ", ".join(focus_areas or [])
+                )
+            response = self.cache.get(cache_key) if cache_key else None
+            if response is None:
+                response = self._call_llm(prompt)
+                data = self._interview_json(response)
+                if cache_key and data is not None and data.get('questions'):
+                    self.cache.put(cache_key, response, estimate_cost(prompt))
             
             # Parse response
             interview_kit = self._parse_interview_response(
@@ -148,13 +200,10 @@ Format everything as a JSON object:
         """Parse LLM response into InterviewKit"""
         
         try:
-            # Extract JSON from response
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if not json_match:
+            data = self._interview_json(response)
+            if data is None:
                 raise ValueError("No JSON found in response")
             
-            data = json.loads(json_match.group())
-            
             # Parse questions
             questions = []
             for q_data in data.get('questions', []):
@@ -186,6 +235,17 @@ Format everything as a JSON object:
             logger.error(f"Error parsing interview response: {e}")
             return self._create_fallback_kit(job_title, candidate_name)
     
+    def _interview_json(self, response: str) -> Optional[Dict]:
+        """Extract the interview kit object from a response"""
+        json_match = re.search(r'\{[\s\S]*\}', response)
+        if not json_match:
+            return None
+        try:
+            data = json.loads(json_match.group())
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    
     def _create_fallback_kit(
         self,
         job_title: str,
@@ -230,16 +290,8 @@ Format everything as a JSON object:
         )
     
     def _call_llm(self, prompt: str) -> str:
-        """Call Gemini LLM"""
-        try:
-            if self.model:
-                response = self.model.generate_content(prompt)
-                return response.text
-            else:
-                raise RuntimeError("Gemini model not configured")
-        except Exception as e:
-            logger.error(f"Error calling Gemini LLM: {e}")
-            raise
+        """Call Gemini LLM (fails fast with CircuitOpenError while Gemini is down)"""
+        return self.client.generate(prompt)
 
 
 # Global instance
@@ -0,0 +1,237 @@
+"""
+Job Queue Service
+Local asynchronous jobs for bulk work that should not run inside one HTTP request
+"""
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    """State of one submitted job"""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    priority: int
+    total: int
+    status: str = QUEUED
+    processed: int = 0
+    results: List[Any] = field(default_factory=list)
+    summary: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+
+    @property
+    def progress(self) -> float:
+        """Fraction of work done (0-1)"""
+        if self.status == COMPLETED:
+            return 1.0
+        return round(self.processed / self.total, 4) if self.total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status view without results"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "total": self.total,
+            "processed": self.processed,
+            "progress": self.progress,
+            "result_count": len(self.results),
+            "summary": self.summary,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+# Handler: async function that does the work and updates job progress/results
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Priority queue of jobs drained by a fixed number of async workers
+
+    Lower priority values run first; equal priorities run in submission
+    order. Handlers should check job.cancel_requested between chunks.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        result_ttl_seconds: int = 3600,
+        max_retained: int = 100
+    ):
+        """
+        Initialize job queue
+
+        Args:
+            max_concurrent: Jobs running at the same time
+            result_ttl_seconds: How long finished jobs stay available
+            max_retained: Maximum finished jobs kept (oldest dropped first)
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_retained = max(1, int(max_retained))
+        self.jobs: Dict[str, Job] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._sequence = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        """Register the handler that runs jobs of a given kind"""
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, params: Dict[str, Any], total: int, priority: int = 5) -> Job:
+        """
+        Queue a job (must be called from the event loop)
+
+        Args:
+            kind: Registered job kind
+            params: Handler parameters
+            total: Units of work, used for progress
+            priority: Lower runs first
+
+        Returns:
+            Queued job
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        self._prune()
+        self._ensure_workers()
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params, priority=priority, total=total)
+        self.jobs[job.id] = job
+        self._queue.put_nowait((priority, next(self._sequence), job.id))
+
+        logger.info(f"Queued job {job.id} ({kind}, {total} items, priority {priority})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get job by ID"""
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job
+
+        Queued jobs are cancelled immediately; running jobs stop at the
+        next chunk boundary and keep the results produced so far.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job or None if unknown
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+
+        job.cancel_requested = True
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        logger.info(f"Cancel requested for job {job_id}")
+        return job
+
+    def _ensure_workers(self):
+        """Start workers on the running loop (recreated if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._workers = []
+
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrent:
+            self._workers.append(loop.create_task(self._run()))
+
+    async def _run(self):
+        """Worker loop: take the highest-priority job and run its handler"""
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                await self._handlers[job.kind](job)
+                self._finish(job, CANCELLED if job.cancel_requested else COMPLETED)
+            except asyncio.CancelledError:
+                self._finish(job, CANCELLED)
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+                job.error = str(e)
+                self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str):
+        """Mark job finished"""
+        job.status = status
+        job.finished_at = time.time()
+        duration = job.finished_at - (job.started_at or job.created_at)
+        logger.info(f"Job {job.id} {status}: {job.processed}/{job.total} items in {duration:.1f}s")
+
+    def _prune(self):
+        """Drop expired finished jobs and keep at most max_retained"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self.jobs.values() if job.status in FINISHED_STATES),
+            key=lambda job: job.finished_at
+        )
+        excess = len(finished) - self.max_retained
+        for i, job in enumerate(finished):
+            if i < excess or now - job.finished_at > self.result_ttl_seconds:
+                del self.jobs[job.id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counts by status"""
+        counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "jobs": counts
+        }
+
+    def shutdown(self):
+        """Stop workers (running jobs end as cancelled)"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+
+# Global instance
+job_queue = JobQueue(
+    max_concurrent=settings.JOB_MAX_CONCURRENT,
+    result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS,
+    max_retained=settings.JOB_MAX_RETAINED
+)
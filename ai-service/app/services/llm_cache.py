@@ -0,0 +1,96 @@
+"""
+LLM Response Cache
+Durable cache of LLM results keyed by model, prompt template version and
+normalized inputs, with an in-memory LRU tier and an SQLite tier
+"""
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config import settings
+from app.utils.cache import TieredCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_input(text: str) -> str:
+    """Normalize prompt input for keying (case and whitespace insensitive)"""
+    return " ".join(str(text).split()).lower()
+
+
+class LLMResponseCache(TieredCache):
+    """
+    Two-tier cache of LLM response texts
+
+    Entries expire ttl_seconds after they were produced, whichever tier
+    serves them. Each entry records the estimated cost of the call it
+    replaces, so hits can be reported as dollars saved.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 100000
+    ):
+        """
+        Initialize LLM response cache
+
+        Args:
+            model: LLM model name (part of every key)
+            max_entries: Maximum responses kept in memory
+            ttl_seconds: Response lifetime (<= 0 disables expiry)
+            db_path: SQLite file for the persistent tier (None disables it)
+            max_disk_entries: Maximum rows kept on disk (oldest are pruned)
+        """
+        super().__init__(
+            "LLM response",
+            "llm_responses",
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            db_path=db_path,
+            max_disk_entries=max_disk_entries
+        )
+        self.model = model
+
+    def key(self, template: str, *inputs: str) -> str:
+        """
+        Build cache key for one prompt
+
+        Args:
+            template: Prompt template name and version, e.g. "match-v1"
+            inputs: Prompt inputs exactly as inserted into the prompt
+                (already truncated), normalized here
+
+        Returns:
+            Hex key
+        """
+        return content_hash(self.model, template, *(normalize_input(text) for text in inputs))
+
+    def stats(self) -> Dict:
+        """Return hit rate, dollars saved and tier sizes"""
+        stats = super().stats()
+        stats["model"] = self.model
+        stats["dollars_saved"] = round(stats.pop("cost_saved"), 6)
+        return stats
+
+
+def create_llm_cache() -> Optional[LLMResponseCache]:
+    """Build LLM response cache from settings (None when caching is disabled)"""
+    if not (settings.ENABLE_CACHE and settings.LLM_CACHE_ENABLED):
+        logger.info("LLM response cache disabled")
+        return None
+
+    return LLMResponseCache(
+        model=settings.GEMINI_MODEL,
+        max_entries=settings.LLM_CACHE_SIZE,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        db_path=settings.LLM_CACHE_DB if settings.LLM_CACHE_PERSIST else None,
+        max_disk_entries=settings.LLM_CACHE_DISK_MAX
+    )
+
+
+# Global instance (None when disabled)
+llm_cache = create_llm_cache()
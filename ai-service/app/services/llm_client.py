@@ -0,0 +1,465 @@
+"""
+LLM Client
+Shared Gemini client with bounded concurrency, rate limits, per-request
+deadlines, hedged retries and a circuit breaker
+"""
+import heapq
+import inspect
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeoutError, wait
+from typing import Any, Callable, Dict, List, Optional, Union
+import google.generativeai as genai
+
+from app.config import settings
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.executors import ExecutionPool
+from app.utils.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Gemini 1.5 Flash: ~$0.075 per 1M input tokens
+COST_PER_TOKEN = 0.075 / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (4 chars = 1 token)"""
+    return max(1, len(text) // 4)
+
+
+def estimate_cost(prompt: str) -> float:
+    """Approximate input cost of one call in dollars"""
+    return estimate_tokens(prompt) * COST_PER_TOKEN
+
+
+class _PendingCall:
+    """Future plus the moment its call actually started"""
+
+    def __init__(self, probe: bool, background: bool = False):
+        self.started = threading.Event()
+        self.started_at: Optional[float] = None
+        self.probe = probe
+        self.background = background
+        self.future: Future = Future()
+
+
+class _DelayedDispatcher:
+    """Single thread that releases rate-limited calls once their wait is over"""
+
+    def __init__(self):
+        self._heap: list = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def call_at(self, ready_at: float, fn: Callable[[], None]):
+        """Run fn on the dispatcher thread at monotonic time ready_at"""
+        with self._cond:
+            heapq.heappush(self._heap, (ready_at, next(self._order), fn))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="llm-rate-limit", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _loop(self):
+        """Wait for the earliest deadline and run its function"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    delay = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+                _, _, fn = heapq.heappop(self._heap)
+            fn()
+
+    def shutdown(self):
+        """Stop the thread; functions not yet due are dropped"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+
+class LLMClient:
+    """
+    Gemini client shared by the LLM-backed services
+
+    Calls run on a dedicated pool whose size is the concurrency limit.
+    Each call first reserves request/token rate-limit capacity; throttled
+    calls wait on a dispatcher thread and only take a pool slot once they
+    may be sent, so rate-limit waits never idle a slot. For a single
+    generate() the deadline (LLM_TIMEOUT by default) counts from submission,
+    so queueing and throttling are bounded too; in generate_many each
+    call's deadline counts from the moment it starts, so waiting behind the
+    other calls of the fan-out does not eat into it.
+
+    Calls made inside background() (bulk jobs) may hold at most
+    LLM_JOB_MAX_CONCURRENCY pool slots and rate-limit reservations at once;
+    the rest wait in a local queue and reserve capacity only when a slot
+    frees up. A large job therefore never books minutes of rate-limit
+    capacity or fills the pool ahead of interactive calls.
+
+    A circuit breaker watches error rate and latency. While it is open,
+    calls raise CircuitOpenError immediately so callers can fall back
+    without waiting for a timeout.
+    """
+
+    def __init__(self):
+        """Initialize Gemini model and call infrastructure"""
+        self.model_name = settings.GEMINI_MODEL
+        self.timeout = settings.LLM_TIMEOUT
+        self.max_concurrency = max(1, settings.LLM_MAX_CONCURRENCY)
+        self.limiter = RateLimiter(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
+        self.pool = ExecutionPool("llm", self.max_concurrency)
+        self._delayed = _DelayedDispatcher()
+        self.background_concurrency = max(1, min(settings.LLM_JOB_MAX_CONCURRENCY, self.max_concurrency))
+        self._background_queue: deque = deque()
+        self._background_active = 0
+        self._background_lock = threading.Lock()
+        self._local = threading.local()
+        self.hedge_after = settings.LLM_HEDGE_AFTER_SECONDS
+        self.max_retries = max(0, settings.LLM_MAX_RETRIES)
+        self.breaker = CircuitBreaker(
+            "gemini",
+            failure_rate_threshold=settings.LLM_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate_threshold=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            window_size=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+        )
+        self.model = None
+        self._request_options = False
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.retries = 0
+
+        if settings.GEMINI_API_KEY:
+            configure_kwargs = {"api_key": settings.GEMINI_API_KEY}
+            if settings.GEMINI_API_ENDPOINT:
+                # e.g. a local stub server for load tests
+                configure_kwargs["transport"] = "rest"
+                configure_kwargs["client_options"] = {"api_endpoint": settings.GEMINI_API_ENDPOINT}
+            genai.configure(**configure_kwargs)
+            self.model = genai.GenerativeModel(self.model_name)
+            self._request_options = self._accepts_request_options()
+            logger.info(f"Initialized Gemini model: {self.model_name} "
+                       f"(concurrency {self.max_concurrency}, timeout {self.timeout}s)")
+        else:
+            logger.warning("Gemini API key not provided")
+
+    def _accepts_request_options(self) -> bool:
+        """
+        Whether this SDK version takes a per-request timeout
+
+        Only an explicit request_options parameter counts: older SDKs
+        (e.g. 0.3.x) forward **kwargs into the request proto, where any
+        extra key is an unknown field and fails the call. Without it the
+        client-side deadline in generate()/_await() still applies.
+        """
+        try:
+            params = inspect.signature(self.model.generate_content).parameters
+        except (TypeError, ValueError):
+            return False
+        return "request_options" in params
+
+    @contextmanager
+    def background(self):
+        """Treat LLM calls made on this thread as bulk job traffic"""
+        previous = getattr(self._local, "background", False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    @property
+    def available(self) -> bool:
+        """Whether a model is configured"""
+        return self.model is not None
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Call the LLM and wait for its text response
+
+        The deadline covers the whole request from submission, including
+        time spent queued for a pool slot or rate-limit capacity; a call
+        still queued at the deadline is cancelled. If the first attempt has
+        not answered LLM_HEDGE_AFTER_SECONDS after starting, a duplicate is
+        sent and the first answer wins; attempts that fail are retried up to
+        LLM_MAX_RETRIES times while time remains. Hedges and retries also
+        go through the circuit breaker.
+
+        Args:
+            prompt: Prompt text
+            timeout: Request deadline in seconds (defaults to LLM_TIMEOUT)
+
+        Returns:
+            Response text
+
+        Raises:
+            CircuitOpenError: Circuit is open; nothing was sent
+            TimeoutError: No answer before the deadline
+        """
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        attempts = [self._submit(prompt, timeout)]
+        started_at = self._wait_started(attempts[0], deadline)
+        if started_at is None:
+            if attempts[0].future.done():
+                return attempts[0].future.result()  # Failed before starting; re-raises
+            if self._cancel(attempts[0]):
+                with self._stats_lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"LLM call was still queued at its {timeout}s deadline")
+            # Started just as the deadline passed
+            started_at = self._wait_started(attempts[0]) or time.monotonic()
+
+        hedge_at = started_at + self.hedge_after if self.hedge_after > 0 else None
+        retries_left = self.max_retries
+
+        while True:
+            for call in attempts:
+                if call.future.done() and call.future.exception() is None:
+                    return call.future.result()
+
+            now = time.monotonic()
+            pending = [call.future for call in attempts if not call.future.done()]
+
+            if not pending:
+                error = attempts[-1].future.exception()
+                retry = self._try_submit(prompt, deadline - now) if retries_left > 0 and now < deadline else None
+                if retry is None:
+                    raise error
+                retries_left -= 1
+                with self._stats_lock:
+                    self.retries += 1
+                logger.warning(f"Retrying LLM call after error: {error}")
+                attempts.append(retry)
+                continue
+
+            if now >= deadline:
+                with self._stats_lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"LLM call exceeded {timeout}s deadline")
+
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                hedge = self._try_submit(prompt, deadline - now)
+                if hedge is not None:
+                    with self._stats_lock:
+                        self.hedges += 1
+                    attempts.append(hedge)
+                    continue
+
+            wake_at = deadline if hedge_at is None else min(deadline, hedge_at)
+            wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+    def generate_many(
+        self,
+        prompts: List[str],
+        timeout: Optional[float] = None
+    ) -> List[Union[str, Exception]]:
+        """
+        Call the LLM for several prompts concurrently
+
+        Args:
+            prompts: Prompt texts
+            timeout: Per-call deadline in seconds (defaults to LLM_TIMEOUT)
+
+        Returns:
+            Response text or the raised exception, in prompt order
+        """
+        pending: List[Union[_PendingCall, Exception]] = []
+        for prompt in prompts:
+            try:
+                pending.append(self._submit(prompt, timeout))
+            except Exception as e:
+                pending.append(e)
+
+        results: List[Union[str, Exception]] = []
+        for call in pending:
+            if isinstance(call, Exception):
+                results.append(call)
+                continue
+            try:
+                results.append(self._await(call, timeout))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _submit(self, prompt: str, timeout: Optional[float]) -> _PendingCall:
+        """Queue one call (raises CircuitOpenError if rejected)"""
+        if not self.available:
+            raise RuntimeError("Gemini model not configured")
+
+        call = _PendingCall(self.breaker.acquire(), getattr(self._local, "background", False))
+
+        if call.background:
+            with self._background_lock:
+                if self._background_active >= self.background_concurrency:
+                    self._background_queue.append((call, prompt, timeout))
+                    return call
+                self._background_active += 1
+
+        self._reserve(call, prompt, timeout)
+        return call
+
+    def _reserve(self, call: _PendingCall, prompt: str, timeout: Optional[float]):
+        """Reserve rate-limit capacity for a call and dispatch it once it may be sent"""
+        # Waiting for capacity counts as queueing; the call only takes a
+        # pool slot once it may be sent
+        wait_seconds = self.limiter.reserve(estimate_tokens(prompt))
+        if wait_seconds > 0:
+            self._delayed.call_at(time.monotonic() + wait_seconds, lambda: self._dispatch(call, prompt, timeout))
+        else:
+            self._dispatch(call, prompt, timeout)
+
+    def _dispatch(self, call: _PendingCall, prompt: str, timeout: Optional[float]):
+        """Hand a call whose rate-limit wait is over to the pool"""
+        try:
+            self.pool.submit(self._run, call, prompt, timeout)
+        except RuntimeError as e:  # Pool shut down
+            if call.future.set_running_or_notify_cancel():
+                self.breaker.release(call.probe)
+                call.future.set_exception(e)
+            self._finish(call)
+
+    def _run(self, call: _PendingCall, prompt: str, timeout: Optional[float]):
+        """Perform a call on a pool thread, unless it was cancelled while queued"""
+        try:
+            if not call.future.set_running_or_notify_cancel():
+                return
+            call.started_at = time.monotonic()
+            call.started.set()
+            try:
+                response = self._invoke(prompt, timeout)
+            except Exception as e:
+                self.breaker.record(time.monotonic() - call.started_at, failed=True, probe=call.probe)
+                call.future.set_exception(e)
+                return
+            self.breaker.record(time.monotonic() - call.started_at, failed=False, probe=call.probe)
+            call.future.set_result(response)
+        finally:
+            self._finish(call)
+
+    def _finish(self, call: _PendingCall):
+        """Hand a finished background call's slot to the next queued one"""
+        if not call.background:
+            return
+        while True:
+            with self._background_lock:
+                if not self._background_queue:
+                    self._background_active -= 1
+                    return
+                queued = self._background_queue.popleft()
+            if not queued[0].future.cancelled():
+                self._reserve(*queued)
+                return
+
+    def _try_submit(self, prompt: str, timeout: float) -> Optional[_PendingCall]:
+        """Submit a hedge or retry attempt unless the breaker rejects it"""
+        try:
+            return self._submit(prompt, timeout)
+        except CircuitOpenError:
+            return None
+
+    def _wait_started(self, call: _PendingCall, deadline: Optional[float] = None) -> Optional[float]:
+        """Wait until a queued call starts; None if it finished without starting or the deadline passed"""
+        while not call.started.is_set():
+            if call.future.done():
+                break
+            wait_for = 1.0
+            if deadline is not None:
+                wait_for = min(wait_for, deadline - time.monotonic())
+                if wait_for <= 0:
+                    break
+            call.started.wait(wait_for)
+        return call.started_at
+
+    def _cancel(self, call: _PendingCall) -> bool:
+        """Cancel a call that has not started; False if it already has"""
+        if not call.future.cancel():
+            return False
+        self.breaker.release(call.probe)
+        return True
+
+    def _await(self, call: _PendingCall, timeout: Optional[float]) -> str:
+        """Wait for a call, applying its deadline from the moment it started"""
+        timeout = timeout or self.timeout
+        self._wait_started(call)
+
+        if call.started_at is not None:
+            remaining = call.started_at + timeout - time.monotonic()
+        else:
+            remaining = 0.0
+
+        try:
+            return call.future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise TimeoutError(f"LLM call exceeded {timeout}s deadline")
+
+    def _invoke(self, prompt: str, timeout: Optional[float]) -> str:
+        """Perform one blocking Gemini call"""
+        kwargs = {}
+        if self._request_options:
+            kwargs["request_options"] = {"timeout": timeout or self.timeout}
+
+        with self._stats_lock:
+            self.calls += 1
+        try:
+            response = self.model.generate_content(prompt, **kwargs)
+            return response.text
+        except Exception as e:
+            with self._stats_lock:
+                self.failures += 1
+            logger.error(f"Error calling Gemini LLM: {e}")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters, rate limiter and pool metrics"""
+        return {
+            "available": self.available,
+            "model": self.model_name,
+            "timeout_seconds": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "retries": self.retries,
+            "hedge_after_seconds": self.hedge_after,
+            "max_retries": self.max_retries,
+            "circuit_breaker": self.breaker.stats(),
+            "rate_limit": {**self.limiter.stats(), "waiting": len(self._delayed)},
+            "background": {
+                "max_concurrency": self.background_concurrency,
+                "active": self._background_active,
+                "queued": len(self._background_queue)
+            },
+            "pool": self.pool.stats()
+        }
+
+    def shutdown(self):
+        """Shut down the call pool and the rate-limit dispatcher"""
+        self._delayed.shutdown()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+llm_client = LLMClient()
@@ -0,0 +1,561 @@
+"""
+Document Parse Pool
+Pre-forked worker processes for PDF/DOCX extraction and resume parsing,
+with per-document timeouts, hung-worker replacement and backpressure
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from app.config import settings
+from app.services.pdf_extraction import extraction_metrics
+from app.utils.executors import ExecutionPool, _percentile, run_cpu
+
+logger = logging.getLogger(__name__)
+
+# Seconds a new worker may take to import the parsing libraries
+_START_TIMEOUT = 120.0
+# Liveness check interval while waiting for a result
+_POLL_INTERVAL = 0.5
+# ParsingService methods workers run
+_METHODS = {"parse_document", "parse_pdf_head", "extract_pdf_pages", "parse_pdf_pages"}
+# Module the forkserver imports once so workers fork from a process with the parsers loaded
+_PRELOAD = ["app.services.parsing_service"]
+# Attempts to start a replacement worker before leaving the slot empty
+_SPAWN_ATTEMPTS = 3
+# Seconds between refill attempts while waiting for a worker with slots empty
+_REFILL_INTERVAL = 5.0
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this PID exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ParsePoolFullError(RuntimeError):
+    """Raised when too many documents are already waiting to be parsed"""
+
+
+class ParseTimeoutError(TimeoutError):
+    """Raised when a document takes longer than PARSE_TIMEOUT"""
+
+
+class ParseWorkerError(RuntimeError):
+    """Raised when a worker process dies while parsing a document"""
+
+
+def _worker_main(conn, parent_pid: int):
+    """
+    Worker process loop: preload parsers, then parse documents sent by the parent
+
+    Messages are (method, args) tasks naming a ParsingService method, where
+    documents are passed as bytes or a file path, answered with
+    (True, result, reports) or (False, exception, reports), reports being
+    the PDF extraction reports for the parent's metrics; None asks the
+    worker to exit.
+    """
+    # Imported here so spawned workers load the libraries (pdfplumber, PyMuPDF,
+    # python-docx, spaCy model) once; workers forked from the forkserver (or
+    # the parent) already have them
+    from app.services.parsing_service import parsing_service
+    from app.services.pdf_extraction import extraction_metrics
+
+    extraction_metrics.forward_reports()
+
+    conn.send("ready")
+    while True:
+        # Exit if the API process went away without closing the pipe
+        # (a forkserver child's parent is the server, so check the PID itself)
+        if not conn.poll(1.0):
+            if not _pid_alive(parent_pid):
+                break
+            continue
+
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        method, args = task
+        try:
+            if method not in _METHODS:
+                raise ValueError(f"Unknown parse method: {method}")
+            result = getattr(parsing_service, method)(*args)
+            conn.send((True, result, extraction_metrics.drain()))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+                error = e
+            except Exception:
+                error = RuntimeError(f"{type(e).__name__}: {e}")
+            conn.send((False, error, extraction_metrics.drain()))
+
+    conn.close()
+
+
+class _Worker:
+    """One worker process and the parent end of its pipe"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.tasks = 0
+
+    def stop(self, kill: bool = False):
+        """Stop the process (killing it immediately if requested)"""
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ParsePool:
+    """
+    Process pool for document parsing
+
+    Each worker is a separate process, so parsing scales with cores and a
+    slow PDF never holds the GIL of the API process. A document that runs
+    past the timeout gets its worker killed and replaced, and callers see
+    ParseTimeoutError. At most max_workers + queue_size documents are
+    accepted at once; beyond that ParsePoolFullError is raised right away.
+
+    Workers are pre-started by start(). The default "forkserver" start method
+    forks them from a single-threaded server process that has imported the
+    parsers and spaCy model once, so they start fast without inheriting the
+    API process's threads and locks (plain "fork" of a process running
+    thread pools and torch can deadlock a child on a lock held mid-fork).
+    A worker that cannot be started, at startup or as a replacement,
+    leaves its slot empty until a later call refills it; callers that find
+    no worker free within the time the queue ahead of them can take get
+    ParsePoolFullError instead of waiting forever, and get it at once while
+    every slot is empty. With max_workers = 0 documents are parsed in the shared CPU
+    thread pool.
+
+    PDFs longer than pdf_chunk_pages pages are read in page chunks on
+    several workers at once, so a long document costs roughly one chunk's
+    time instead of all its pages'. Chunks go out in waves of at most one
+    per worker, sized from the characters per page seen so far to the
+    pdf_max_chars still missing, and stop once the budget is met; all
+    chunks of a document share its one timeout.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        queue_size: int = 32,
+        timeout: float = 30.0,
+        start_method: str = "forkserver",
+        max_tasks_per_worker: int = 0,
+        pdf_chunk_pages: int = 0,
+        pdf_max_chars: int = 0
+    ):
+        """
+        Initialize parse pool (workers start on start() or first use)
+
+        Args:
+            max_workers: Worker processes (0 disables the pool)
+            queue_size: Documents allowed to wait for a free worker
+            timeout: Parse deadline in seconds per document (shared by the chunks of split PDFs)
+            start_method: multiprocessing start method
+            max_tasks_per_worker: Tasks before a worker is recycled (0 = never)
+            pdf_chunk_pages: Split longer PDFs across workers in chunks of
+                this many pages (0 disables)
+            pdf_max_chars: Characters after which no further chunks of a
+                split PDF are read (0 = all pages)
+        """
+        self.max_workers = max(0, int(max_workers))
+        self.queue_size = max(0, int(queue_size))
+        self.max_pending = self.max_workers + self.queue_size
+        self.timeout = timeout
+        self.start_method = start_method
+        self.max_tasks_per_worker = max(0, int(max_tasks_per_worker))
+        self.pdf_chunk_pages = max(0, int(pdf_chunk_pages))
+        self.pdf_max_chars = max(0, int(pdf_max_chars))
+        self._ctx = None
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: set = set()
+        self._dispatch: Optional[ExecutionPool] = None
+        self._lock = threading.Lock()
+        self._spawn_lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._wait_times = deque(maxlen=1000)
+        self._parse_times = deque(maxlen=1000)
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.rejected = 0
+        self.split_documents = 0
+        self.page_chunks = 0
+        self.skipped_pages = 0
+        self.spawn_failures = 0
+        self._missing = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether documents are parsed in worker processes"""
+        return self.max_workers > 0
+
+    def start(self):
+        """Pre-start worker processes (idempotent)"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._started or self._closed:
+                return
+            self._ctx = multiprocessing.get_context(self.start_method)
+            if self.start_method == "forkserver":
+                self._ctx.set_forkserver_preload(_PRELOAD)
+            self._dispatch = ExecutionPool("parse", self.max_pending)
+            self._started = True
+            self._missing = self.max_workers
+
+        # Slots that fail to start stay empty for later calls to retry
+        self._refill()
+        logger.info(f"Parse pool started: {self.max_workers - self._missing}/{self.max_workers} workers "
+                    f"({self.start_method}), queue {self.queue_size}, timeout {self.timeout}s")
+
+    async def parse(self, source: Union[bytes, Path], file_type: str) -> Any:
+        """
+        Parse a document in a worker process
+
+        Args:
+            source: Document bytes or path to document
+            file_type: Document type ("pdf" or "docx")
+
+        Returns:
+            ParsedResume object
+
+        Raises:
+            ParsePoolFullError: Too many documents are already waiting
+            ParseTimeoutError: Parsing exceeded the timeout
+            ParseWorkerError: The worker process died
+        """
+        if not self.enabled:
+            from app.services.parsing_service import parsing_service
+            return await run_cpu(parsing_service.parse_document, source, file_type)
+
+        self.start()
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ParsePoolFullError(f"Parse queue is full ({self.max_pending} documents pending)")
+            self.pending += 1
+
+        try:
+            if isinstance(source, Path):
+                source = str(source)
+            if file_type == "pdf" and self.pdf_chunk_pages and self.max_workers > 1:
+                return await self._parse_pdf_chunked(source)
+            return await self._call("parse_document", source, file_type)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def _parse_pdf_chunked(self, source: Union[bytes, str]) -> Any:
+        """
+        Parse a PDF, spreading the pages of a long one across workers
+
+        The first chunk of pages is read (and for short documents parsed)
+        by one worker. The rest follows in waves of concurrent chunks, at
+        most one per worker and no more pages than the character budget
+        still needs at the characters per page read so far; reading stops
+        once pdf_max_chars is reached. Pages are reassembled in order
+        before parsing, and every call shares the document's deadline.
+        """
+        deadline = time.perf_counter() + self.timeout
+        head = await self._call("parse_pdf_head", source, self.pdf_chunk_pages, deadline=deadline)
+        if head.resume is not None:
+            return head.resume
+
+        chunk = self.pdf_chunk_pages
+        pages = list(head.pages)
+        chars = sum(len(page) for page in pages)
+        next_page = len(pages)
+        chunks_read = 1
+        while next_page < head.page_count and not (self.pdf_max_chars and chars >= self.pdf_max_chars):
+            wave_pages = min(head.page_count - next_page, chunk * self.max_workers)
+            if self.pdf_max_chars:
+                chars_per_page = max(chars / len(pages), 1.0) if pages else 1.0
+                wave_pages = min(wave_pages, math.ceil((self.pdf_max_chars - chars) / chars_per_page))
+            ranges = [
+                (start, min(start + chunk, next_page + wave_pages))
+                for start in range(next_page, next_page + wave_pages, chunk)
+            ]
+            chunks: List[List[str]] = await asyncio.gather(*(
+                self._call("extract_pdf_pages", source, start, stop, deadline=deadline)
+                for start, stop in ranges
+            ))
+            for chunk_pages in chunks:
+                pages.extend(chunk_pages)
+                chars += sum(len(page) for page in chunk_pages)
+            next_page = ranges[-1][1]
+            chunks_read += len(ranges)
+
+        with self._lock:
+            self.split_documents += 1
+            self.page_chunks += chunks_read
+            self.skipped_pages += head.page_count - next_page
+        return await self._call("parse_pdf_pages", pages, deadline=deadline)
+
+    async def _call(self, method: str, *args, deadline: Optional[float] = None) -> Any:
+        """Run one ParsingService method in a worker process (by the perf_counter deadline, if given)"""
+        return await self._dispatch.run(self._call_blocking, method, args, deadline)
+
+    def _call_blocking(self, method: str, args: tuple, deadline: Optional[float] = None) -> Any:
+        """Wait for an idle worker, send it the task and wait for the result"""
+        queued_at = time.perf_counter()
+        if self._missing:
+            self._refill()
+        worker = self._get_idle(queued_at, deadline)
+        started_at = time.perf_counter()
+        if deadline is None:
+            deadline = started_at + self.timeout
+        elif started_at >= deadline:
+            self._idle.put(worker)
+            with self._lock:
+                self.timeouts += 1
+                self.failed += 1
+            raise ParseTimeoutError(f"Document parsing exceeded {self.timeout}s")
+        replace = False
+
+        try:
+            if not worker.ready:
+                self._wait_ready(worker)
+            worker.conn.send((method, args))
+            worker.tasks += 1
+            ok, result, reports = self._receive(worker, min(deadline, started_at + self.timeout))
+        except ParseTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+                self.failed += 1
+            source = args[0]
+            document = Path(source).name if isinstance(source, str) else f"{len(source)}-byte document"
+            logger.warning(f"{method} of {document} exceeded {self.timeout}s, "
+                           f"killing worker {worker.process.pid}")
+            replace = True
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            replace = True
+            raise
+        finally:
+            if replace or (self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker):
+                self._replace(worker, kill=replace)
+            else:
+                self._idle.put(worker)
+
+        with self._lock:
+            self._wait_times.append(started_at - queued_at)
+            self._parse_times.append(time.perf_counter() - started_at)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+        for report in reports:
+            extraction_metrics.record(report)
+        if not ok:
+            raise result
+        return result
+
+    def _receive(self, worker: _Worker, deadline: float):
+        """Wait for a worker's answer until the deadline, watching for its death"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise ParseTimeoutError(f"Document parsing exceeded {self.timeout}s")
+            if worker.conn.poll(min(_POLL_INTERVAL, remaining)):
+                try:
+                    return worker.conn.recv()
+                except (EOFError, OSError):
+                    raise ParseWorkerError("Parse worker exited while parsing document")
+            if not worker.process.is_alive():
+                raise ParseWorkerError(
+                    f"Parse worker exited with code {worker.process.exitcode} while parsing document"
+                )
+
+    def _wait_ready(self, worker: _Worker):
+        """Wait for a new worker to finish loading (not counted against the parse timeout)"""
+        if not worker.conn.poll(_START_TIMEOUT) or worker.conn.recv() != "ready":
+            raise ParseWorkerError(f"Parse worker did not start within {_START_TIMEOUT}s")
+        worker.ready = True
+
+    def _spawn(self) -> _Worker:
+        """Start one worker process"""
+        with self._spawn_lock:
+            parent_conn, child_conn = self._ctx.Pipe()
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(child_conn, os.getpid()),
+                name="parse-worker",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+
+        worker = _Worker(process, parent_conn)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _get_idle(self, queued_at: float, deadline: Optional[float]) -> _Worker:
+        """
+        Take an idle worker, waiting at most as long as the queue ahead can take
+
+        While slots are empty the wait retries starting their workers, and
+        gives up at once if no worker could be started at all.
+
+        Raises:
+            ParseTimeoutError: The document deadline passed while waiting
+            ParsePoolFullError: No worker became free in time (e.g. workers were lost)
+        """
+        # Every queued document ahead of this one may use a full timeout per worker
+        max_wait = self.timeout * (1 + math.ceil(self.queue_size / self.max_workers))
+        wait_until = queued_at + max_wait if deadline is None else min(queued_at + max_wait, deadline)
+        while True:
+            if self._missing >= self.max_workers:
+                self._refill()
+            if self._missing >= self.max_workers:
+                with self._lock:
+                    self.failed += 1
+                    self.rejected += 1
+                raise ParsePoolFullError("No parse workers could be started")
+
+            remaining = wait_until - time.perf_counter()
+            try:
+                return self._idle.get(timeout=max(0.0, min(remaining, _REFILL_INTERVAL)))
+            except queue.Empty:
+                if remaining > _REFILL_INTERVAL:
+                    if self._missing:
+                        self._refill()
+                    continue
+
+            with self._lock:
+                self.failed += 1
+                if deadline is not None and wait_until >= deadline:
+                    self.timeouts += 1
+                    timed_out = True
+                else:
+                    self.rejected += 1
+                    timed_out = False
+            if timed_out:
+                raise ParseTimeoutError(f"Document parsing exceeded {self.timeout}s")
+            raise ParsePoolFullError(f"No parse worker became free within {max_wait:.1f}s")
+
+    def _replace(self, worker: _Worker, kill: bool):
+        """Stop a worker and return a fresh one to the idle queue"""
+        worker.stop(kill=kill)
+        with self._lock:
+            self._workers.discard(worker)
+            self.restarts += 1
+            self._missing += 1
+        self._refill()
+
+    def _refill(self):
+        """Start workers for empty slots; slots that still fail stay empty for the next call to retry"""
+        while True:
+            with self._lock:
+                if self._closed or self._missing <= 0:
+                    return
+                self._missing -= 1
+
+            for attempt in range(1, _SPAWN_ATTEMPTS + 1):
+                try:
+                    self._idle.put(self._spawn())
+                    break
+                except Exception as e:
+                    with self._lock:
+                        self.spawn_failures += 1
+                    logger.error(f"Could not start parse worker (attempt {attempt}/{_SPAWN_ATTEMPTS}): {e}")
+            else:
+                with self._lock:
+                    self._missing += 1
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Return worker, queue and timing metrics"""
+        with self._lock:
+            wait_times = list(self._wait_times)
+            parse_times = list(self._parse_times)
+            stats = {
+                "enabled": self.enabled,
+                "workers": self.max_workers,
+                "alive": sum(1 for worker in self._workers if worker.process.is_alive()),
+                "start_method": self.start_method,
+                "timeout_seconds": self.timeout,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "rejected": self.rejected,
+                "spawn_failures": self.spawn_failures,
+                "missing_workers": self._missing,
+                "pdf_chunk_pages": self.pdf_chunk_pages,
+                "split_documents": self.split_documents,
+                "page_chunks": self.page_chunks,
+                "pages_skipped_by_char_limit": self.skipped_pages
+            }
+
+        stats.update({
+            "wait_ms_avg": round(sum(wait_times) / len(wait_times) * 1000, 3) if wait_times else 0.0,
+            "wait_ms_p99": round(_percentile(wait_times, 99) * 1000, 3),
+            "parse_ms_avg": round(sum(parse_times) / len(parse_times) * 1000, 3) if parse_times else 0.0,
+            "parse_ms_p99": round(_percentile(parse_times, 99) * 1000, 3)
+        })
+        return stats
+
+    def shutdown(self):
+        """Stop all workers"""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        if self._dispatch is not None:
+            self._dispatch.shutdown(wait=False, cancel_futures=True)
+        for worker in workers:
+            worker.stop()
+        logger.info("Parse pool shut down")
+
+
+# Global instance
+parse_pool = ParsePool(
+    max_workers=settings.PARSE_WORKERS,
+    queue_size=settings.PARSE_QUEUE_SIZE,
+    timeout=settings.PARSE_TIMEOUT,
+    start_method=settings.PARSE_START_METHOD,
+    max_tasks_per_worker=settings.PARSE_WORKER_MAX_TASKS,
+    pdf_chunk_pages=settings.PDF_PARALLEL_PAGES,
+    pdf_max_chars=settings.PDF_MAX_CHARS
+)
@@ -2,20 +2,36 @@
 Resume and Document Parsing Service
 Handles PDF, DOCX parsing and text extraction
 """
+import io
 import logging
 from pathlib import Path
-from typing import Optional, List, Dict
-import pdfplumber
-import fitz  # PyMuPDF
+from typing import Optional, List, Dict, NamedTuple, Union
 from docx import Document
 import spacy
 import re
 
 from app.models.resume import ParsedResume, Skill, Experience, Education
+from app.services.pdf_extraction import create_pdf_extractor, extraction_metrics
 from app.utils.text_utils import clean_text, extract_email, extract_phone
+from app.utils.skill_matcher import SkillMatcher
 
 logger = logging.getLogger(__name__)
 
+# A document given as a path or as its bytes (e.g. an upload read into memory)
+DocumentSource = Union[Path, str, bytes]
+
+
+def _is_bytes(source: DocumentSource) -> bool:
+    """Whether the document is held in memory"""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+class PdfHead(NamedTuple):
+    """First pages of a PDF, or the parsed resume if they cover the whole document"""
+    resume: Optional[ParsedResume]
+    pages: List[str]  # Page texts read so far (empty when resume is set)
+    page_count: int  # Pages of the document to read in total
+
 
 class ParsingService:
     """Service for parsing resumes and extracting information"""
@@ -30,6 +46,9 @@ class ParsingService:
             logger.warning("spaCy model not found. Run: python -m spacy download en_core_web_sm")
             self.nlp = None
         
+        # Fast extractor first, slower layout-aware fallback for low-quality pages
+        self.pdf_extractor = create_pdf_extractor()
+        
         # Common skill keywords
         self.skill_keywords = {
             'programming': ['python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'ruby', 'php', 'go', 'rust', 'kotlin', 'swift'],
@@ -40,56 +59,46 @@ class ParsingService:
             'tools': ['git', 'github', 'gitlab', 'jira', 'confluence', 'slack', 'vscode', 'intellij'],
             'soft_skills': ['leadership', 'communication', 'teamwork', 'problem-solving', 'analytical', 'creative']
         }
+        self.skill_matcher = SkillMatcher({
+            keyword: [keyword]
+            for keywords in self.skill_keywords.values()
+            for keyword in keywords
+        })
     
-    def extract_text_from_pdf(self, file_path: Path) -> str:
+    def extract_text_from_pdf(self, source: DocumentSource) -> str:
         """
         Extract text from PDF file
         
         Args:
-            file_path: Path to PDF file
+            source: Path to PDF file or the PDF bytes
             
         Returns:
             Extracted text
         """
-        text = ""
-        
         try:
-            # Try pdfplumber first
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            if text.strip():
-                logger.info(f"Extracted {len(text)} characters from PDF using pdfplumber")
-                return clean_text(text)
-            
-            # Fallback to PyMuPDF
-            doc = fitz.open(file_path)
-            for page in doc:
-                text += page.get_text()
-            doc.close()
+            text, report = self.pdf_extractor.extract(source)
+            extraction_metrics.record(report)
             
-            logger.info(f"Extracted {len(text)} characters from PDF using PyMuPDF")
+            logger.info(f"Extracted {len(text)} characters from {report.pages} PDF pages using "
+                       f"{', '.join(report.timings)} ({report.fallback_pages} pages re-extracted)")
             return clean_text(text)
             
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             raise
     
-    def extract_text_from_docx(self, file_path: Path) -> str:
+    def extract_text_from_docx(self, source: DocumentSource) -> str:
         """
         Extract text from DOCX file
         
         Args:
-            file_path: Path to DOCX file
+            source: Path to DOCX file or the DOCX bytes
             
         Returns:
             Extracted text
         """
         try:
-            doc = Document(file_path)
+            doc = Document(io.BytesIO(source) if _is_bytes(source) else source)
             text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
             logger.info(f"Extracted {len(text)} characters from DOCX")
             return clean_text(text)
@@ -97,6 +106,76 @@ class ParsingService:
             logger.error(f"Error extracting text from DOCX: {e}")
             raise
     
+    def parse_document(self, source: DocumentSource, file_type: str) -> ParsedResume:
+        """
+        Extract text from a document and parse it as a resume
+        
+        Args:
+            source: Path to document or the document bytes
+            file_type: Document type ("pdf" or "docx")
+            
+        Returns:
+            ParsedResume object
+            
+        Raises:
+            ValueError: If the document type is not supported
+        """
+        if file_type == "pdf":
+            text = self.extract_text_from_pdf(source)
+        elif file_type == "docx":
+            text = self.extract_text_from_docx(source)
+        else:
+            raise ValueError(f"Unsupported document type: {file_type}")
+        
+        return self.parse_resume(text)
+    
+    def parse_pdf_head(self, source: DocumentSource, head_pages: int) -> PdfHead:
+        """
+        Extract the first pages of a PDF, parsing it outright if they cover the document
+        
+        Args:
+            source: Path to PDF file or the PDF bytes
+            head_pages: Number of pages to read
+            
+        Returns:
+            PdfHead; when resume is None, the remaining pages are read with
+            extract_pdf_pages and the whole is parsed with parse_pdf_pages
+        """
+        pages, page_count, report = self.pdf_extractor.extract_pages(source, 0, head_pages)
+        extraction_metrics.record(report)
+        
+        if len(pages) >= page_count:
+            return PdfHead(self.parse_pdf_pages(pages), [], page_count)
+        return PdfHead(None, pages, page_count)
+    
+    def extract_pdf_pages(self, source: DocumentSource, start: int, stop: int) -> List[str]:
+        """
+        Extract the text of a PDF page range
+        
+        Args:
+            source: Path to PDF file or the PDF bytes
+            start: First page index
+            stop: Page index to stop before
+            
+        Returns:
+            Page texts
+        """
+        pages, _, report = self.pdf_extractor.extract_pages(source, start, stop)
+        extraction_metrics.record(report)
+        return pages
+    
+    def parse_pdf_pages(self, pages: List[str]) -> ParsedResume:
+        """
+        Assemble PDF page texts in order and parse them as a resume
+        
+        Args:
+            pages: Page texts in document order
+            
+        Returns:
+            ParsedResume object
+        """
+        return self.parse_resume(clean_text(self.pdf_extractor.join(pages)))
+    
     def extract_skills(self, text: str) -> List[Skill]:
         """
         Extract skills from text
@@ -108,11 +187,11 @@ class ParsingService:
             List of extracted skills
         """
         skills = []
-        text_lower = text.lower()
+        found_keywords = self.skill_matcher.extract(text)
         
         for category, keywords in self.skill_keywords.items():
             for keyword in keywords:
-                if re.search(rf'\b{re.escape(keyword)}\b', text_lower):
+                if keyword in found_keywords:
                     skills.append(Skill(
                         name=keyword.title(),
                         category=category,
@@ -0,0 +1,439 @@
+"""
+PDF Text Extraction
+Ordered extractor strategy (fast first) with a per-page text quality gate
+and per-strategy metrics
+"""
+import io
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from app.config import settings
+from app.utils.executors import _percentile
+
+logger = logging.getLogger(__name__)
+
+# Unmapped glyphs (pdfplumber), replacement characters, private-use glyphs and control characters
+_GARBAGE_PATTERN = re.compile(r"\(cid:\d+\)|[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class TextQuality(NamedTuple):
+    """Quality of text extracted from one page"""
+    chars: int  # Non-whitespace characters
+    garbage_ratio: float  # Share of characters that are undecodable glyphs
+    word_coverage: float  # Share of tokens that look like words
+    passed: bool
+
+    @property
+    def score(self) -> float:
+        """Comparable quality score (passing text always ranks higher)"""
+        return (1.0 if self.passed else 0.0) + self.chars * (1 - self.garbage_ratio) * self.word_coverage / 1e6
+
+
+def assess_text_quality(
+    text: str,
+    min_chars: int = 30,
+    max_garbage_ratio: float = 0.05,
+    min_word_coverage: float = 0.5
+) -> TextQuality:
+    """
+    Score extracted text against the quality gate
+
+    Args:
+        text: Page text
+        min_chars: Minimum non-whitespace characters
+        max_garbage_ratio: Maximum share of undecodable characters
+        min_word_coverage: Minimum share of word-like tokens
+
+    Returns:
+        TextQuality
+    """
+    tokens = text.split()
+    chars = sum(len(token) for token in tokens)
+    if chars == 0:
+        return TextQuality(0, 0.0, 0.0, min_chars <= 0)
+
+    garbage = sum(len(match) for match in _GARBAGE_PATTERN.findall(text))
+    garbage_ratio = min(1.0, garbage / chars)
+    words = sum(
+        1 for token in tokens
+        if sum(c.isalpha() for c in token) >= max(2, 0.6 * len(token))
+    )
+    word_coverage = words / len(tokens)
+
+    passed = (
+        chars >= min_chars
+        and garbage_ratio <= max_garbage_ratio
+        and word_coverage >= min_word_coverage
+    )
+    return TextQuality(chars, round(garbage_ratio, 4), round(word_coverage, 4), passed)
+
+
+class _PyMuPDFDocument:
+    """PyMuPDF reader: fast, plain reading order"""
+
+    name = "pymupdf"
+
+    def __init__(self, source: Union[bytes, Path, str]):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.doc = fitz.open(stream=source, filetype="pdf")
+        else:
+            self.doc = fitz.open(source)
+
+    def __len__(self) -> int:
+        return self.doc.page_count
+
+    def page_text(self, index: int) -> str:
+        return self.doc[index].get_text()
+
+    def close(self):
+        self.doc.close()
+
+
+class _PdfplumberDocument:
+    """pdfplumber reader: slow, layout-aware"""
+
+    name = "pdfplumber"
+
+    def __init__(self, source: Union[bytes, Path, str]):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        self.pdf = pdfplumber.open(source)
+
+    def __len__(self) -> int:
+        return len(self.pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        return self.pdf.pages[index].extract_text() or ""
+
+    def close(self):
+        self.pdf.close()
+
+
+EXTRACTORS = {
+    _PyMuPDFDocument.name: _PyMuPDFDocument,
+    _PdfplumberDocument.name: _PdfplumberDocument
+}
+
+
+@dataclass
+class ExtractionReport:
+    """What happened while extracting one PDF (or one page range of it)"""
+    first_page: int = 0  # Index of the first page read
+    pages: int = 0  # Pages read
+    truncated: bool = False  # Stopped early at the page or character limit
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per extractor used
+    extracted_pages: Dict[str, int] = field(default_factory=dict)  # Pages read per extractor
+    fallback_pages: int = 0  # Pages re-extracted after failing the gate
+    failed_pages: int = 0  # Pages that still fail the gate
+    errors: List[str] = field(default_factory=list)
+
+
+class PDFTextExtractor:
+    """
+    Extracts PDF text with an ordered list of extractors
+
+    The first extractor reads every page. Each page is scored by
+    assess_text_quality, and only pages that fail the gate are re-read by
+    the next extractor; the better of the two texts is kept. An extractor
+    that cannot open the document is skipped.
+
+    Reading stops early after max_pages pages or once max_chars characters
+    have been extracted, since text past MAX_TEXT_LENGTH is truncated
+    downstream anyway. Page ranges can be extracted separately (e.g. by
+    different workers) and reassembled with join().
+    """
+
+    def __init__(
+        self,
+        extractors: List[str],
+        min_chars: int = 30,
+        max_garbage_ratio: float = 0.05,
+        min_word_coverage: float = 0.5,
+        max_pages: int = 0,
+        max_chars: int = 0
+    ):
+        """
+        Initialize extractor
+
+        Args:
+            extractors: Extractor names in order, e.g. ["pymupdf", "pdfplumber"]
+            min_chars: Quality gate minimum non-whitespace characters per page
+            max_garbage_ratio: Quality gate maximum share of undecodable characters
+            min_word_coverage: Quality gate minimum share of word-like tokens
+            max_pages: Read at most this many pages (0 = all)
+            max_chars: Stop after the page that reaches this many characters (0 = no limit)
+        """
+        unknown = [name for name in extractors if name not in EXTRACTORS]
+        if unknown or not extractors:
+            raise ValueError(f"Unknown PDF extractors {unknown}; choose from {sorted(EXTRACTORS)}")
+        self.extractors = list(extractors)
+        self.min_chars = min_chars
+        self.max_garbage_ratio = max_garbage_ratio
+        self.min_word_coverage = min_word_coverage
+        self.max_pages = max(0, int(max_pages))
+        self.max_chars = max(0, int(max_chars))
+
+    def assess(self, text: str) -> TextQuality:
+        """Score page text against this extractor's gate"""
+        return assess_text_quality(text, self.min_chars, self.max_garbage_ratio, self.min_word_coverage)
+
+    def extract(self, source: Union[bytes, Path, str]) -> Tuple[str, ExtractionReport]:
+        """
+        Extract text from a PDF
+
+        Args:
+            source: Path to PDF file or the PDF bytes
+
+        Returns:
+            Tuple of (text with pages separated by newlines, extraction report)
+
+        Raises:
+            Exception: The error of the last extractor if none could open the PDF
+        """
+        pages, _, report = self.extract_pages(source)
+        return self.join(pages), report
+
+    def extract_pages(
+        self,
+        source: Union[bytes, Path, str],
+        start: int = 0,
+        stop: Optional[int] = None
+    ) -> Tuple[List[str], int, ExtractionReport]:
+        """
+        Extract the text of a page range
+
+        Args:
+            source: Path to PDF file or the PDF bytes
+            start: First page index
+            stop: Page index to stop before (None = end of document)
+
+        Returns:
+            Tuple of (page texts, number of pages of the document to read
+            in total given the limits, extraction report). The total equals
+            start + len(page texts) when the character limit was reached.
+
+        Raises:
+            Exception: The error of the last extractor if none could open the PDF
+        """
+        report = ExtractionReport(first_page=start)
+        pages: Optional[List[str]] = None
+        qualities: List[Optional[TextQuality]] = []
+        pending: List[int] = []
+        total = 0
+        last_error: Optional[Exception] = None
+
+        for name in self.extractors:
+            started_at = time.perf_counter()
+            try:
+                doc = EXTRACTORS[name](source)
+            except Exception as e:
+                logger.warning(f"{name} could not open PDF: {e}")
+                report.errors.append(f"{name}: {e}")
+                last_error = e
+                continue
+
+            try:
+                if pages is None:
+                    total = len(doc) if not self.max_pages else min(len(doc), self.max_pages)
+                    report.truncated = total < len(doc)
+                    end = total if stop is None else min(stop, total)
+                    pages, qualities = self._read_first(doc, start, end, report)
+                    if start + len(pages) < end:
+                        total = start + len(pages)
+                        report.truncated = True
+                    pending = [i for i, quality in enumerate(qualities) if not quality.passed]
+                    report.extracted_pages[name] = len(pages)
+                else:
+                    report.fallback_pages += len(pending)
+                    report.extracted_pages[name] = len(pending)
+                    pending = self._read_fallback(doc, start, pending, pages, qualities, report)
+            finally:
+                doc.close()
+                report.timings[name] = time.perf_counter() - started_at
+
+            if not pending:
+                break
+
+        if pages is None:
+            raise last_error
+
+        report.pages = len(pages)
+        report.failed_pages = len(pending)
+        return pages, total, report
+
+    def _read_first(self, doc, start: int, end: int, report: ExtractionReport) -> Tuple[List[str], List[TextQuality]]:
+        """Read pages start..end with the first extractor, stopping at the character limit"""
+        pages: List[str] = []
+        qualities: List[TextQuality] = []
+        chars = 0
+
+        for index in range(start, end):
+            text = self._page_text(doc, index, report)
+            pages.append(text)
+            qualities.append(self.assess(text))
+            chars += len(text)
+            if self.max_chars and chars >= self.max_chars:
+                break
+        return pages, qualities
+
+    def _read_fallback(
+        self,
+        doc,
+        start: int,
+        pending: List[int],
+        pages: List[str],
+        qualities: List[TextQuality],
+        report: ExtractionReport
+    ) -> List[int]:
+        """Re-read failing pages, keeping the better text; returns pages still failing"""
+        still_failing = []
+        for position in pending:
+            text = self._page_text(doc, start + position, report)
+            quality = self.assess(text)
+            if quality.score > qualities[position].score:
+                pages[position] = text
+                qualities[position] = quality
+            if not qualities[position].passed:
+                still_failing.append(position)
+        return still_failing
+
+    def _page_text(self, doc, index: int, report: ExtractionReport) -> str:
+        """Text of one page ("" if the extractor fails on it)"""
+        try:
+            return doc.page_text(index)
+        except Exception as e:
+            report.errors.append(f"{doc.name} page {index + 1}: {e}")
+            return ""
+
+    def join(self, pages: List[str]) -> str:
+        """
+        Assemble page texts in order, applying the character limit
+
+        Args:
+            pages: Page texts in document order
+
+        Returns:
+            Text with pages separated by newlines, ending with the page that
+            reaches max_chars
+        """
+        kept = []
+        chars = 0
+        for page in pages:
+            kept.append(page.rstrip("\n"))
+            chars += len(page)
+            if self.max_chars and chars >= self.max_chars:
+                break
+        return "\n".join(kept)
+
+
+class ExtractionMetrics:
+    """
+    Per-extractor timings and quality-gate fallback rates
+
+    Worker processes record into their own instance and forward the
+    reports with each result (see drain()), so the API process holds the
+    totals.
+    """
+
+    def __init__(self, sample_size: int = 1000):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        self._timings: Dict[str, deque] = {}
+        self._runs: Dict[str, int] = {}
+        self._pages: Dict[str, int] = {}
+        self._forward: Optional[List[ExtractionReport]] = None
+        self.documents = 0
+        self.page_ranges = 0
+        self.truncated = 0
+        self.pages = 0
+        self.fallback_extractions = 0
+        self.fallback_pages = 0
+        self.failed_pages = 0
+        self.errors = 0
+
+    def forward_reports(self):
+        """Keep recorded reports for drain() (used in worker processes)"""
+        self._forward = []
+
+    def drain(self) -> List[ExtractionReport]:
+        """Return and clear reports recorded since the last drain"""
+        with self._lock:
+            reports = self._forward or []
+            if self._forward is not None:
+                self._forward = []
+            return reports
+
+    def record(self, report: ExtractionReport):
+        """Record one document's (or page range's) extraction report"""
+        with self._lock:
+            if report.first_page == 0:
+                self.documents += 1
+            else:
+                self.page_ranges += 1
+            if report.truncated:
+                self.truncated += 1
+            self.pages += report.pages
+            self.fallback_pages += report.fallback_pages
+            self.failed_pages += report.failed_pages
+            self.errors += len(report.errors)
+            if report.fallback_pages:
+                self.fallback_extractions += 1
+            for name, seconds in report.timings.items():
+                self._timings.setdefault(name, deque(maxlen=self._sample_size)).append(seconds)
+                self._runs[name] = self._runs.get(name, 0) + 1
+                self._pages[name] = self._pages.get(name, 0) + report.extracted_pages.get(name, 0)
+            if self._forward is not None:
+                self._forward.append(report)
+
+    def stats(self) -> Dict:
+        """Return per-extractor timings and fallback rates"""
+        with self._lock:
+            extractions = self.documents + self.page_ranges
+            extractors = {}
+            for name, samples in self._timings.items():
+                timings = list(samples)
+                extractors[name] = {
+                    "runs": self._runs[name],
+                    "pages": self._pages[name],
+                    "ms_avg": round(sum(timings) / len(timings) * 1000, 3),
+                    "ms_p99": round(_percentile(timings, 99) * 1000, 3)
+                }
+            return {
+                "documents": self.documents,
+                "page_ranges": self.page_ranges,
+                "truncated": self.truncated,
+                "pages": self.pages,
+                "fallback_extractions": self.fallback_extractions,
+                "fallback_extraction_rate": round(self.fallback_extractions / extractions, 4) if extractions else 0.0,
+                "fallback_pages": self.fallback_pages,
+                "fallback_page_rate": round(self.fallback_pages / self.pages, 4) if self.pages else 0.0,
+                "failed_pages": self.failed_pages,
+                "errors": self.errors,
+                "extractors": extractors
+            }
+
+
+def create_pdf_extractor() -> PDFTextExtractor:
+    """Build PDF extractor from settings"""
+    return PDFTextExtractor(
+        extractors=[name.strip().lower() for name in settings.PDF_EXTRACTORS.split(",") if name.strip()],
+        min_chars=settings.PDF_QUALITY_MIN_CHARS,
+        max_garbage_ratio=settings.PDF_QUALITY_MAX_GARBAGE_RATIO,
+        min_word_coverage=settings.PDF_QUALITY_MIN_WORD_COVERAGE,
+        max_pages=settings.PDF_MAX_PAGES,
+        max_chars=settings.PDF_MAX_CHARS
+    )
+
+
+# Global instance
+extraction_metrics = ExtractionMetrics()
+
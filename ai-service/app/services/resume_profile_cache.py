@@ -0,0 +1,116 @@
+"""
+Resume Profile Cache
+Content-addressed cache of per-resume scoring features with an in-memory LRU
+tier and an optional SQLite tier that survives restarts
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional
+
+from app.config import settings
+from app.utils.cache import TieredCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction rules change so stale persisted profiles are ignored
+RESUME_PROFILE_VERSION = "v1"
+
+
+@dataclass
+class ResumeProfile:
+    """Resume-side scoring inputs, computed once per resume text"""
+    key: str
+    skills: FrozenSet[str]
+    years: float
+    education: str
+    embedding: Optional[Any] = None  # Filled lazily, not persisted
+
+    def to_json(self) -> str:
+        """Serialize persisted fields"""
+        return json.dumps({
+            "skills": sorted(self.skills),
+            "years": self.years,
+            "education": self.education
+        })
+
+    @classmethod
+    def from_json(cls, key: str, data: str) -> "ResumeProfile":
+        """Deserialize persisted fields"""
+        payload = json.loads(data)
+        return cls(
+            key=key,
+            skills=frozenset(payload["skills"]),
+            years=float(payload["years"]),
+            education=payload["education"]
+        )
+
+
+def resume_profile_key(resume_text: str) -> str:
+    """
+    Build profile key for resume text
+
+    The current year is part of the key because "2019 - present" ranges
+    count years up to today.
+    """
+    return content_hash(RESUME_PROFILE_VERSION, datetime.now().year, resume_text)
+
+
+class ResumeProfileCache(TieredCache):
+    """Two-tier cache of ResumeProfile objects keyed by content hash"""
+
+    def __init__(
+        self,
+        max_entries: int = 20000,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 200000
+    ):
+        """
+        Initialize resume profile cache
+
+        Args:
+            max_entries: Maximum profiles kept in memory
+            db_path: SQLite file for the persistent tier (None disables it)
+            max_disk_entries: Maximum rows kept on disk (oldest are pruned)
+        """
+        super().__init__(
+            "resume profile",
+            "resume_profiles",
+            max_entries=max_entries,
+            db_path=db_path,
+            max_disk_entries=max_disk_entries,
+            prune_every=1000
+        )
+
+    def serialize(self, profile: ResumeProfile) -> str:
+        """Serialize persisted profile fields"""
+        return profile.to_json()
+
+    def deserialize(self, key: str, data: str) -> ResumeProfile:
+        """Rebuild a profile from its persisted fields"""
+        return ResumeProfile.from_json(key, data)
+
+    def put(self, profile: ResumeProfile):
+        """Store profile in memory and, if enabled, on disk"""
+        super().put(profile.key, profile)
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        stats = super().stats()
+        del stats["cost_saved"]
+        return stats
+
+
+def create_resume_profile_cache() -> Optional[ResumeProfileCache]:
+    """Build resume profile cache from settings (None when caching is disabled)"""
+    if not settings.ENABLE_CACHE:
+        logger.info("Resume profile cache disabled (ENABLE_CACHE=false)")
+        return None
+
+    return ResumeProfileCache(
+        max_entries=settings.RESUME_PROFILE_CACHE_SIZE,
+        db_path=settings.RESUME_PROFILE_DB if settings.RESUME_PROFILE_PERSIST else None,
+        max_disk_entries=settings.RESUME_PROFILE_DISK_MAX
+    )
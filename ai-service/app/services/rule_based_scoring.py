@@ -4,9 +4,16 @@ Fast, free, and accurate scoring without LLM API calls
 """
 import logging
 import re
-from typing import Dict, List, Set, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Set, Optional, Tuple
 from datetime import datetime
+from app.config import settings
 from app.models.match import MatchScore, MatchExplanation, SkillMatch
+from app.services.resume_profile_cache import (
+    ResumeProfile, create_resume_profile_cache, resume_profile_key
+)
+from app.utils.cache import LRUCache, content_hash
+from app.utils.skill_matcher import SkillMatcher, SkillOccurrence
 
 logger = logging.getLogger(__name__)
 
@@ -91,12 +98,33 @@ SENIORITY_KEYWORDS = {
 }
 
 
+@dataclass
+class JobProfile:
+    """
+    Job-side scoring inputs, computed once per job
+    
+    text_* fields come from the job description alone; the effective fields
+    also include explicitly provided requirements.
+    """
+    key: str
+    text_skills: FrozenSet[str]
+    text_years: float
+    text_education: str
+    skills: FrozenSet[str]
+    required_years: float
+    required_education: str
+    embedding: Optional[Any] = None  # Filled lazily by callers that need it
+
+
 class RuleBasedScoring:
     """Fast rule-based scoring without LLM"""
     
     def __init__(self):
         """Initialize rule-based scoring"""
         self.skill_index = self._build_skill_index()
+        self.skill_matcher = SkillMatcher(SKILL_SYNONYMS)
+        self.job_profiles = LRUCache(max_size=settings.JOB_PROFILE_CACHE_SIZE)
+        self.resume_profiles = create_resume_profile_cache()
         logger.info("Rule-based scoring initialized")
     
     def _build_skill_index(self) -> Dict[str, str]:
@@ -107,33 +135,138 @@ class RuleBasedScoring:
                 index[synonym.lower()] = canonical
         return index
     
+    def _canonical_skill(self, skill: str) -> str:
+        """Map a user-provided skill name to its canonical form"""
+        normalized = skill.lower().strip()
+        return self.skill_index.get(normalized, normalized)
+    
+    def get_job_profile(
+        self,
+        job_description: str,
+        required_skills: Optional[List[str]] = None,
+        required_experience_years: float = 0,
+        required_education: str = "none",
+        preferred_skills: Optional[List[str]] = None
+    ) -> JobProfile:
+        """
+        Get job profile, extracting job requirements only on cache miss
+        
+        Args:
+            job_description: Job description text
+            required_skills: List of required skills
+            required_experience_years: Minimum years of experience (0 = extract from text)
+            required_education: Required education level ("none" = extract from text)
+            preferred_skills: List of preferred skills
+            
+        Returns:
+            JobProfile (shared between callers; treat as read-only)
+        """
+        explicit_skills = sorted(
+            self._canonical_skill(skill)
+            for skill in (required_skills or []) + (preferred_skills or [])
+        )
+        key = content_hash(
+            job_description,
+            "|".join(explicit_skills),
+            required_experience_years,
+            required_education
+        )
+        
+        profile = self.job_profiles.get(key)
+        if profile is not None:
+            return profile
+        
+        text_skills = frozenset(self._extract_skills(job_description))
+        text_years = self._extract_years_of_experience(job_description)
+        text_education = self._extract_education_level(job_description)
+        
+        profile = JobProfile(
+            key=key,
+            text_skills=text_skills,
+            text_years=text_years,
+            text_education=text_education,
+            skills=text_skills.union(explicit_skills),
+            # Explicit requirements override what the text says
+            required_years=required_experience_years if required_experience_years > 0 else text_years,
+            required_education=required_education if required_education != "none" else text_education
+        )
+        
+        if settings.ENABLE_CACHE:
+            self.job_profiles.set(key, profile)
+        return profile
+    
+    def get_resume_profile(self, resume_text: str) -> ResumeProfile:
+        """
+        Get resume profile, extracting resume features only on cache miss
+        
+        Args:
+            resume_text: Resume text
+            
+        Returns:
+            ResumeProfile (shared between callers; treat as read-only)
+        """
+        key = resume_profile_key(resume_text)
+        
+        if self.resume_profiles is not None:
+            profile = self.resume_profiles.get(key)
+            if profile is not None:
+                return profile
+        
+        profile = ResumeProfile(
+            key=key,
+            skills=frozenset(self._extract_skills(resume_text)),
+            years=self._extract_years_of_experience(resume_text),
+            education=self._extract_education_level(resume_text)
+        )
+        
+        if self.resume_profiles is not None:
+            self.resume_profiles.put(profile)
+        return profile
+    
+    def restore_resume_profile(self, profile: ResumeProfile):
+        """
+        Put a profile kept elsewhere back into the cache unless it is there
+        
+        Args:
+            profile: Profile from get_resume_profile (its key still current)
+        """
+        if self.resume_profiles is not None and self.resume_profiles.get(profile.key) is None:
+            self.resume_profiles.put(profile)
+    
     def calculate_match_score(
         self,
         resume_text: str,
         job_description: str,
-        similarity_score: Optional[float] = None
+        similarity_score: Optional[float] = None,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> MatchScore:
         """
         Calculate match score using rule-based logic
         
         Args:
-            resume_text: Resume text
+            resume_text: Resume text (unused when resume_profile is given)
             job_description: Job description text
             similarity_score: Pre-calculated similarity score (optional)
+            job_profile: Precomputed job profile (optional)
+            resume_profile: Precomputed resume profile (optional)
             
         Returns:
             MatchScore object with detailed breakdown
         """
         try:
+            job_profile = job_profile or self.get_job_profile(job_description)
+            resume_profile = resume_profile or self.get_resume_profile(resume_text)
+            
             # Extract information
-            resume_skills = self._extract_skills(resume_text)
-            job_skills = self._extract_skills(job_description)
+            resume_skills = set(resume_profile.skills)
+            job_skills = set(job_profile.text_skills)
             
-            resume_experience = self._extract_years_of_experience(resume_text)
-            required_experience = self._extract_years_of_experience(job_description)
+            resume_experience = resume_profile.years
+            required_experience = job_profile.text_years
             
-            resume_education = self._extract_education_level(resume_text)
-            required_education = self._extract_education_level(job_description)
+            resume_education = resume_profile.education
+            required_education = job_profile.text_education
             
             # Calculate component scores
             skills_score = self._calculate_skills_score(resume_skills, job_skills)
@@ -183,45 +316,49 @@ class RuleBasedScoring:
         required_experience_years: float = 0,
         required_education: str = "none",
         preferred_skills: Optional[List[str]] = None,
-        preferred_experience_years: Optional[float] = None
+        preferred_experience_years: Optional[float] = None,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> Dict[str, any]:
         """
         Calculate comprehensive match score with detailed breakdown
         
         Args:
-            resume_text: Resume text
+            resume_text: Resume text (unused when resume_profile is given)
             job_description: Job description text
             required_skills: List of required skills
             required_experience_years: Minimum years of experience
             required_education: Required education level
             preferred_skills: List of preferred skills
             preferred_experience_years: Preferred years of experience
+            job_profile: Precomputed job profile (optional, replaces the job arguments)
+            resume_profile: Precomputed resume profile (optional)
             
         Returns:
             Dict with scores and breakdown
         """
         try:
-            # Extract information
-            resume_skills = self._extract_skills(resume_text)
-            job_skills = self._extract_skills(job_description)
+            if job_profile is None:
+                job_profile = self.get_job_profile(
+                    job_description,
+                    required_skills,
+                    required_experience_years,
+                    required_education,
+                    preferred_skills
+                )
             
-            # Add explicitly provided skills
-            if required_skills:
-                for skill in required_skills:
-                    canonical = self.skill_index.get(skill.lower().strip(), skill.lower().strip())
-                    job_skills.add(canonical)
+            resume_profile = resume_profile or self.get_resume_profile(resume_text)
             
-            if preferred_skills:
-                for skill in preferred_skills:
-                    canonical = self.skill_index.get(skill.lower().strip(), skill.lower().strip())
-                    job_skills.add(canonical)
+            # Extract information
+            resume_skills = set(resume_profile.skills)
+            job_skills = set(job_profile.skills)
             
-            resume_experience = self._extract_years_of_experience(resume_text)
-            resume_education = self._extract_education_level(resume_text)
+            resume_experience = resume_profile.years
+            resume_education = resume_profile.education
             
-            # Override with explicit requirements if provided
-            req_exp_years = required_experience_years if required_experience_years > 0 else self._extract_years_of_experience(job_description)
-            req_edu = required_education if required_education != "none" else self._extract_education_level(job_description)
+            # Explicit requirements already override the text in the profile
+            req_exp_years = job_profile.required_years
+            req_edu = job_profile.required_education
             
             # Calculate component scores
             skills_score = self._calculate_skills_score(resume_skills, job_skills)
@@ -300,25 +437,17 @@ class RuleBasedScoring:
         return resume_rank >= required_rank
     
     def _extract_skills(self, text: str) -> Set[str]:
-        """Extract and normalize skills from text"""
-        text_lower = text.lower()
-        found_skills = set()
-        
-        # Check each skill synonym
-        for canonical, synonyms in SKILL_SYNONYMS.items():
-            for synonym in synonyms:
-                # Use word boundary matching to avoid partial matches
-                pattern = r'\b' + re.escape(synonym) + r'\b'
-                if re.search(pattern, text_lower):
-                    found_skills.add(canonical)
-                    break  # Found this skill, move to next
-        
-        return found_skills
+        """Extract and normalize skills from text (single pass over all synonyms)"""
+        return self.skill_matcher.extract(text)
     
     def extract_skills_from_text(self, text: str) -> Set[str]:
         """Public method to extract skills from text"""
         return self._extract_skills(text)
     
+    def extract_skill_occurrences(self, text: str) -> List[SkillOccurrence]:
+        """Public method to find skill mentions with their offsets"""
+        return self.skill_matcher.find_all(text)
+    
     def extract_years_of_experience(self, text: str) -> float:
         """Public method to extract years of experience"""
         return self._extract_years_of_experience(text)
@@ -469,7 +598,9 @@ class RuleBasedScoring:
         job_description: str,
         match_score: MatchScore,
         resume_skills: Optional[Set[str]] = None,
-        job_skills: Optional[Set[str]] = None
+        job_skills: Optional[Set[str]] = None,
+        job_profile: Optional[JobProfile] = None,
+        resume_profile: Optional[ResumeProfile] = None
     ) -> MatchExplanation:
         """
         Generate rule-based explanation for match score
@@ -480,27 +611,32 @@ class RuleBasedScoring:
             match_score: Calculated match score
             resume_skills: Pre-extracted resume skills (optional)
             job_skills: Pre-extracted job skills (optional)
+            job_profile: Precomputed job profile (optional)
+            resume_profile: Precomputed resume profile (optional)
             
         Returns:
             MatchExplanation object
         """
         try:
+            job_profile = job_profile or self.get_job_profile(job_description)
+            resume_profile = resume_profile or self.get_resume_profile(resume_text)
+            
             # Extract if not provided
             if resume_skills is None:
-                resume_skills = self._extract_skills(resume_text)
+                resume_skills = set(resume_profile.skills)
             if job_skills is None:
-                job_skills = self._extract_skills(job_description)
+                job_skills = set(job_profile.text_skills)
             
             # Analyze strengths and weaknesses
             matched_skills = resume_skills.intersection(job_skills)
             missing_skills = job_skills - resume_skills
             extra_skills = resume_skills - job_skills
             
-            resume_years = self._extract_years_of_experience(resume_text)
-            required_years = self._extract_years_of_experience(job_description)
+            resume_years = resume_profile.years
+            required_years = job_profile.text_years
             
-            resume_edu = self._extract_education_level(resume_text)
-            required_edu = self._extract_education_level(job_description)
+            resume_edu = resume_profile.education
+            required_edu = job_profile.text_education
             
             # Build strengths
             strengths = []
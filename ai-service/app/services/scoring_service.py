@@ -2,28 +2,52 @@
 Scoring Service
 Handles match scoring and explanation using Gemini LLM
 """
+import json
 import logging
-from typing import Dict, List, Optional
-import google.generativeai as genai
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 from app.config import settings
 from app.models.match import MatchScore, MatchExplanation, SkillMatch
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import llm_client, estimate_cost
+from app.utils.cache import content_hash
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+SCORE_FIELDS = ("overall_score", "skills_score", "experience_score", "education_score")
+
+# Prompt template versions (part of LLM cache keys; bump when a prompt changes)
+MATCH_PROMPT_VERSION = "match-v1"
+PACKED_MATCH_PROMPT_VERSION = "match-packed-v1"
+EXPLANATION_PROMPT_VERSION = "explanation-v1"
+
+# Shared by all ScoringService instances: concurrent identical prompts make one call
+llm_flights = SingleFlight("scoring_llm")
+
+
+class PackedMatchScore(NamedTuple):
+    """Match score for one candidate of a packed prompt"""
+    match_score: MatchScore
+    pack_size: int      # Candidates that shared the prompt (and the job description)
+    retried: bool       # Entry failed in the pack and was scored individually
+    cached: bool = False  # Served from the LLM cache without a call
+
 
 class ScoringService:
     """Service for scoring candidate-job matches"""
     
     def __init__(self):
-        """Initialize scoring service with Gemini"""
-        if settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
-            logger.info(f"Initialized Gemini model: {settings.GEMINI_MODEL}")
-        else:
-            logger.warning("Gemini API key not provided")
-            self.model = None
+        """Initialize scoring service with the shared Gemini client and LLM cache"""
+        self.client = llm_client
+        self.cache = llm_cache
+    
+    @property
+    def model(self):
+        """Configured Gemini model (None without an API key)"""
+        return self.client.model
     
     def calculate_match_score(
         self,
@@ -41,10 +65,259 @@ class ScoringService:
             
         Returns:
             MatchScore object with breakdown
+            
+        Raises:
+            CircuitOpenError: LLM circuit is open; fall back without the LLM
         """
         try:
             # Use LLM to analyze match
-            prompt = f"""
+            prompt = self._build_match_prompt(resume_text, job_description)
+            response = self._call_llm(
+                prompt,
+                cache_key=self._match_cache_key(resume_text, job_description),
+                is_valid=lambda text: self._match_json(text) is not None
+            )
+            return self._parse_match_score(response, similarity_score)
+            
+        except CircuitOpenError:
+            # Callers have a better fallback than moderate default scores
+            raise
+        except Exception as e:
+            logger.error(f"Error calculating match score: {e}")
+            # Return default scores on error
+            return self._default_match_score()
+    
+    def calculate_match_scores(
+        self,
+        pairs: List[Tuple[str, str]],
+        similarity_scores: Optional[List[Optional[float]]] = None
+    ) -> List[Optional[MatchScore]]:
+        """
+        Calculate match scores for several (resume, job) pairs concurrently
+        
+        Calls are fanned out through the shared LLM client (bounded
+        concurrency, rate limits, per-call deadlines), so wall-clock time
+        approaches the slowest call instead of the sum of all calls.
+        
+        Args:
+            pairs: List of (resume_text, job_description)
+            similarity_scores: Semantic similarity per pair (optional)
+            
+        Returns:
+            MatchScore per pair, with the same fallbacks as calculate_match_score;
+            None where the LLM circuit was open
+        """
+        if not pairs:
+            return []
+        similarity_scores = similarity_scores or [None] * len(pairs)
+        
+        keys = [self._match_cache_key(resume, job) for resume, job in pairs]
+        responses = [self._cache_get(key) for key in keys]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        
+        try:
+            prompts = {i: self._build_match_prompt(*pairs[i]) for i in missing}
+            fresh = self.client.generate_many([prompts[i] for i in missing]) if missing else []
+        except Exception as e:
+            logger.error(f"Error calculating match scores: {e}")
+            fresh = [e] * len(missing)
+        
+        for i, response in zip(missing, fresh):
+            responses[i] = response
+            if not isinstance(response, Exception) and self._match_json(response) is not None:
+                self._cache_put(keys[i], response, prompts[i])
+        
+        scores = []
+        for response, similarity_score in zip(responses, similarity_scores):
+            if isinstance(response, CircuitOpenError):
+                scores.append(None)
+                continue
+            if isinstance(response, Exception):
+                logger.error(f"Error calculating match score: {response}")
+                scores.append(self._default_match_score())
+                continue
+            try:
+                scores.append(self._parse_match_score(response, similarity_score))
+            except Exception as e:
+                logger.error(f"Error parsing match score: {e}")
+                scores.append(self._default_match_score())
+        
+        return scores
+    
+    def calculate_match_scores_packed(
+        self,
+        resume_texts: List[str],
+        job_description: str,
+        pack_size: Optional[int] = None
+    ) -> List[Optional[PackedMatchScore]]:
+        """
+        Calculate match scores for many resumes against one job, several per call
+        
+        Each prompt carries the job description once plus up to pack_size
+        truncated resumes and asks for a JSON array of per-candidate scores.
+        Packs are sent concurrently; entries missing or malformed in a
+        response are retried with single-candidate prompts. Per-candidate
+        results are cached, so only uncached candidates are packed.
+        
+        Args:
+            resume_texts: Resume texts
+            job_description: Job description text
+            pack_size: Resumes per prompt (defaults to LLM_PACK_SIZE)
+            
+        Returns:
+            PackedMatchScore per resume, in input order; None where the
+            LLM circuit was open
+        """
+        if not resume_texts:
+            return []
+        pack_size = max(1, pack_size or settings.LLM_PACK_SIZE)
+        results: List[Optional[PackedMatchScore]] = [None] * len(resume_texts)
+        
+        # Candidates already scored against this job need no call
+        keys = [self._packed_cache_key(resume_text, job_description) for resume_text in resume_texts]
+        for i, key in enumerate(keys):
+            cached = self._cache_get(key)
+            values = self._score_values(json.loads(cached)) if cached is not None else None
+            if values is not None:
+                results[i] = PackedMatchScore(MatchScore(**values), 1, False, cached=True)
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        packs = [pending[start:start + pack_size] for start in range(0, len(pending), pack_size)]
+        
+        try:
+            prompts = [
+                self._build_packed_prompt([resume_texts[i] for i in pack], job_description)
+                for pack in packs
+            ]
+            responses = self.client.generate_many(prompts)
+        except Exception as e:
+            logger.error(f"Error calculating packed match scores: {e}")
+            prompts = [""] * len(packs)
+            responses = [e] * len(packs)
+        
+        failed = []
+        for pack, prompt, response in zip(packs, prompts, responses):
+            if isinstance(response, CircuitOpenError):
+                continue  # Left as None; retrying would be rejected too
+            
+            parsed = {}
+            if isinstance(response, Exception):
+                logger.error(f"Error calculating packed match scores: {response}")
+            else:
+                parsed = self._parse_packed_scores(response, len(pack))
+            
+            for position, i in enumerate(pack):
+                if position in parsed:
+                    results[i] = PackedMatchScore(parsed[position], len(pack), False)
+                    self._cache_put(keys[i], json.dumps(parsed[position].dict()), prompt, share=len(pack))
+                else:
+                    failed.append((i, len(pack)))
+        
+        if failed:
+            logger.warning(f"{len(failed)}/{len(resume_texts)} packed entries failed, retrying individually")
+            retried = self.calculate_match_scores(
+                [(resume_texts[i], job_description) for i, _ in failed]
+            )
+            for (i, size), match_score in zip(failed, retried):
+                if match_score is not None:
+                    results[i] = PackedMatchScore(match_score, size, True)
+        
+        return results
+    
+    def _build_packed_prompt(self, resume_texts: List[str], job_description: str) -> str:
+        """Build prompt scoring several candidates against one job description"""
+        candidates = "\n\n".join(
+            f"Candidate {number}:\n{resume_text[:settings.LLM_PACK_RESUME_CHARS]}"
+            for number, resume_text in enumerate(resume_texts, start=1)
+        )
+        return f"""
+Analyze how well each candidate resume below matches the job description. For each candidate provide scores (0-100) for:
+1. Skills Match
+2. Experience Match
+3. Education Match
+4. Overall Match
+
+Job Description:
+{job_description[:2000]}
+
+{candidates}
+
+Return ONLY a JSON array with exactly {len(resume_texts)} objects, one per candidate, in this format:
+[
+  {{
+    "candidate": <candidate number>,
+    "skills_score": <number>,
+    "experience_score": <number>,
+    "education_score": <number>,
+    "overall_score": <number>
+  }}
+]
+"""
+    
+    def _parse_packed_scores(self, response: str, count: int) -> Dict[int, MatchScore]:
+        """
+        Parse packed response into scores keyed by position in the pack
+        
+        Accepts the JSON array with or without code fences or surrounding
+        text; if the array itself is malformed, the flat objects inside it
+        are parsed one by one. Entries are placed by their candidate number,
+        or by order when every entry is present but unnumbered. Entries
+        without four numeric scores are left out so they get retried.
+        """
+        entries = []
+        array_match = re.search(r'\[[\s\S]*\]', response)
+        if array_match:
+            try:
+                data = json.loads(array_match.group())
+                if isinstance(data, list):
+                    entries = [entry for entry in data if isinstance(entry, dict)]
+            except ValueError:
+                pass
+        
+        if not entries:
+            for obj in re.findall(r'\{[^{}]*\}', response):
+                try:
+                    entry = json.loads(obj)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict):
+                    entries.append(entry)
+        
+        by_order = len(entries) == count
+        scores = {}
+        for order, entry in enumerate(entries):
+            try:
+                position = int(entry["candidate"]) - 1
+            except (KeyError, TypeError, ValueError):
+                if not by_order:
+                    continue
+                position = order
+            
+            if not 0 <= position < count or position in scores:
+                continue
+            
+            values = self._score_values(entry)
+            if values is not None:
+                scores[position] = MatchScore(**values)
+        
+        return scores
+    
+    def _score_values(self, entry: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Read the four scores from a parsed entry (clamped to 0-100), None if incomplete"""
+        values = {}
+        for name in SCORE_FIELDS:
+            value = entry.get(name)
+            if isinstance(value, bool):
+                return None
+            try:
+                values[name] = min(100.0, max(0.0, float(value)))
+            except (TypeError, ValueError):
+                return None
+        return values
+    
+    def _build_match_prompt(self, resume_text: str, job_description: str) -> str:
+        """Build prompt for single-candidate match scoring"""
+        return f"""
 Analyze the match between this resume and job description. Provide scores (0-100) for:
 1. Skills Match
 2. Experience Match
@@ -65,51 +338,50 @@ Return ONLY a JSON object with this format:
   "overall_score": <number>
 }}
 """
-            
-            response = self._call_llm(prompt)
-            
-            # Parse response
-            import json
-            import re
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{[^{}]*\}', response)
-            if json_match:
-                scores = json.loads(json_match.group())
-                return MatchScore(
-                    overall_score=scores.get('overall_score', 50.0),
-                    skills_score=scores.get('skills_score', 50.0),
-                    experience_score=scores.get('experience_score', 50.0),
-                    education_score=scores.get('education_score', 50.0)
-                )
-            
-            # Fallback: use similarity score if available
-            if similarity_score is not None:
-                base_score = similarity_score * 100
-                return MatchScore(
-                    overall_score=base_score,
-                    skills_score=base_score,
-                    experience_score=base_score,
-                    education_score=base_score
-                )
-            
-            # Default scores
+    
+    def _parse_match_score(self, response: str, similarity_score: Optional[float] = None) -> MatchScore:
+        """Parse LLM match scoring response"""
+        scores = self._match_json(response)
+        if scores is not None:
             return MatchScore(
-                overall_score=50.0,
-                skills_score=50.0,
-                experience_score=50.0,
-                education_score=50.0
+                overall_score=scores.get('overall_score', 50.0),
+                skills_score=scores.get('skills_score', 50.0),
+                experience_score=scores.get('experience_score', 50.0),
+                education_score=scores.get('education_score', 50.0)
             )
-            
-        except Exception as e:
-            logger.error(f"Error calculating match score: {e}")
-            # Return default scores on error
+        
+        # Fallback: use similarity score if available
+        if similarity_score is not None:
+            base_score = similarity_score * 100
             return MatchScore(
-                overall_score=50.0,
-                skills_score=50.0,
-                experience_score=50.0,
-                education_score=50.0
+                overall_score=base_score,
+                skills_score=base_score,
+                experience_score=base_score,
+                education_score=base_score
             )
+        
+        # Default scores
+        return self._default_match_score()
+    
+    def _match_json(self, response: str) -> Optional[Dict[str, Any]]:
+        """Extract the score object from a match scoring response"""
+        json_match = re.search(r'\{[^{}]*\}', response)
+        if not json_match:
+            return None
+        try:
+            scores = json.loads(json_match.group())
+        except ValueError:
+            return None
+        return scores if isinstance(scores, dict) else None
+    
+    def _default_match_score(self) -> MatchScore:
+        """Moderate default scores used when the LLM result is unusable"""
+        return MatchScore(
+            overall_score=50.0,
+            skills_score=50.0,
+            experience_score=50.0,
+            education_score=50.0
+        )
     
     def generate_match_explanation(
         self,
@@ -127,6 +399,9 @@ Return ONLY a JSON object with this format:
             
         Returns:
             MatchExplanation object
+            
+        Raises:
+            CircuitOpenError: LLM circuit is open; fall back without the LLM
         """
         try:
             prompt = f"""
@@ -152,15 +427,20 @@ Format your response as JSON:
 }}
 """
             
-            response = self._call_llm(prompt)
+            response = self._call_llm(
+                prompt,
+                cache_key=self._cache_key(
+                    EXPLANATION_PROMPT_VERSION,
+                    resume_text[:2000],
+                    job_description[:2000],
+                    f"{match_score.overall_score:.1f}"
+                ),
+                is_valid=lambda text: self._explanation_json(text) is not None
+            )
             
             # Parse response
-            import json
-            import re
-            
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                data = json.loads(json_match.group())
+            data = self._explanation_json(response)
+            if data is not None:
                 return MatchExplanation(
                     strengths=data.get('strengths', []),
                     weaknesses=data.get('weaknesses', []),
@@ -176,6 +456,9 @@ Format your response as JSON:
                 summary=f"Overall match score: {match_score.overall_score:.1f}%"
             )
             
+        except CircuitOpenError:
+            # Callers fall back to rule-based explanations
+            raise
         except Exception as e:
             logger.error(f"Error generating explanation: {e}")
             return MatchExplanation(
@@ -185,6 +468,17 @@ Format your response as JSON:
                 summary="Automated analysis unavailable"
             )
     
+    def _explanation_json(self, response: str) -> Optional[Dict[str, Any]]:
+        """Extract the explanation object from an explanation response"""
+        json_match = re.search(r'\{[\s\S]*\}', response)
+        if not json_match:
+            return None
+        try:
+            data = json.loads(json_match.group())
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    
     def analyze_skill_overlap(
         self,
         resume_skills: List[str],
@@ -217,25 +511,75 @@ Format your response as JSON:
         
         return skill_matches
     
-    def _call_llm(self, prompt: str) -> str:
+    def _call_llm(
+        self,
+        prompt: str,
+        cache_key: Optional[str] = None,
+        is_valid: Optional[Callable[[str], bool]] = None
+    ) -> str:
         """
-        Call Gemini LLM
+        Call Gemini LLM, serving and storing responses through the LLM cache
+        
+        Concurrent calls for the same prompt share one in-flight request.
         
         Args:
             prompt: Prompt text
+            cache_key: LLM cache key (None skips the cache)
+            is_valid: Only responses passing this check are cached
             
         Returns:
             LLM response text
         """
-        try:
-            if self.model:
-                response = self.model.generate_content(prompt)
-                return response.text
-            else:
-                raise RuntimeError("Gemini model not configured")
-        except Exception as e:
-            logger.error(f"Error calling Gemini LLM: {e}")
-            raise
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
+        return llm_flights.do(
+            cache_key or content_hash(prompt),
+            self._generate,
+            prompt,
+            cache_key,
+            is_valid
+        )
+    
+    def _generate(
+        self,
+        prompt: str,
+        cache_key: Optional[str],
+        is_valid: Optional[Callable[[str], bool]]
+    ) -> str:
+        """Make the LLM call and cache a valid response (single-flight leader)"""
+        response = self.client.generate(prompt)
+        
+        if cache_key is not None and (is_valid is None or is_valid(response)):
+            self._cache_put(cache_key, response, prompt)
+        return response
+    
+    def _cache_key(self, template: str, *inputs: str) -> Optional[str]:
+        """LLM cache key for prompt inputs (None when the cache is disabled)"""
+        return self.cache.key(template, *inputs) if self.cache is not None else None
+    
+    def _match_cache_key(self, resume_text: str, job_description: str) -> Optional[str]:
+        """Cache key for a single-candidate match prompt"""
+        return self._cache_key(MATCH_PROMPT_VERSION, resume_text[:2000], job_description[:2000])
+    
+    def _packed_cache_key(self, resume_text: str, job_description: str) -> Optional[str]:
+        """Cache key for one candidate's scores from a packed prompt"""
+        return self._cache_key(
+            PACKED_MATCH_PROMPT_VERSION,
+            resume_text[:settings.LLM_PACK_RESUME_CHARS],
+            job_description[:2000]
+        )
+    
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        """Cached response or None"""
+        return self.cache.get(key) if key is not None else None
+    
+    def _cache_put(self, key: Optional[str], response: str, prompt: str, share: int = 1):
+        """Cache response with the estimated cost of its call (split across share candidates)"""
+        if key is not None:
+            self.cache.put(key, response, estimate_cost(prompt) / share)
 
 
 # Global instance
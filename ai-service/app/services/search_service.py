@@ -5,11 +5,12 @@ Handles semantic search and candidate ranking using FAISS
 import logging
 from typing import List, Dict, Optional, Tuple
 import numpy as np
-import faiss
 from pathlib import Path
 
 from app.config import settings
-from app.services.embedding_service import embedding_service
+from app.services.embedding_service import embedding_service, similarity_to_score
+from app.services.vector_store import create_vector_store
+from app.utils.cache import content_hash
 
 logger = logging.getLogger(__name__)
 
@@ -19,52 +20,73 @@ class SearchService:
     
     def __init__(self):
         """Initialize search service"""
-        self.index = None
-        self.resume_ids = []
-        self.resume_texts = []
-        self.index_path = settings.VECTOR_STORE_DIR / "faiss_index.bin"
+        self.store = create_vector_store()
+        self.legacy_index_path = settings.VECTOR_STORE_DIR / "faiss_index.bin"
         self._initialize_index()
     
     def _initialize_index(self):
-        """Initialize FAISS index"""
+        """Initialize FAISS index from the latest snapshot"""
         try:
-            # Create index with specified dimension
-            self.index = faiss.IndexFlatL2(settings.VECTOR_DIM)
-            logger.info(f"Initialized FAISS index with dimension {settings.VECTOR_DIM}")
+            logger.info(f"Initialized FAISS {self.store.index_type} index with dimension {settings.VECTOR_DIM}")
             
             # Try to load existing index
-            if self.index_path.exists():
-                self.load_index()
+            if not self.load_index() and self.legacy_index_path.exists():
+                logger.warning(f"Ignoring legacy index {self.legacy_index_path}: it has no resume IDs. "
+                               "Re-add resumes to rebuild the index.")
         except Exception as e:
             logger.error(f"Error initializing FAISS index: {e}")
     
-    def add_resume(self, resume_id: str, resume_text: str, embedding: Optional[List[float]] = None):
+    @property
+    def index(self):
+        """Underlying FAISS index"""
+        return self.store.index
+    
+    @property
+    def total_resumes(self) -> int:
+        """Number of indexed resumes"""
+        return len(self.store)
+    
+    def add_resume(self, resume_id: str, resume_text: str, embedding: Optional[List[float]] = None) -> bool:
         """
-        Add resume to search index
+        Add or update resume in search index
         
         Args:
             resume_id: Unique resume identifier
             resume_text: Resume text content
             embedding: Pre-computed embedding (optional)
+            
+        Returns:
+            True if an existing entry for resume_id was replaced
         """
         try:
             # Generate embedding if not provided
             if embedding is None:
                 embedding = embedding_service.generate_embedding(resume_text)
             
-            # Convert to numpy array
-            vector = np.array([embedding], dtype=np.float32)
-            
-            # Add to index
-            self.index.add(vector)
-            self.resume_ids.append(resume_id)
-            self.resume_texts.append(resume_text)
+            replaced = self.store.upsert(resume_id, embedding, metadata=self._metadata(resume_text))
             
-            logger.info(f"Added resume {resume_id} to index. Total resumes: {len(self.resume_ids)}")
+            action = "Updated" if replaced else "Added"
+            logger.info(f"{action} resume {resume_id} in index. Total resumes: {self.total_resumes}")
+            return replaced
         except Exception as e:
             logger.error(f"Error adding resume to index: {e}")
             raise
     
+    def delete_resume(self, resume_id: str) -> bool:
+        """
+        Remove resume from search index
+        
+        Args:
+            resume_id: Unique resume identifier
+            
+        Returns:
+            True if the resume was indexed
+        """
+        removed = self.store.delete(resume_id)
+        if removed:
+            logger.info(f"Removed resume {resume_id} from index. Total resumes: {self.total_resumes}")
+        return removed
+    
     def search_similar_resumes(
         self,
         job_description: str,
@@ -83,7 +105,7 @@ class SearchService:
             List of matched resumes with scores
         """
         try:
-            if self.index.ntotal == 0:
+            if self.total_resumes == 0:
                 logger.warning("Index is empty, no resumes to search")
                 return []
             
@@ -91,26 +113,18 @@ class SearchService:
             if job_embedding is None:
                 job_embedding = embedding_service.generate_embedding(job_description)
             
-            # Convert to numpy array
-            query_vector = np.array([job_embedding], dtype=np.float32)
-            
             # Search
-            k = min(top_k, self.index.ntotal)
-            distances, indices = self.index.search(query_vector, k)
+            matches = self.store.search(job_embedding, top_k)
             
             # Format results
             results = []
-            for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-                if idx < len(self.resume_ids):
-                    # Convert L2 distance to similarity score (0-1)
-                    similarity = 1 / (1 + distance)
-                    
-                    results.append({
-                        "rank": i + 1,
-                        "resume_id": self.resume_ids[idx],
-                        "similarity_score": float(similarity),
-                        "distance": float(distance)
-                    })
+            for i, (resume_id, cosine) in enumerate(matches):
+                results.append({
+                    "rank": i + 1,
+                    "resume_id": resume_id,
+                    "similarity_score": float(similarity_to_score(cosine)),
+                    "distance": float(1 - cosine)  # Cosine distance
+                })
             
             logger.info(f"Found {len(results)} similar resumes")
             return results
@@ -122,104 +136,173 @@ class SearchService:
         self,
         job_description: str,
         candidates: List[Dict],
-        top_n: Optional[int] = None
+        top_n: Optional[int] = None,
+        resume_ids: Optional[List[str]] = None,
+        index_new: bool = False
     ) -> List[Dict]:
         """
         Rank candidates against job description
         
+        Candidates can be given as texts, as IDs of indexed resumes, or both.
+        Indexed resumes reuse their stored vectors; texts go through the
+        embedding cache. Ranking is read-only unless index_new is set: then
+        texts whose IDs are not indexed yet, or whose text changed since they
+        were indexed, are upserted so later re-ranks can refer to them by ID.
+        Scores for all candidates come from one matrix-vector product and
+        only the top N payloads are built.
+        
         Args:
             job_description: Job description text
             candidates: List of candidates with 'id' and 'text' keys
             top_n: Return top N candidates (optional)
+            resume_ids: IDs of resumes already in the index (optional)
+            index_new: Index new or changed text candidates by ID
             
         Returns:
             Ranked list of candidates with scores
         """
         try:
-            if not candidates:
+            candidates = candidates or []
+            text_ids = {c.get('id') for c in candidates}
+            stored_ids = [rid for rid in dict.fromkeys(resume_ids or []) if rid not in text_ids]
+            
+            if not candidates and not stored_ids:
                 return []
             
             # Generate job embedding
             job_embedding = embedding_service.generate_embedding(job_description)
-            job_vector = np.array(job_embedding)
+            job_vector = np.asarray(job_embedding, dtype=np.float32)
             
-            # Generate embeddings for all candidates
-            candidate_texts = [c.get('text', '') for c in candidates]
-            candidate_embeddings = embedding_service.generate_embeddings_batch(candidate_texts)
+            ids: List[Optional[str]] = []
+            previews: List[str] = []
+            blocks: List[np.ndarray] = []
             
-            # Compute similarities
-            ranked = []
-            for candidate, embedding in zip(candidates, candidate_embeddings):
-                candidate_vector = np.array(embedding)
-                
-                # Cosine similarity
-                similarity = np.dot(job_vector, candidate_vector) / (
-                    np.linalg.norm(job_vector) * np.linalg.norm(candidate_vector)
-                )
-                
-                # Normalize to 0-1
-                similarity_score = float((similarity + 1) / 2)
-                
-                ranked.append({
-                    "candidate_id": candidate.get('id'),
-                    "similarity_score": similarity_score,
-                    "resume_text": candidate.get('text', '')[:200] + "..."  # Truncate for response
-                })
+            # Text candidates: one (N, d) matrix via the embedding cache
+            if candidates:
+                candidate_texts = [c.get('text', '') for c in candidates]
+                text_matrix = embedding_service.generate_embeddings_matrix(candidate_texts)
+                blocks.append(text_matrix)
+                ids.extend(c.get('id') for c in candidates)
+                previews.extend(text[:200] for text in candidate_texts)
+                if index_new:
+                    self._index_candidates(candidates, candidate_texts, text_matrix)
             
-            # Sort by similarity score
-            ranked.sort(key=lambda x: x['similarity_score'], reverse=True)
+            # ID-only candidates: vectors straight from the index
+            if stored_ids:
+                stored = self.store.get_vectors(stored_ids)
+                missing = [rid for rid in stored_ids if rid not in stored]
+                if missing:
+                    logger.warning(f"{len(missing)} resume IDs not in index, skipped: {missing[:5]}")
+                if stored:
+                    stored_matrix = np.vstack(list(stored.values())).astype(np.float32)
+                    # Same scale as the normalized text embeddings
+                    norms = np.linalg.norm(stored_matrix, axis=1, keepdims=True)
+                    stored_matrix /= np.maximum(norms, 1e-12)
+                    blocks.append(stored_matrix)
+                    ids.extend(stored)
+                    previews.extend(self.store.metadata.get(rid, {}).get('text_preview', '') for rid in stored)
             
-            # Add ranks
-            for i, item in enumerate(ranked):
-                item['rank'] = i + 1
+            if not ids:
+                return []
+            
+            candidate_matrix = np.vstack(blocks)
+            
+            # Cosine similarity for every candidate (embeddings are normalized)
+            scores = similarity_to_score(candidate_matrix @ job_vector)
             
-            # Return top N if specified
-            if top_n:
-                ranked = ranked[:top_n]
+            top_indices = self._top_indices(scores, top_n)
+            
+            ranked = []
+            for rank, idx in enumerate(top_indices, start=1):
+                ranked.append({
+                    "candidate_id": ids[idx],
+                    "similarity_score": float(scores[idx]),
+                    "resume_text": previews[idx] + "...",  # Truncate for response
+                    "rank": rank
+                })
             
-            logger.info(f"Ranked {len(ranked)} candidates")
+            logger.info(f"Ranked {len(ranked)} of {len(ids)} candidates "
+                       f"({len(candidates)} from text, {len(ids) - len(candidates)} from index)")
             return ranked
         except Exception as e:
             logger.error(f"Error ranking candidates: {e}")
             raise
     
-    def save_index(self):
-        """Save FAISS index to disk"""
+    @staticmethod
+    def _metadata(resume_text: str) -> Dict:
+        """Stored metadata for a resume: preview plus hash to detect changed text"""
+        return {"text_preview": resume_text[:200], "text_hash": content_hash(resume_text)}
+    
+    def _index_candidates(self, candidates: List[Dict], texts: List[str], matrix: np.ndarray):
+        """Upsert text candidates whose IDs are not indexed yet or whose text changed"""
+        # Last occurrence wins for repeated IDs, as in upsert_batch
+        latest = {c.get('id'): i for i, c in enumerate(candidates) if c.get('id')}
+        changed = [
+            i for rid, i in latest.items()
+            if self.store.metadata.get(rid, {}).get('text_hash') != content_hash(texts[i])
+        ]
+        if not changed:
+            return
+        
         try:
-            if self.index and self.index.ntotal > 0:
-                faiss.write_index(self.index, str(self.index_path))
-                logger.info(f"Saved index with {self.index.ntotal} vectors")
+            self.store.upsert_batch(
+                [candidates[i]['id'] for i in changed],
+                matrix[changed],
+                [self._metadata(texts[i]) for i in changed]
+            )
+            logger.info(f"Indexed {len(changed)} new or changed resumes from rank request")
+        except Exception as e:
+            logger.warning(f"Could not index resumes from rank request: {e}")
+    
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_n: Optional[int]) -> np.ndarray:
+        """
+        Indices of the highest scores in descending order
+        
+        Uses argpartition so only the top N are sorted.
+        """
+        n = len(scores)
+        if top_n and top_n < n:
+            candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+        else:
+            candidates = np.arange(n)
+        order = np.argsort(-scores[candidates], kind="stable")
+        return candidates[order]
+    
+    def save_index(self) -> Optional[Path]:
+        """Save FAISS index and resume ID sidecar as one atomic snapshot"""
+        try:
+            return self.store.save()
         except Exception as e:
             logger.error(f"Error saving index: {e}")
+            raise
     
-    def load_index(self):
-        """Load FAISS index from disk"""
+    def load_index(self) -> bool:
+        """Load latest FAISS snapshot from disk"""
         try:
-            if self.index_path.exists():
-                self.index = faiss.read_index(str(self.index_path))
-                logger.info(f"Loaded index with {self.index.ntotal} vectors")
+            return self.store.load()
         except Exception as e:
             logger.error(f"Error loading index: {e}")
+            return False
     
-    def get_stats(self) -> Dict:
+    def get_stats(self, include_recall: bool = False) -> Dict:
         """
         Get index statistics
         
+        Args:
+            include_recall: Also measure recall@10 against exact search (CPU-heavy on large indexes)
+            
         Returns:
             Dictionary with index stats
         """
-        return {
-            "total_resumes": len(self.resume_ids),
-            "index_size": self.index.ntotal if self.index else 0,
-            "dimension": settings.VECTOR_DIM,
-            "index_type": "Flat (L2)"
-        }
+        stats = self.store.stats(include_recall=include_recall)
+        stats["total_resumes"] = stats.pop("total_vectors")
+        stats["metric"] = "cosine (inner product)"
+        return stats
     
     def clear_index(self):
         """Clear the index"""
-        self.index.reset()
-        self.resume_ids = []
-        self.resume_texts = []
+        self.store.clear()
         logger.info("Index cleared")
 
 
@@ -0,0 +1,864 @@
+"""
+Vector Store
+Persistent FAISS index keyed by resume ID with upsert/delete, atomic snapshots
+and pluggable index types (Flat, HNSW, IVF-PQ)
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 4
+INDEX_FILE = "index.faiss"
+RAW_INDEX_FILE = "raw.faiss"
+META_FILE = "meta.json"
+
+INDEX_TYPES = {"flat": "flat", "hnsw": "hnsw", "ivfpq": "ivfpq", "ivf-pq": "ivfpq", "ivf_pq": "ivfpq"}
+
+# HNSW graphs cannot remove vectors; rebuild once this share of the index is dead
+HNSW_TOMBSTONE_RATIO = 0.25
+
+# Vectors copied per lock hold when computing recall ground truth
+_RECALL_CHUNK = 20000
+
+
+def normalize_index_type(index_type: str) -> str:
+    """Map VECTOR_INDEX_TYPE spellings (Flat, HNSW, IVF-PQ, ...) to an index kind"""
+    kind = INDEX_TYPES.get((index_type or "flat").strip().lower())
+    if kind is None:
+        logger.warning(f"Unknown VECTOR_INDEX_TYPE '{index_type}', using Flat")
+        return "flat"
+    return kind
+
+
+def _fsync_dir(path: Path):
+    """Flush directory entry changes (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class VectorStore:
+    """
+    FAISS vector store keyed by resume ID
+
+    Each resume ID maps to a stable int64 label. Flat and HNSW indexes are
+    wrapped in IndexIDMap2 so vectors can be reconstructed by label; IVF-PQ
+    stores labels natively with a hashtable direct map. The FAISS file and
+    the ID/metadata sidecar are written together into one snapshot directory
+    that is published by atomically swapping the CURRENT pointer file.
+
+    With the default "ip" metric vectors are L2-normalized on the way in and
+    search ranks by inner product, i.e. cosine similarity.
+
+    Index kinds:
+    - flat: exact brute-force search
+    - hnsw: graph search; deletions are tombstoned and compacted by rebuild
+    - ivfpq: compressed codes; staged as flat until enough vectors exist to
+      train, retrained when the corpus grows by retrain_factor
+
+    For IVF-PQ the original float32 vectors are also kept in a Flat sidecar
+    (snapshotted next to the index), because PQ reconstructions are lossy:
+    training, re-adding, get_vector(s) and recall ground truth all use the
+    raw vectors, so retrains never compound quantization error.
+
+    Training, retraining and HNSW compaction run on a background thread
+    once a threshold is crossed; the current index keeps serving and is
+    swapped for the new one after vectors added or deleted meanwhile have
+    been applied to it.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        store_dir: Path,
+        index_type: str = "flat",
+        metric: str = "ip",
+        use_mmap: bool = True,
+        snapshots_to_keep: int = 2,
+        hnsw_m: int = 32,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 64,
+        ivf_nlist: int = 0,
+        ivf_nprobe: int = 16,
+        pq_m: int = 48,
+        pq_nbits: int = 8,
+        ivf_min_train: int = 5000,
+        retrain_factor: float = 2.0,
+        recall_sample: int = 100
+    ):
+        """
+        Initialize vector store
+
+        Args:
+            dimension: Vector dimension
+            store_dir: Directory holding snapshots and the CURRENT pointer
+            index_type: Flat, HNSW or IVF-PQ
+            metric: "ip" (cosine on normalized vectors) or "l2"
+            use_mmap: Memory-map the FAISS file on load
+            snapshots_to_keep: Number of published snapshots retained on disk
+            hnsw_m: HNSW neighbours per node
+            hnsw_ef_construction: HNSW build-time search depth
+            hnsw_ef_search: HNSW query-time search depth
+            ivf_nlist: IVF cell count (0 = 4 * sqrt(n) at training time)
+            ivf_nprobe: IVF cells visited per query
+            pq_m: PQ sub-quantizers (must divide dimension)
+            pq_nbits: Bits per PQ sub-quantizer code
+            ivf_min_train: Vectors required before IVF-PQ is trained
+            retrain_factor: Retrain IVF-PQ when corpus grows by this factor
+            recall_sample: Queries used to measure recall against exact search
+        """
+        self.dimension = dimension
+        self.store_dir = Path(store_dir)
+        self.snapshot_root = self.store_dir / "snapshots"
+        self.current_file = self.store_dir / "CURRENT"
+        self.index_type = normalize_index_type(index_type)
+        self.metric = "l2" if metric.lower() == "l2" else "ip"
+        self._faiss_metric = faiss.METRIC_L2 if self.metric == "l2" else faiss.METRIC_INNER_PRODUCT
+        self.use_mmap = use_mmap
+        self.snapshots_to_keep = max(1, snapshots_to_keep)
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.pq_m = self._valid_pq_m(pq_m)
+        self.pq_nbits = pq_nbits
+        self.ivf_min_train = max(ivf_min_train, 2 ** pq_nbits)
+        self.retrain_factor = max(1.1, retrain_factor)
+        self.recall_sample = recall_sample
+        self._lock = threading.RLock()
+        self._recall_lock = threading.Lock()
+        self._generation = 0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._reset()
+
+    def _valid_pq_m(self, pq_m: int) -> int:
+        """Largest sub-quantizer count <= pq_m that divides the dimension"""
+        for m in range(min(pq_m, self.dimension), 0, -1):
+            if self.dimension % m == 0:
+                if m != pq_m:
+                    logger.warning(f"PQ sub-quantizers adjusted from {pq_m} to {m} for dimension {self.dimension}")
+                return m
+        return 1
+
+    def _build_index(self, kind: str, train_vectors: Optional[np.ndarray] = None):
+        """
+        Create an empty FAISS index of the given kind
+
+        Args:
+            kind: flat, hnsw or ivfpq
+            train_vectors: Training data (required for ivfpq)
+
+        Returns:
+            FAISS index accepting add_with_ids
+        """
+        if kind == "hnsw":
+            base = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, self._faiss_metric)
+            base.hnsw.efConstruction = self.hnsw_ef_construction
+            index = faiss.IndexIDMap2(base)
+        elif kind == "ivfpq":
+            nlist = self._nlist_for(len(train_vectors))
+            index = faiss.index_factory(
+                self.dimension,
+                f"IVF{nlist},PQ{self.pq_m}x{self.pq_nbits}",
+                self._faiss_metric
+            )
+            index.train(train_vectors)
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        else:
+            index = faiss.IndexIDMap2(faiss.IndexFlat(self.dimension, self._faiss_metric))
+
+        self._apply_search_params(index, kind)
+        return index
+
+    def _nlist_for(self, n: int) -> int:
+        """IVF cell count for n training vectors (at least 39 points per cell)"""
+        nlist = self.ivf_nlist or int(4 * math.sqrt(n))
+        return max(1, min(nlist, n // 39))
+
+    def _apply_search_params(self, index, kind: str):
+        """Set query-time parameters (not all of them survive serialization)"""
+        params = faiss.ParameterSpace()
+        if kind == "hnsw":
+            params.set_index_parameter(index, "efSearch", self.hnsw_ef_search)
+        elif kind == "ivfpq":
+            params.set_index_parameter(index, "nprobe", self.ivf_nprobe)
+
+    def _new_raw_index(self):
+        """Empty Flat index holding the original vectors by label"""
+        return faiss.IndexIDMap2(faiss.IndexFlat(self.dimension, self._faiss_metric))
+
+    def _reset(self):
+        """Reset in-memory state to an empty store"""
+        self._generation += 1  # Invalidates a background rebuild in progress
+        self._kind = "flat" if self.index_type == "ivfpq" else self.index_type
+        self._trained_size = 0
+        self.index = self._build_index(self._kind)
+        self._raw = self._new_raw_index() if self.index_type == "ivfpq" else None
+        self._labels: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._tombstones = set()
+        self.metadata: Dict[str, Dict] = {}
+        self._next_label = 0
+        self._snapshot_path: Optional[Path] = None
+        self._mmapped = False
+        self._raw_mmapped = False
+        self._version = 0
+        self._recall_cache: Optional[Tuple[int, Optional[float]]] = None
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, resume_id: str) -> bool:
+        return resume_id in self._labels
+
+    @property
+    def ids(self) -> List[str]:
+        """Stored resume IDs"""
+        return list(self._labels)
+
+    @property
+    def active_kind(self) -> str:
+        """Kind of the index currently serving queries"""
+        return self._kind
+
+    def _as_matrix(self, vectors) -> np.ndarray:
+        """Convert vectors to a contiguous (n, d) float32 matrix, normalized for the ip metric"""
+        matrix = np.array(vectors, dtype=np.float32, order="C", copy=True)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}")
+        if self.metric == "ip":
+            faiss.normalize_L2(matrix)
+        return matrix
+
+    def _ensure_writable(self):
+        """Replace memory-mapped indexes with in-memory copies before mutating"""
+        if self._snapshot_path is None:
+            return
+        if self._mmapped:
+            self.index = faiss.read_index(str(self._snapshot_path / INDEX_FILE))
+            self._apply_search_params(self.index, self._kind)
+            self._mmapped = False
+            logger.info("Loaded vector index into memory for writes")
+        if self._raw_mmapped:
+            self._raw = faiss.read_index(str(self._snapshot_path / RAW_INDEX_FILE))
+            self._raw_mmapped = False
+
+    def _remove_labels(self, labels: List[int]):
+        """Remove labels from the index (tombstoned for HNSW)"""
+        if not labels:
+            return
+        if self._kind == "hnsw":
+            self._tombstones.update(labels)
+        else:
+            self.index.remove_ids(np.array(labels, dtype=np.int64))
+        if self._raw is not None:
+            self._raw.remove_ids(np.array(labels, dtype=np.int64))
+
+    def _raw_vectors(self, labels: List[int]) -> np.ndarray:
+        """Original vectors for labels (from the sidecar for ivfpq, else exact from the index)"""
+        if not labels:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        source = self._raw if self._raw is not None else self.index
+        return source.reconstruct_batch(np.array(labels, dtype=np.int64))
+
+    def _raw_from_index(self):
+        """Build the raw-vector sidecar from the serving index (lossy if it is IVF-PQ)"""
+        raw = self._new_raw_index()
+        labels = list(self._ids)
+        if labels:
+            vectors = self.index.reconstruct_batch(np.array(labels, dtype=np.int64))
+            raw.add_with_ids(vectors, np.array(labels, dtype=np.int64))
+        return raw
+
+    def upsert(self, resume_id: str, vector, metadata: Optional[Dict] = None) -> bool:
+        """
+        Insert or replace a vector
+
+        Args:
+            resume_id: Resume identifier
+            vector: Embedding vector
+            metadata: Small JSON-serializable metadata (optional)
+
+        Returns:
+            True if an existing entry was replaced
+        """
+        return self.upsert_batch([resume_id], [vector], [metadata])[0]
+
+    def upsert_batch(
+        self,
+        resume_ids: List[str],
+        vectors,
+        metadatas: Optional[List[Optional[Dict]]] = None
+    ) -> List[bool]:
+        """
+        Insert or replace several vectors
+
+        Args:
+            resume_ids: Resume identifiers
+            vectors: Embedding vectors aligned with resume_ids
+            metadatas: Metadata dicts aligned with resume_ids (optional)
+
+        Returns:
+            Per-ID flags telling whether an existing entry was replaced
+        """
+        matrix = self._as_matrix(vectors)
+        if len(resume_ids) != matrix.shape[0]:
+            raise ValueError("resume_ids and vectors must have the same length")
+        metadatas = metadatas or [None] * len(resume_ids)
+
+        with self._lock:
+            self._ensure_writable()
+
+            # Keep the last occurrence of duplicated IDs
+            positions: Dict[str, int] = {}
+            for i, resume_id in enumerate(resume_ids):
+                positions[resume_id] = i
+
+            replaced_ids = [rid for rid in positions if rid in self._labels]
+            stale = [self._labels[rid] for rid in replaced_ids]
+            self._remove_labels(stale)
+            for label in stale:
+                del self._ids[label]
+
+            # Replaced vectors get fresh labels so tombstoned ones never resurface
+            labels = []
+            for resume_id in positions:
+                label = self._next_label
+                self._next_label += 1
+                self._labels[resume_id] = label
+                self._ids[label] = resume_id
+                labels.append(label)
+
+            rows = list(positions.values())
+            self.index.add_with_ids(matrix[rows], np.array(labels, dtype=np.int64))
+            if self._raw is not None:
+                self._raw.add_with_ids(matrix[rows], np.array(labels, dtype=np.int64))
+
+            for resume_id, row in positions.items():
+                entry = dict(metadatas[row] or {})
+                entry["updated_at"] = datetime.utcnow().isoformat()
+                self.metadata[resume_id] = entry
+
+            self._mark_changed()
+            self._maybe_rebuild()
+
+        replaced = set(replaced_ids)
+        return [rid in replaced for rid in resume_ids]
+
+    def delete(self, resume_id: str) -> bool:
+        """
+        Remove a vector
+
+        Args:
+            resume_id: Resume identifier
+
+        Returns:
+            True if the resume was present
+        """
+        with self._lock:
+            label = self._labels.get(resume_id)
+            if label is None:
+                return False
+
+            self._ensure_writable()
+            self._remove_labels([label])
+            del self._labels[resume_id]
+            del self._ids[label]
+            self.metadata.pop(resume_id, None)
+            self._mark_changed()
+            self._maybe_rebuild()
+            return True
+
+    def _mark_changed(self):
+        """Record a mutation"""
+        self._version += 1
+        self.dirty = True
+
+    def _maybe_rebuild(self):
+        """Start training, retraining or compaction when thresholds are crossed"""
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+
+        n = len(self._labels)
+        if self.index_type == "ivfpq":
+            if self._kind == "flat" and n >= self.ivf_min_train:
+                logger.info(f"Training IVF-PQ index on {n} vectors in the background")
+                self._start_rebuild("ivfpq")
+            elif self._kind == "ivfpq" and n >= self._trained_size * self.retrain_factor:
+                logger.info(f"Retraining IVF-PQ index in the background: corpus grew from "
+                            f"{self._trained_size} to {n} vectors")
+                self._start_rebuild("ivfpq")
+        elif self._kind == "hnsw" and self._tombstones:
+            if len(self._tombstones) > HNSW_TOMBSTONE_RATIO * self.index.ntotal:
+                logger.info(f"Compacting HNSW index in the background ({len(self._tombstones)} deleted vectors)")
+                self._start_rebuild("hnsw")
+
+    def _start_rebuild(self, kind: str):
+        """Build a new index of the given kind on a background thread (caller holds the lock)"""
+        labels = list(self._ids)
+        vectors = self._raw_vectors(labels)
+        self._rebuild_thread = threading.Thread(
+            target=self._background_rebuild,
+            args=(kind, labels, vectors, self._generation),
+            name="vector-rebuild",
+            daemon=True
+        )
+        self._rebuild_thread.start()
+
+    def _background_rebuild(self, kind: str, labels: List[int], vectors: np.ndarray, generation: int):
+        """Build the index outside the lock, then apply changes made meanwhile and swap it in"""
+        try:
+            started_at = time.perf_counter()
+            index = self._build_from(kind, labels, vectors)
+        except Exception as e:
+            logger.error(f"Background {kind} rebuild failed: {e}")
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                logger.info(f"Discarding background {kind} rebuild: store was reset or reloaded")
+                return
+
+            # Replaced vectors got fresh labels, so upserts show up as added + removed
+            built = set(labels)
+            added = [label for label in self._ids if label not in built]
+            removed = [label for label in labels if label not in self._ids]
+            if added:
+                index.add_with_ids(self._raw_vectors(added), np.array(added, dtype=np.int64))
+            self._swap_index(kind, index, len(labels))
+            if kind == "hnsw":
+                self._tombstones.update(removed)
+            elif removed:
+                index.remove_ids(np.array(removed, dtype=np.int64))
+
+        logger.info(f"Swapped in rebuilt {kind} index with {len(labels) + len(added) - len(removed)} vectors "
+                    f"({time.perf_counter() - started_at:.1f}s; {len(added)} added, {len(removed)} removed meanwhile)")
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a background rebuild to finish
+
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if no rebuild is running
+        """
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def _build_from(self, kind: str, labels: List[int], vectors: np.ndarray):
+        """Build an index of the given kind holding vectors under labels"""
+        index = self._build_index(kind, vectors if kind == "ivfpq" else None)
+        if labels:
+            index.add_with_ids(vectors, np.array(labels, dtype=np.int64))
+        return index
+
+    def _swap_index(self, kind: str, index, trained_size: int):
+        """Make index the serving index (caller holds the lock)"""
+        self.index = index
+        self._kind = kind
+        self._tombstones = set()
+        if kind == "ivfpq":
+            self._trained_size = trained_size
+        self._mmapped = False
+        self._mark_changed()
+
+    def _rebuild(self, kind: str):
+        """Rebuild the index of the given kind from the live vectors synchronously (caller holds the lock)"""
+        labels = list(self._ids)
+        vectors = self._raw_vectors(labels)
+        if self.metric == "ip":
+            faiss.normalize_L2(vectors)
+        self._swap_index(kind, self._build_from(kind, labels, vectors), len(labels))
+        if self._raw is not None:
+            # Keep the sidecar consistent with re-normalized vectors
+            self._raw = self._new_raw_index()
+            if labels:
+                self._raw.add_with_ids(vectors, np.array(labels, dtype=np.int64))
+            self._raw_mmapped = False
+
+    def get_vector(self, resume_id: str) -> Optional[np.ndarray]:
+        """Stored vector for a resume ID (exact; unit-length for the ip metric)"""
+        with self._lock:
+            label = self._labels.get(resume_id)
+            if label is None:
+                return None
+            return self._raw_vectors([label])[0]
+
+    def get_vectors(self, resume_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors for the IDs that exist (exact; unit-length for the ip metric)"""
+        with self._lock:
+            found = [rid for rid in resume_ids if rid in self._labels]
+            vectors = self._raw_vectors([self._labels[rid] for rid in found])
+        return dict(zip(found, vectors))
+
+    def search(self, query, k: int) -> List[Tuple[str, float]]:
+        """
+        Find nearest stored vectors
+
+        Args:
+            query: Query vector
+            k: Number of neighbours
+
+        Returns:
+            List of (resume_id, score) pairs, best first. Score is the inner
+            product (cosine similarity) for "ip", squared distance for "l2".
+        """
+        query_matrix = self._as_matrix(query)
+        with self._lock:
+            if len(self._labels) == 0:
+                return []
+            k = min(k, len(self._labels))
+            # Over-fetch so tombstoned HNSW entries do not shrink the result
+            fetch = min(k + len(self._tombstones), self.index.ntotal)
+            distances, labels = self.index.search(query_matrix, fetch)
+            ids = self._ids
+
+        results = []
+        for distance, label in zip(distances[0], labels[0]):
+            resume_id = ids.get(int(label))
+            if resume_id is not None:
+                results.append((resume_id, float(distance)))
+                if len(results) == k:
+                    break
+        return results
+
+    def measure_recall(self, k: int = 10) -> Optional[float]:
+        """
+        Measure recall@k of the active index against exact search
+
+        Queries are a fixed sample of recall_sample stored vectors; ground
+        truth is a brute-force search over the original vectors (the raw
+        sidecar for IVF-PQ), so the result covers both cell probing and PQ
+        approximation. The store lock is held only to search the sample and
+        to copy one chunk of vectors at a time, so searches and writes keep
+        going while it runs; vectors changed meanwhile make the result a
+        close estimate. Cached until the store changes. CPU-heavy on large
+        stores: call it from a worker thread, not the event loop.
+
+        Args:
+            k: Neighbours compared per query
+
+        Returns:
+            Recall in [0, 1] (None if the store is empty)
+        """
+        with self._recall_lock:
+            with self._lock:
+                if self._recall_cache is not None and self._recall_cache[0] == self._version:
+                    return self._recall_cache[1]
+
+                version = self._version
+                n = len(self._labels)
+                if n == 0 or self._kind == "flat":
+                    recall = None if n == 0 else 1.0
+                    self._recall_cache = (version, recall)
+                    return recall
+
+                labels = np.array(list(self._ids), dtype=np.int64)
+                k = min(k, n)
+                sample = np.random.default_rng(0).choice(n, size=min(self.recall_sample, n), replace=False)
+                queries = self._raw_vectors(labels[sample].tolist())
+                fetch = min(k + len(self._tombstones), self.index.ntotal)
+                _, found = self.index.search(queries, fetch)
+                found = [[label for label in row if label in self._ids][:k] for row in found]
+
+            truth = self._exact_neighbours(queries, labels, k)
+            hits = sum(len(set(truth_row) & set(found_row)) for truth_row, found_row in zip(truth, found))
+            recall = round(hits / (len(queries) * k), 4)
+
+            with self._lock:
+                if self._version == version:
+                    self._recall_cache = (version, recall)
+            return recall
+
+    def _exact_neighbours(self, queries: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+        """Brute-force top-k labels for queries over the given labels, copied in chunks"""
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_labels = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(labels), _RECALL_CHUNK):
+            with self._lock:
+                chunk = [int(label) for label in labels[start:start + _RECALL_CHUNK] if label in self._ids]
+                vectors = self._raw_vectors(chunk)
+            if not chunk:
+                continue
+
+            exact = faiss.IndexFlat(self.dimension, self._faiss_metric)
+            exact.add(vectors)
+            scores, rows = exact.search(queries, min(k, len(chunk)))
+            best_scores = np.hstack([best_scores, scores])
+            best_labels = np.hstack([best_labels, np.array(chunk, dtype=np.int64)[rows]])
+
+            order = np.argsort(best_scores if self.metric == "l2" else -best_scores, axis=1, kind="stable")[:, :k]
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_labels = np.take_along_axis(best_labels, order, axis=1)
+        return best_labels
+
+    def memory_bytes(self) -> int:
+        """Estimate index memory footprint in bytes (excluding the raw sidecar)"""
+        n = self.index.ntotal
+        id_overhead = 16 * n  # label arrays and reverse maps
+        if self._kind == "ivfpq":
+            ivf = faiss.extract_index_ivf(self.index)
+            codes = n * (ivf.code_size + 8)
+            centroids = ivf.nlist * self.dimension * 4
+            pq_tables = (2 ** self.pq_nbits) * self.dimension * 4
+            return int(codes + centroids + pq_tables + id_overhead)
+        vectors = n * self.dimension * 4
+        if self._kind == "hnsw":
+            # Level-0 links (2M) plus ~1/M of nodes on upper levels
+            links = n * self.hnsw_m * 2 * 4 * 1.1
+            return int(vectors + links + id_overhead)
+        return int(vectors + id_overhead)
+
+    def clear(self):
+        """Remove all vectors (the last snapshot stays on disk until the next save)"""
+        with self._lock:
+            self._reset()
+            self.dirty = True
+
+    def save(self) -> Optional[Path]:
+        """
+        Write an atomic snapshot of index and sidecar
+
+        The snapshot is built in a temporary directory, renamed into place and
+        published by replacing the CURRENT pointer, so a crash never leaves a
+        half-written or mismatched index/ID pair.
+
+        Returns:
+            Path of the published snapshot
+        """
+        with self._lock:
+            if not self.dirty and self._snapshot_path is not None:
+                return self._snapshot_path
+
+            self.snapshot_root.mkdir(parents=True, exist_ok=True)
+            generation = f"{int(time.time() * 1000):013d}-{os.getpid()}"
+            tmp_dir = self.snapshot_root / f".tmp-{generation}"
+            final_dir = self.snapshot_root / generation
+
+            try:
+                tmp_dir.mkdir(parents=True)
+                faiss.write_index(self.index, str(tmp_dir / INDEX_FILE))
+                if self._raw is not None:
+                    faiss.write_index(self._raw, str(tmp_dir / RAW_INDEX_FILE))
+
+                meta = {
+                    "format_version": SNAPSHOT_FORMAT_VERSION,
+                    "dimension": self.dimension,
+                    "index_kind": self._kind,
+                    "metric": self.metric,
+                    "trained_size": self._trained_size,
+                    "count": len(self._labels),
+                    "next_label": self._next_label,
+                    "labels": self._labels,
+                    "tombstones": sorted(self._tombstones),
+                    "metadata": self.metadata,
+                    "created_at": datetime.utcnow().isoformat()
+                }
+                with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                _fsync_dir(tmp_dir)
+
+                os.rename(tmp_dir, final_dir)
+                _fsync_dir(self.snapshot_root)
+
+                pointer_tmp = self.current_file.with_name(f".CURRENT.{generation}.tmp")
+                with open(pointer_tmp, "w", encoding="utf-8") as f:
+                    f.write(generation)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(pointer_tmp, self.current_file)
+                _fsync_dir(self.store_dir)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+
+            self._snapshot_path = final_dir
+            self.dirty = False
+            self._prune_snapshots()
+
+            logger.info(f"Saved vector snapshot {generation} with {len(self._labels)} vectors")
+            return final_dir
+
+    def load(self) -> bool:
+        """
+        Load the snapshot referenced by CURRENT
+
+        A snapshot built with a different index type or metric than
+        configured is rebuilt after loading (vectors are re-normalized when
+        moving to the ip metric).
+
+        Returns:
+            True if a snapshot was loaded
+        """
+        if not self.current_file.exists():
+            return False
+
+        generation = self.current_file.read_text(encoding="utf-8").strip()
+        snapshot_dir = self.snapshot_root / generation
+
+        with open(snapshot_dir / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("dimension") != self.dimension:
+            raise ValueError(f"Snapshot dimension {meta.get('dimension')} does not match {self.dimension}")
+
+        kind = meta.get("index_kind", "flat")
+        io_flags = faiss.IO_FLAG_MMAP if self.use_mmap else 0
+        index = faiss.read_index(str(snapshot_dir / INDEX_FILE), io_flags)
+
+        labels = {rid: int(label) for rid, label in meta.get("labels", {}).items()}
+        tombstones = set(meta.get("tombstones", []))
+        if index.ntotal != len(labels) + len(tombstones):
+            raise ValueError(f"Snapshot {generation} is inconsistent: "
+                             f"{index.ntotal} vectors for {len(labels)} IDs")
+
+        raw = None
+        raw_path = snapshot_dir / RAW_INDEX_FILE
+        if self.index_type == "ivfpq" and raw_path.exists():
+            raw = faiss.read_index(str(raw_path), io_flags)
+            if raw.ntotal != len(labels):
+                raise ValueError(f"Snapshot {generation} is inconsistent: "
+                                 f"{raw.ntotal} raw vectors for {len(labels)} IDs")
+
+        with self._lock:
+            self._generation += 1  # Invalidates a background rebuild in progress
+            self.index = index
+            self._kind = kind
+            self._trained_size = int(meta.get("trained_size", 0))
+            self._labels = labels
+            self._ids = {label: rid for rid, label in labels.items()}
+            self._tombstones = tombstones
+            self.metadata = meta.get("metadata", {})
+            self._next_label = int(meta.get("next_label", len(labels)))
+            self._snapshot_path = snapshot_dir
+            self._mmapped = self.use_mmap
+            self._raw = raw
+            self._raw_mmapped = raw is not None and self.use_mmap
+            self._recall_cache = None
+            self.dirty = False
+            self._apply_search_params(self.index, kind)
+
+            if self.index_type == "ivfpq" and raw is None:
+                # Older snapshots kept no raw vectors: recover them once from the index
+                logger.warning(f"Snapshot {generation} has no raw vectors; rebuilding them from the {kind} index")
+                self._raw = self._raw_from_index()
+                self.dirty = True
+
+            expected = "flat" if self.index_type == "ivfpq" and len(labels) < self.ivf_min_train else self.index_type
+            snapshot_metric = meta.get("metric", "l2")
+            if kind != expected or snapshot_metric != self.metric:
+                logger.info(f"Rebuilding {kind}/{snapshot_metric} snapshot as {expected}/{self.metric} index")
+                self._rebuild(expected)
+
+        logger.info(f"Loaded vector snapshot {generation} with {len(labels)} vectors ({self._kind})")
+        return True
+
+    def _prune_snapshots(self):
+        """Delete old snapshots and abandoned temp directories"""
+        try:
+            published = sorted(
+                p for p in self.snapshot_root.iterdir()
+                if p.is_dir() and not p.name.startswith(".")
+            )
+            for old in published[:-self.snapshots_to_keep]:
+                if old != self._snapshot_path:
+                    shutil.rmtree(old, ignore_errors=True)
+            # Temp directories older than an hour belong to crashed writers
+            cutoff = time.time() - 3600
+            for tmp in self.snapshot_root.glob(".tmp-*"):
+                if tmp.stat().st_mtime < cutoff:
+                    shutil.rmtree(tmp, ignore_errors=True)
+        except OSError as e:
+            logger.warning(f"Error pruning vector snapshots: {e}")
+
+    def stats(self, include_recall: bool = False) -> Dict:
+        """
+        Return store statistics
+
+        Args:
+            include_recall: Also measure recall@10 (see measure_recall)
+        """
+        with self._lock:
+            n = len(self._labels)
+            memory = self.memory_bytes()
+            stats = {
+                "total_vectors": n,
+                "index_size": self.index.ntotal,
+                "dimension": self.dimension,
+                "index_type": self.index_type,
+                "active_index": self._kind,
+                "metric": self.metric,
+                "memory_bytes": memory,
+                "bytes_per_vector": round(memory / n, 1) if n else 0.0,
+                "deleted_pending_compaction": len(self._tombstones),
+                "snapshot": self._snapshot_path.name if self._snapshot_path else None,
+                "unsaved_changes": self.dirty,
+                "memory_mapped": self._mmapped,
+                "rebuilding": self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+            }
+            if self._raw is not None:
+                stats["raw_vector_bytes"] = int(self._raw.ntotal * self.dimension * 4)
+            if self._kind == "hnsw":
+                stats["params"] = {"M": self.hnsw_m, "efConstruction": self.hnsw_ef_construction,
+                                   "efSearch": self.hnsw_ef_search}
+            elif self.index_type == "ivfpq":
+                stats["params"] = {"nprobe": self.ivf_nprobe, "pq_m": self.pq_m, "pq_nbits": self.pq_nbits,
+                                   "trained_size": self._trained_size, "min_train": self.ivf_min_train}
+                if self._kind == "ivfpq":
+                    stats["params"]["nlist"] = faiss.extract_index_ivf(self.index).nlist
+
+        if include_recall:
+            stats["recall_at_10"] = self.measure_recall(10)
+        return stats
+
+
+def create_vector_store() -> VectorStore:
+    """Build vector store from settings"""
+    return VectorStore(
+        settings.VECTOR_DIM,
+        settings.VECTOR_STORE_DIR,
+        index_type=settings.VECTOR_INDEX_TYPE,
+        use_mmap=settings.VECTOR_INDEX_MMAP,
+        snapshots_to_keep=settings.VECTOR_SNAPSHOTS_TO_KEEP,
+        hnsw_m=settings.VECTOR_HNSW_M,
+        hnsw_ef_construction=settings.VECTOR_HNSW_EF_CONSTRUCTION,
+        hnsw_ef_search=settings.VECTOR_HNSW_EF_SEARCH,
+        ivf_nlist=settings.VECTOR_IVF_NLIST,
+        ivf_nprobe=settings.VECTOR_IVF_NPROBE,
+        pq_m=settings.VECTOR_PQ_M,
+        pq_nbits=settings.VECTOR_PQ_NBITS,
+        ivf_min_train=settings.VECTOR_IVF_MIN_TRAIN,
+        retrain_factor=settings.VECTOR_IVF_RETRAIN_FACTOR,
+        recall_sample=settings.VECTOR_RECALL_SAMPLE
+    )
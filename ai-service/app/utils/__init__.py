@@ -2,3 +2,7 @@
 from app.utils.file_utils import *
 from app.utils.text_utils import *
 from app.utils.logger import *
+from app.utils.cache import *
+from app.utils.batching import *
+from app.utils.executors import *
+from app.utils.skill_matcher import *
@@ -0,0 +1,147 @@
+"""
+Dynamic micro-batching utilities
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into one batch call
+
+    Callers await submit(item). A background task waits up to max_wait_ms
+    after the first queued item (or until max_batch_size items are queued),
+    runs batch_fn once in an executor and fans the results back out.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+        executor: Optional[Executor] = None
+    ):
+        """
+        Initialize micro-batcher
+
+        Args:
+            batch_fn: Blocking function mapping a list of items to a list of results
+            max_batch_size: Maximum items per batch call
+            max_wait_ms: Collection window after the first item arrives
+            name: Name used in logs and metrics
+            executor: Executor for batch_fn (default loop executor if None)
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.name = name
+        self.executor = executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.total_items = 0
+        self.total_batches = 0
+        self.max_observed_batch = 0
+        self.last_batch_size = 0
+        self.failed_batches = 0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result
+
+        Args:
+            item: Single input for batch_fn
+
+        Returns:
+            Result produced for this item
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self):
+        """Start the worker on the running loop (recreated if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> List[tuple]:
+        """Wait for the first item, then gather more until the window closes"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Worker loop: collect, execute, fan out"""
+        while True:
+            batch = await self._collect()
+            pending = [(item, future) for item, future in batch if not future.cancelled()]
+            if not pending:
+                continue
+
+            items = [item for item, _ in pending]
+            self._record_batch(len(items))
+
+            try:
+                results = await self._loop.run_in_executor(self.executor, self.batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"{self.name} batch of {len(items)} failed: {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(pending, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record_batch(self, size: int):
+        """Update batch size metrics"""
+        self.total_batches += 1
+        self.total_items += size
+        self.last_batch_size = size
+        self.max_observed_batch = max(self.max_observed_batch, size)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and achieved batch size metrics"""
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_items": self.total_items,
+            "total_batches": self.total_batches,
+            "avg_batch_size": round(self.total_items / self.total_batches, 2) if self.total_batches else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "last_batch_size": self.last_batch_size,
+            "failed_batches": self.failed_batches
+        }
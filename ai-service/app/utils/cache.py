@@ -0,0 +1,340 @@
+"""
+Caching utilities
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns of every TieredCache table
+_TIERED_COLUMNS = ["key", "value", "cost", "created_at"]
+
+
+def content_hash(*parts: str) -> str:
+    """
+    Build a stable content-addressed key from one or more strings
+
+    Args:
+        parts: Strings identifying the content (model name, text, ...)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8", errors="ignore"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with optional TTL"""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            ttl_seconds: Entry lifetime in seconds (None or <= 0 disables expiry)
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value and mark it as recently used"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, stored_at = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove entry and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-memory LRU in front of an optional SQLite table
+
+    Every entry carries a cost, the work a hit saves (dollars, seconds),
+    which is summed over hits. Entries expire ttl_seconds after they were
+    stored, whichever tier serves them. The disk tier keeps at most
+    max_disk_entries rows; expired and oldest rows are pruned every
+    prune_every writes. Values are stored on disk as the text returned by
+    serialize(); subclasses override serialize() and deserialize() for
+    values that are not strings.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 100000,
+        prune_every: int = 500
+    ):
+        """
+        Initialize cache
+
+        Args:
+            name: Entry description used in log messages, e.g. "LLM response"
+            table: SQLite table name
+            max_entries: Maximum entries kept in memory
+            ttl_seconds: Entry lifetime in seconds (None or <= 0 disables expiry)
+            db_path: SQLite file for the persistent tier (None disables it)
+            max_disk_entries: Maximum rows kept on disk (oldest are pruned)
+            prune_every: Check the on-disk limits every N writes
+        """
+        self.name = name
+        self.table = table
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.memory = LRUCache(max_size=max_entries)
+        self.db_path = db_path
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.prune_every = max(1, int(prune_every))
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.cost_saved = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        if self.db_path is not None:
+            self._open()
+
+    def serialize(self, value: Any) -> str:
+        """Convert a value to the text stored on disk"""
+        return value
+
+    def deserialize(self, key: str, data: str) -> Any:
+        """Rebuild a value from its stored text (may raise ValueError, KeyError or TypeError)"""
+        return data
+
+    def get(self, key: str) -> Any:
+        """
+        Look up a value, promoting disk hits into memory
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Stored value or None on miss
+        """
+        entry = self.memory.get(key)
+        if entry is not None and self._expired(entry[2]):
+            self.memory.pop(key)
+            entry = None
+
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                with self._stats_lock:
+                    self.disk_hits += 1
+                self.memory.set(key, entry)
+
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.cost_saved += entry[1]
+        return entry[0]
+
+    def put(self, key: str, value: Any, cost: float = 0.0):
+        """
+        Store a value in memory and, if enabled, on disk
+
+        Args:
+            key: Cache key
+            value: Value to store
+            cost: Work a hit saves, credited on every hit
+        """
+        entry = (value, float(cost), time.time())
+        self.memory.set(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self):
+        """Clear both tiers"""
+        self.memory.clear()
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error clearing {self.name} store: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate, cost saved and tier sizes"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_entries": len(self.memory),
+            "max_entries": self.memory.max_size,
+            "disk_enabled": self._conn is not None,
+            "disk_entries": self._disk_count(),
+            "max_disk_entries": self.max_disk_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "disk_writes": self.disk_writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cost_saved": self.cost_saved
+        }
+
+    def _open(self):
+        """Open SQLite store (disables persistence on failure)"""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+            if columns and columns != _TIERED_COLUMNS:
+                # Written by an older layout; the rows are only a cache
+                logger.info(f"Dropping {self.name} store with outdated columns {columns}")
+                conn.execute(f"DROP TABLE {self.table}")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, cost REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_created ON {self.table} (created_at)"
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened {self.name} store: {self.db_path}")
+        except sqlite3.Error as e:
+            logger.warning(f"Persistence of {self.name} store disabled: {e}")
+            self._conn = None
+
+    def _expired(self, created_at: float) -> bool:
+        """Whether an entry stored at created_at is past its TTL"""
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Read unexpired row from SQLite"""
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, cost, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or self._expired(row[2]):
+                return None
+            return self.deserialize(key, row[0]), row[1], row[2]
+        except (sqlite3.Error, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Error reading {self.name} {key[:12]}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: Tuple[Any, float, float]):
+        """Upsert row, pruning expired and excess rows periodically"""
+        if self._conn is None:
+            return
+
+        try:
+            data = self.serialize(entry[0])
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, cost, created_at) VALUES (?, ?, ?, ?)",
+                    (key, data, entry[1], entry[2])
+                )
+                self.disk_writes += 1
+                if self.disk_writes % self.prune_every == 0:
+                    self._prune()
+                self._conn.commit()
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            logger.warning(f"Error writing {self.name} {key[:12]}: {e}")
+
+    def _prune(self):
+        """Delete expired rows and the oldest rows beyond max_disk_entries (caller holds the lock)"""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+
+        excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)",
+                (excess,)
+            )
+            logger.info(f"Pruned {excess} old {self.name} rows")
+
+    def _disk_count(self) -> int:
+        """Number of persisted rows"""
+        if self._conn is None:
+            return 0
+        try:
+            with self._lock:
+                return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        except sqlite3.Error:
+            return 0
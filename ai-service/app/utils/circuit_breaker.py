@@ -0,0 +1,192 @@
+"""
+Circuit breaker for calls to external services
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over a sliding window of recent calls
+
+    The circuit opens when, over the last window_size calls (at least
+    min_calls), the failure rate or the slow-call rate reaches its
+    threshold. While open, calls are rejected without being attempted.
+    After open_seconds the circuit is half-open: up to half_open_calls
+    probe calls are let through; if they all succeed in time the circuit
+    closes, and any failed or slow probe opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1
+    ):
+        """
+        Initialize circuit breaker
+
+        Args:
+            name: Name used in logs
+            failure_rate_threshold: Failure fraction that opens the circuit
+            slow_call_seconds: Calls at least this long count as slow (None disables)
+            slow_call_rate_threshold: Slow-call fraction that opens the circuit
+            window_size: Number of recent calls considered
+            min_calls: Calls needed in the window before it can open
+            open_seconds: Time spent open before probing
+            half_open_calls: Probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds and slow_call_seconds > 0 else None
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = max(1, int(min_calls))
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, int(half_open_calls))
+        self._window: "deque[tuple]" = deque(maxlen=max(self.min_calls, int(window_size)))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Current state (an expired open period reads as half-open)"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def acquire(self) -> bool:
+        """
+        Ask permission for one call
+
+        Returns:
+            True if the call is a half-open probe, False for a normal call
+
+        Raises:
+            CircuitOpenError: If the call must not be attempted
+        """
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open")
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+                logger.info(f"Circuit '{self.name}' half-open, probing")
+
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half-open, probe in flight")
+                self._probes_in_flight += 1
+                return True
+
+            return False
+
+    def record(self, duration: float, failed: bool, probe: bool = False):
+        """
+        Record the outcome of a permitted call
+
+        Args:
+            duration: Call duration in seconds
+            failed: Whether the call raised
+            probe: Value returned by acquire() for this call
+        """
+        slow = self.slow_call_seconds is not None and duration >= self.slow_call_seconds
+
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._open(f"probe {'failed' if failed else 'slow'} ({duration:.1f}s)")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self._window.clear()
+                    logger.info(f"Circuit '{self.name}' closed")
+                return
+
+            # Late results of calls admitted before the circuit opened are ignored
+            if self._state != CLOSED:
+                return
+
+            self._window.append((failed, slow))
+            if len(self._window) < self.min_calls:
+                return
+
+            calls = len(self._window)
+            failure_rate = sum(1 for f, _ in self._window if f) / calls
+            slow_rate = sum(1 for _, s in self._window if s) / calls
+            if failure_rate >= self.failure_rate_threshold:
+                self._open(f"failure rate {failure_rate:.0%} over {calls} calls")
+            elif self.slow_call_seconds is not None and slow_rate >= self.slow_call_rate_threshold:
+                self._open(f"slow-call rate {slow_rate:.0%} over {calls} calls")
+
+    def release(self, probe: bool):
+        """
+        Give back permission for a call that was abandoned before it was sent
+
+        Args:
+            probe: Value returned by acquire() for this call
+        """
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self, reason: str):
+        """Open the circuit (caller holds the lock)"""
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.times_opened += 1
+        logger.warning(f"Circuit '{self.name}' opened: {reason}; rejecting calls for {self.open_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return state, window rates and counters"""
+        state = self.state
+        with self._lock:
+            calls = len(self._window)
+            failures = sum(1 for f, _ in self._window if f)
+            slow = sum(1 for _, s in self._window if s)
+            retry_in = max(0.0, self._opened_at + self.open_seconds - time.monotonic()) if state == OPEN else 0.0
+            return {
+                "state": state,
+                "window_calls": calls,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "slow_call_rate": round(slow / calls, 4) if calls else 0.0,
+                "failure_rate_threshold": self.failure_rate_threshold,
+                "slow_call_seconds": self.slow_call_seconds,
+                "slow_call_rate_threshold": self.slow_call_rate_threshold,
+                "open_seconds": self.open_seconds,
+                "retry_in_seconds": round(retry_in, 2),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,151 @@
+"""
+Execution pools for blocking work
+Keeps CPU-bound model work and I/O-bound LLM calls off the asyncio event loop
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class ExecutionPool(ThreadPoolExecutor):
+    """
+    Bounded thread pool that records queue-time and run-time metrics
+
+    max_workers is the pool's concurrency limit; work beyond it waits in
+    the pool queue and the wait is measured per task.
+    """
+
+    def __init__(self, name: str, max_workers: int, sample_size: int = 1000):
+        """
+        Initialize execution pool
+
+        Args:
+            name: Pool name used in thread names and metrics
+            max_workers: Maximum concurrently running tasks
+            sample_size: Number of recent timings kept for percentiles
+        """
+        super().__init__(max_workers=max(1, int(max_workers)), thread_name_prefix=f"{name}-worker")
+        self.name = name
+        self.max_concurrency = max(1, int(max_workers))
+        self._stats_lock = threading.Lock()
+        self._queue_times = deque(maxlen=sample_size)
+        self._run_times = deque(maxlen=sample_size)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Submit work, wrapping it with timing instrumentation"""
+        submitted_at = time.perf_counter()
+        with self._stats_lock:
+            self.queued += 1
+
+        def timed():
+            started_at = time.perf_counter()
+            with self._stats_lock:
+                self.queued -= 1
+                self.active += 1
+                self._queue_times.append(started_at - submitted_at)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                with self._stats_lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self._run_times.append(time.perf_counter() - started_at)
+            return result
+
+        return super().submit(timed)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run blocking function in this pool from async code
+
+        Args:
+            fn: Blocking callable
+            args: Positional arguments
+            kwargs: Keyword arguments
+
+        Returns:
+            Function result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return concurrency and queue-time metrics"""
+        with self._stats_lock:
+            queue_times = list(self._queue_times)
+            run_times = list(self._run_times)
+            stats = {
+                "name": self.name,
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+
+        stats.update({
+            "queue_ms_avg": round(sum(queue_times) / len(queue_times) * 1000, 3) if queue_times else 0.0,
+            "queue_ms_p99": round(_percentile(queue_times, 99) * 1000, 3),
+            "run_ms_avg": round(sum(run_times) / len(run_times) * 1000, 3) if run_times else 0.0,
+            "run_ms_p99": round(_percentile(run_times, 99) * 1000, 3)
+        })
+        return stats
+
+
+# Global pools
+io_pool = ExecutionPool("io", settings.IO_POOL_WORKERS)
+cpu_pool = ExecutionPool("cpu", settings.CPU_POOL_WORKERS)
+# Bulk background jobs get their own pool so they never occupy interactive slots
+job_pool = ExecutionPool("jobs", settings.JOB_MAX_CONCURRENT)
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Run I/O-bound blocking call (LLM requests, disk) in the I/O pool"""
+    return await io_pool.run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound blocking call (encode, parse, score) in the CPU pool"""
+    return await cpu_pool.run(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Get metrics for all execution pools"""
+    return {
+        "io": io_pool.stats(),
+        "cpu": cpu_pool.stats(),
+        "jobs": job_pool.stats()
+    }
+
+
+def shutdown_executors():
+    """Shut down execution pools"""
+    for pool in (io_pool, cpu_pool, job_pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+    logger.info("Execution pools shut down")
@@ -3,8 +3,9 @@ File handling utilities
 """
 import os
 import shutil
+import tempfile
 from pathlib import Path
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,46 @@ def save_uploaded_file(file: BinaryIO, filename: str, directory: Path) -> Path:
         raise
 
 
+def read_upload(
+    file: BinaryIO,
+    max_in_memory: int,
+    directory: Path,
+    suffix: str = ""
+) -> Union[bytes, Path]:
+    """
+    Read uploaded file into memory, spilling large uploads to disk
+    
+    Args:
+        file: File object (e.g. the upload's spooled file)
+        max_in_memory: Largest upload returned as bytes
+        directory: Directory for spilled uploads
+        suffix: File suffix for spilled uploads
+        
+    Returns:
+        File bytes, or path of a uniquely named temp file (caller deletes it)
+    """
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    
+    if size <= max_in_memory:
+        return file.read()
+    
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=directory)
+    file_path = Path(name)
+    
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            shutil.copyfileobj(file, buffer)
+        logger.info(f"Upload of {size} bytes spilled to {file_path}")
+        return file_path
+    except Exception as e:
+        logger.error(f"Error spilling upload: {e}")
+        delete_file(file_path)
+        raise
+
+
 def delete_file(file_path: Path) -> bool:
     """
     Delete a file safely
@@ -0,0 +1,111 @@
+"""
+Rate limiting utilities
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize bucket
+
+        Args:
+            rate_per_minute: Sustained rate (<= 0 disables limiting)
+            capacity: Burst size (defaults to one minute of rate)
+        """
+        self.rate = max(0.0, float(rate_per_minute)) / 60.0
+        self.capacity = float(capacity) if capacity else self.rate * 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount tokens, going into debt if needed
+
+        Args:
+            amount: Tokens to take (capped at capacity)
+
+        Returns:
+            Seconds the caller must wait before proceeding
+        """
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Request and token rate limits for an external API"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """
+        Initialize rate limiter
+
+        Args:
+            requests_per_minute: Request limit (<= 0 disables it)
+            tokens_per_minute: Token limit (<= 0 disables it)
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def reserve(self, tokens: float = 0) -> float:
+        """
+        Reserve capacity for one request without blocking
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds the request must wait before it is sent
+        """
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+        with self._stats_lock:
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait += wait
+        return wait
+
+    def acquire(self, tokens: float = 0) -> float:
+        """
+        Block until one request using the given tokens is allowed
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limit configuration and throttling counters"""
+        return {
+            "requests_per_minute": round(self.requests.rate * 60, 2),
+            "tokens_per_minute": round(self.tokens.rate * 60, 2),
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.total_wait, 3)
+        }
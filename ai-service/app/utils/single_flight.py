@@ -0,0 +1,129 @@
+"""
+Request coalescing (single-flight) utilities
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    """One in-flight computation shared by concurrent callers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving with the same key before it finishes wait and receive the
+    same result or exception. Nothing is kept after the call completes,
+    so later calls run again (pair with a cache for that). Results are
+    shared objects: return immutable values or copy per caller.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize single-flight group
+
+        Args:
+            name: Name used in metrics
+        """
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._async_flights: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn once per key among concurrent callers (blocking)
+
+        Args:
+            key: Identity of the request
+            fn: Function computing the result
+            args: Positional arguments for fn
+            kwargs: Keyword arguments for fn
+
+        Returns:
+            Result of the shared execution
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() once per key among concurrent coroutines (single event loop)
+
+        If the leading coroutine is cancelled, waiting followers are
+        cancelled too.
+
+        Args:
+            key: Identity of the request
+            fn: Coroutine function computing the result
+
+        Returns:
+            Result of the shared execution
+        """
+        future = self._async_flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_flights[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an error without followers is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._async_flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return execution and coalescing counters"""
+        calls = self.executions + self.coalesced
+        return {
+            "name": self.name,
+            "in_flight": len(self._flights) + len(self._async_flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0
+        }
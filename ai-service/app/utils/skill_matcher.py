@@ -0,0 +1,139 @@
+"""
+Multi-pattern skill matching
+Aho-Corasick automaton that finds every dictionary term in one pass over the text
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+_WHITESPACE = re.compile(r"\s")
+
+
+class SkillOccurrence(NamedTuple):
+    """One dictionary term found in a text"""
+    skill: str
+    term: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    """Same character class as regex \\w"""
+    return ch.isalnum() or ch == "_"
+
+
+class SkillMatcher:
+    """
+    Precompiled matcher for a canonical skill -> terms dictionary
+
+    A term matches only when it is not directly preceded or followed by a
+    word character. Unlike regex \\b this also works for terms that start or
+    end with punctuation, so 'c++', 'c#' and 'node.js' are found in
+    'c++ developer' or 'node.js, react'. Overlapping terms all match
+    ('py.test' yields both 'py' and 'py.test').
+    """
+
+    def __init__(self, dictionary: Dict[str, Iterable[str]]):
+        """
+        Build the automaton
+
+        Args:
+            dictionary: Canonical skill name -> terms that indicate it
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+
+        for canonical, terms in dictionary.items():
+            for term in terms:
+                term = term.lower().strip()
+                if term:
+                    self._add(term, canonical)
+
+        self._link()
+
+    def _add(self, term: str, canonical: str):
+        """Insert term into the trie"""
+        state = 0
+        for ch in term:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state].append((len(term), term, canonical))
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @property
+    def size(self) -> int:
+        """Number of automaton states"""
+        return len(self._goto)
+
+    def find_all(self, text: str) -> List[SkillOccurrence]:
+        """
+        Find every term occurrence in text
+
+        Matching is case-insensitive and any whitespace character matches a
+        space in a term. Offsets index the lowercased text, which has the
+        same length as the input for practically all resume text.
+
+        Args:
+            text: Input text
+
+        Returns:
+            Occurrences in order of end offset
+        """
+        if not text:
+            return []
+
+        haystack = _WHITESPACE.sub(" ", text.lower())
+        length = len(haystack)
+        goto, fail, output = self._goto, self._fail, self._output
+        found = []
+
+        state = 0
+        for i, ch in enumerate(haystack):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+
+            end = i + 1
+            if end < length and _is_word_char(haystack[end]):
+                continue
+            for term_length, term, canonical in output[state]:
+                start = end - term_length
+                if start > 0 and _is_word_char(haystack[start - 1]):
+                    continue
+                found.append(SkillOccurrence(canonical, term, start, end))
+
+        return found
+
+    def extract(self, text: str) -> Set[str]:
+        """
+        Extract canonical skills mentioned in text
+
+        Args:
+            text: Input text
+
+        Returns:
+            Set of canonical skill names
+        """
+        return {occurrence.skill for occurrence in self.find_all(text)}
@@ -0,0 +1,101 @@
+"""
+Parity tests: BatchScorer must reproduce RuleBasedScoring's scalar rules exactly
+"""
+import random
+
+import pytest
+
+from app.services.batch_scoring import EDUCATION_RANK, SKILL_VOCABULARY, BatchScorer, ResumeMatrix
+from app.services.resume_profile_cache import ResumeProfile
+from app.services.rule_based_scoring import JobProfile, RuleBasedScoring
+
+# Job skills outside the vocabulary never match but still count as required
+UNKNOWN_SKILLS = ["cobol", "fortran", "sap abap"]
+EDUCATION_LEVELS = list(EDUCATION_RANK) + ["bootcamp"]
+YEARS = [0, 0.5, 1, 2, 3, 4.5, 5, 7, 10, 15, 30]
+SCORE_FIELDS = ("overall_score", "skills_score", "experience_score", "education_score")
+
+
+@pytest.fixture(scope="module")
+def rules() -> RuleBasedScoring:
+    """Scalar scorer; the score rules use no instance state, so caches are not built"""
+    return RuleBasedScoring.__new__(RuleBasedScoring)
+
+
+def _random_resume(rng: random.Random, index: int) -> ResumeProfile:
+    return ResumeProfile(
+        key=f"resume-{index}",
+        skills=frozenset(rng.sample(SKILL_VOCABULARY, rng.randint(0, 20))),
+        years=rng.choice(YEARS + [round(rng.uniform(0, 25), 1)]),
+        education=rng.choice(EDUCATION_LEVELS)
+    )
+
+
+def _random_job(rng: random.Random) -> JobProfile:
+    skills = set(rng.sample(SKILL_VOCABULARY, rng.randint(0, 12)))
+    skills.update(rng.sample(UNKNOWN_SKILLS, rng.randint(0, 2)))
+    education = rng.choice(EDUCATION_LEVELS)
+    years = rng.choice(YEARS)
+    return JobProfile(
+        key="job",
+        text_skills=frozenset(skills),
+        text_years=years,
+        text_education=education,
+        skills=frozenset(skills),
+        required_years=years,
+        required_education=education
+    )
+
+
+def _scalar_scores(rules: RuleBasedScoring, resume: ResumeProfile, job: JobProfile) -> dict:
+    result = rules.calculate_overall_match_score(
+        "", "", [], job_profile=job, resume_profile=resume
+    )
+    return {name: result[name] for name in SCORE_FIELDS}
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_batch_scores_match_scalar_rules(rules, seed):
+    rng = random.Random(seed)
+    job = _random_job(rng)
+    resumes = [_random_resume(rng, i) for i in range(60)]
+
+    batch = BatchScorer().score_profiles(resumes, job)
+
+    assert batch == [_scalar_scores(rules, resume, job) for resume in resumes]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_component_scores_match_scalar_functions(rules, seed):
+    rng = random.Random(1000 + seed)
+    job = _random_job(rng)
+    resumes = [_random_resume(rng, i) for i in range(40)]
+    matrix = ResumeMatrix.from_profiles(resumes)
+    scorer = BatchScorer()
+
+    skills = scorer.skills_scores(matrix, job).tolist()
+    experience = scorer.experience_scores(matrix, job).tolist()
+    education = scorer.education_scores(matrix, job).tolist()
+
+    for i, resume in enumerate(resumes):
+        assert skills[i] == rules._calculate_skills_score(set(resume.skills), set(job.skills))
+        assert experience[i] == rules._calculate_experience_score(resume.years, job.required_years)
+        assert education[i] == rules._calculate_education_score(resume.education, job.required_education)
+
+
+def test_prebuilt_matrix_is_reused_across_jobs(rules):
+    rng = random.Random(7)
+    resumes = [_random_resume(rng, i) for i in range(30)]
+    matrix = ResumeMatrix.from_profiles(resumes)
+    scorer = BatchScorer()
+
+    for _ in range(5):
+        job = _random_job(rng)
+        assert scorer.score_profiles(resumes, job, matrix=matrix) == [
+            _scalar_scores(rules, resume, job) for resume in resumes
+        ]
+
+
+def test_empty_batch():
+    rng = random.Random(0)
+    assert BatchScorer().score_profiles([], _random_job(rng)) == []
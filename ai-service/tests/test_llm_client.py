@@ -0,0 +1,117 @@
+"""
+Tests for how LLMClient passes per-request options to the Gemini SDK
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.llm_client import LLMClient
+from app.utils.rate_limit import RateLimiter
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LegacySdkModel:
+    """Mirrors google-generativeai 0.3.x: extra kwargs become request proto fields"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, contents, *, generation_config=None, safety_settings=None, stream=False, **kwargs):
+        for name in kwargs:
+            raise ValueError(f"Unknown field for GenerateContentRequest: {name}")
+        self.calls.append(contents)
+        return _Response(f"answer to {contents}")
+
+
+class RequestOptionsModel:
+    """SDK versions that take a per-request timeout through request_options"""
+
+    def __init__(self):
+        self.request_options = []
+
+    def generate_content(self, contents, *, generation_config=None, safety_settings=None,
+                         stream=False, tools=None, request_options=None):
+        self.request_options.append(request_options)
+        return _Response(f"answer to {contents}")
+
+
+class SlowModel:
+    """Takes a fixed time per call and tracks how many calls overlap"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+        return _Response(f"answer to {contents}")
+
+
+@pytest.fixture
+def client():
+    client = LLMClient()
+    yield client
+    client.shutdown()
+
+
+def _attach(client: LLMClient, model) -> None:
+    client.model = model
+    client._request_options = client._accepts_request_options()
+
+
+def test_legacy_sdk_gets_no_extra_kwargs(client):
+    model = LegacySdkModel()
+    _attach(client, model)
+
+    assert client._request_options is False
+    assert client.generate("hello", timeout=5) == "answer to hello"
+    assert client.generate_many(["a", "b"], timeout=5) == ["answer to a", "answer to b"]
+    assert sorted(model.calls) == ["a", "b", "hello"]
+    assert client.failures == 0
+
+
+def test_request_options_timeout_when_supported(client):
+    model = RequestOptionsModel()
+    _attach(client, model)
+
+    assert client.generate("hello", timeout=5) == "answer to hello"
+    assert model.request_options == [{"timeout": 5}]
+
+
+def test_background_calls_do_not_starve_interactive_calls(client):
+    model = SlowModel(0.05)
+    _attach(client, model)
+    client.background_concurrency = 2
+    client.limiter = RateLimiter(requests_per_minute=1200)  # 20/s, burst of one minute
+    client.limiter.requests.tokens = 0  # No burst: every call waits its turn
+
+    def job():
+        with client.background():
+            results.extend(client.generate_many([f"job {i}" for i in range(40)], timeout=30))
+
+    results = []
+    worker = threading.Thread(target=job)
+    worker.start()
+    time.sleep(0.2)
+
+    started = time.monotonic()
+    assert client.generate("interactive", timeout=30) == "answer to interactive"
+    interactive_seconds = time.monotonic() - started
+    worker.join()
+
+    assert results == [f"answer to job {i}" for i in range(40)]
+    # Only the job's two admitted calls can be booked on the limiter ahead of it
+    assert interactive_seconds < 0.5
+    assert client.stats()["background"] == {"max_concurrency": 2, "active": 0, "queued": 0}
@@ -0,0 +1,127 @@
+"""
+Tests for parsing packed (several candidates per prompt) LLM score responses
+"""
+import json
+
+import pytest
+
+from app.services.scoring_service import ScoringService
+
+
+def _entry(candidate=None, overall=80, skills=70, experience=60, education=50) -> dict:
+    entry = {
+        "overall_score": overall,
+        "skills_score": skills,
+        "experience_score": experience,
+        "education_score": education
+    }
+    if candidate is not None:
+        entry["candidate"] = candidate
+    return entry
+
+
+@pytest.fixture(scope="module")
+def service() -> ScoringService:
+    return ScoringService()
+
+
+def test_plain_array(service):
+    response = json.dumps([_entry(1, overall=90), _entry(2, overall=40)])
+
+    scores = service._parse_packed_scores(response, 2)
+
+    assert scores[0].overall_score == 90
+    assert scores[1].overall_score == 40
+    assert scores[1].education_score == 50
+
+
+def test_code_fence_and_surrounding_text(service):
+    response = (
+        "Here are the scores:\n```json\n"
+        + json.dumps([_entry(2, overall=55), _entry(1, overall=85)], indent=2)
+        + "\n```\nLet me know if you need more."
+    )
+
+    scores = service._parse_packed_scores(response, 2)
+
+    assert {position: score.overall_score for position, score in scores.items()} == {0: 85, 1: 55}
+
+
+def test_malformed_array_falls_back_to_objects(service):
+    # Trailing comma and a truncated last entry make the array invalid JSON
+    response = (
+        "[" + json.dumps(_entry(1, overall=81)) + ", "
+        + json.dumps(_entry(3, overall=83)) + ', {"candidate": 2, "overall_score": 7'
+    )
+
+    scores = service._parse_packed_scores(response, 3)
+
+    assert sorted(scores) == [0, 2]
+    assert scores[0].overall_score == 81
+    assert scores[2].overall_score == 83
+
+
+def test_unnumbered_entries_placed_by_order_when_complete(service):
+    response = json.dumps([_entry(overall=10), _entry(overall=20), _entry(overall=30)])
+
+    scores = service._parse_packed_scores(response, 3)
+
+    assert [scores[i].overall_score for i in range(3)] == [10, 20, 30]
+
+
+def test_unnumbered_entries_skipped_when_some_are_missing(service):
+    response = json.dumps([_entry(overall=10), _entry(2, overall=20)])
+
+    scores = service._parse_packed_scores(response, 3)
+
+    assert list(scores) == [1]
+    assert scores[1].overall_score == 20
+
+
+@pytest.mark.parametrize("candidate", [0, -1, 4])
+def test_out_of_range_or_invalid_numbers_are_skipped(service, candidate):
+    bad = _entry(overall=99)
+    bad["candidate"] = candidate
+    response = json.dumps([bad, _entry(1, overall=60), _entry(3, overall=61)])
+
+    scores = service._parse_packed_scores(response, 3)
+
+    assert {position: score.overall_score for position, score in scores.items()} == {0: 60, 2: 61}
+
+
+def test_duplicate_candidate_keeps_first(service):
+    response = json.dumps([_entry(1, overall=70), _entry(1, overall=10)])
+
+    scores = service._parse_packed_scores(response, 2)
+
+    assert list(scores) == [0]
+    assert scores[0].overall_score == 70
+
+
+def test_incomplete_or_non_numeric_scores_are_left_out(service):
+    missing = _entry(1)
+    del missing["education_score"]
+    response = json.dumps([
+        missing,
+        _entry(2, skills="high"),
+        _entry(3, experience=True),
+        _entry(4, overall="88.5")
+    ])
+
+    scores = service._parse_packed_scores(response, 4)
+
+    assert list(scores) == [3]
+    assert scores[3].overall_score == 88.5
+
+
+def test_scores_are_clamped(service):
+    response = json.dumps([_entry(1, overall=150, skills=-20)])
+
+    scores = service._parse_packed_scores(response, 1)
+
+    assert scores[0].overall_score == 100.0
+    assert scores[0].skills_score == 0.0
+
+
+def test_unparseable_response(service):
+    assert service._parse_packed_scores("Sorry, I cannot score these candidates.", 2) == {}